@@ -0,0 +1,165 @@
+"""
+Recomendación y ajuste del número de hilos de nfsd
+Mide la saturación del pool de hilos (peticiones que esperaron un hilo libre)
+a partir de las muestras del colector de estadísticas y propone un número de hilos
+"""
+import os
+import re
+import math
+
+from estadisticas_nfsd import RUTA_HILOS
+
+
+RUTA_SYSCONFIG_NFS = "/etc/sysconfig/nfs"
+RUTA_NFS_CONF = "/etc/nfs.conf"
+
+HILOS_MINIMOS = 8
+
+# Hilos máximos por CPU (más hilos solo consumen memoria y cambios de contexto)
+HILOS_POR_CPU = 16
+HILOS_MAXIMOS = 256
+
+# Fracción de peticiones encoladas (percentil 95) a partir de la cual faltan hilos
+UMBRAL_SATURACION = 0.05
+
+# Muestras necesarias para recomendar algo
+MUESTRAS_MINIMAS = 5
+
+_LINEA_SYSCONFIG = re.compile(r'^(\s*USE_KERNEL_NFSD_NUMBER\s*=\s*)"?[^"\n]*"?(.*)$', re.MULTILINE)
+_SECCION_INI = re.compile(r'^\s*\[([^\]]+)\]\s*$')
+_CLAVE_THREADS = re.compile(r'^(\s*#?\s*threads\s*=\s*)\S*(.*)$')
+
+
+def leer_hilos_actuales(ruta=RUTA_HILOS):
+    """Retorna el número de hilos de nfsd en ejecución o None si nfsd no está activo"""
+    try:
+        with open(ruta, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    posicion = min(len(ordenados) - 1, int(math.ceil(fraccion * len(ordenados))) - 1)
+    return ordenados[max(0, posicion)]
+
+
+def hilos_maximos():
+    return min(HILOS_MAXIMOS, max(HILOS_MINIMOS, HILOS_POR_CPU * (os.cpu_count() or 1)))
+
+
+def recomendar_hilos(muestras, hilos_actuales):
+    """
+    Recomienda un número de hilos a partir de las muestras de ColectorEstadisticasNfsd
+    Retorna {'actual', 'recomendado', 'saturacion_media', 'saturacion_p95',
+    'muestras', 'motivo'}; recomendado es None si no hay datos suficientes
+    """
+    saturaciones = [m['uso_hilos'] for m in muestras if m.get('uso_hilos') is not None]
+    resultado = {
+        'actual': hilos_actuales,
+        'recomendado': None,
+        'saturacion_media': None,
+        'saturacion_p95': None,
+        'muestras': len(saturaciones),
+        'motivo': ""
+    }
+
+    if hilos_actuales is None:
+        resultado['motivo'] = "nfsd no está en ejecución"
+        return resultado
+    if len(saturaciones) < MUESTRAS_MINIMAS:
+        resultado['motivo'] = "Se necesitan al menos {0} muestras con pool_stats ({1} disponibles)".format(
+            MUESTRAS_MINIMAS, len(saturaciones)
+        )
+        return resultado
+
+    media = sum(saturaciones) / len(saturaciones)
+    p95 = _percentil(saturaciones, 0.95)
+    resultado['saturacion_media'] = media
+    resultado['saturacion_p95'] = p95
+    maximo = hilos_maximos()
+
+    if p95 > UMBRAL_SATURACION:
+        # Crecer en proporción a la cola observada, en múltiplos de 8
+        objetivo = hilos_actuales * (1 + 2 * p95)
+        recomendado = max(hilos_actuales + 8, int(math.ceil(objetivo / 8.0)) * 8)
+        recomendado = min(recomendado, maximo)
+        if recomendado <= hilos_actuales:
+            resultado['recomendado'] = hilos_actuales
+            resultado['motivo'] = "Hilos saturados ({0:.1f}% en espera) pero ya en el máximo de {1}".format(
+                p95 * 100, maximo
+            )
+        else:
+            resultado['recomendado'] = recomendado
+            resultado['motivo'] = "El {0:.1f}% de las peticiones esperó un hilo libre (p95)".format(p95 * 100)
+    elif hilos_actuales > maximo:
+        resultado['recomendado'] = maximo
+        resultado['motivo'] = "Más hilos que el máximo útil para {0} CPU".format(os.cpu_count() or 1)
+    elif hilos_actuales < HILOS_MINIMOS:
+        resultado['recomendado'] = HILOS_MINIMOS
+        resultado['motivo'] = "Menos hilos que el mínimo recomendado"
+    else:
+        resultado['recomendado'] = hilos_actuales
+        resultado['motivo'] = "Sin saturación ({0:.1f}% en espera, p95)".format(p95 * 100)
+    return resultado
+
+
+def actualizar_sysconfig(texto, hilos):
+    """
+    Fija USE_KERNEL_NFSD_NUMBER en el texto de /etc/sysconfig/nfs (openSUSE)
+    Retorna el texto nuevo
+    """
+    if _LINEA_SYSCONFIG.search(texto):
+        return _LINEA_SYSCONFIG.sub(lambda m: '{0}"{1}"{2}'.format(m.group(1), hilos, m.group(2)), texto, count=1)
+    if texto and not texto.endswith("\n"):
+        texto += "\n"
+    return texto + 'USE_KERNEL_NFSD_NUMBER="{0}"\n'.format(hilos)
+
+
+def actualizar_nfs_conf(texto, hilos):
+    """
+    Fija threads= en la sección [nfsd] del texto de /etc/nfs.conf
+    Una línea 'threads' comentada en [nfsd] se reemplaza; si no hay sección se agrega
+    Retorna el texto nuevo
+    """
+    lineas = texto.splitlines(True)
+    en_nfsd = False
+    indice_seccion = None
+    for indice, linea in enumerate(lineas):
+        seccion = _SECCION_INI.match(linea)
+        if seccion:
+            if en_nfsd:
+                break
+            en_nfsd = seccion.group(1).strip() == 'nfsd'
+            if en_nfsd:
+                indice_seccion = indice
+            continue
+        if en_nfsd:
+            m = _CLAVE_THREADS.match(linea)
+            if m:
+                salto = linea[len(linea.rstrip("\r\n")):] or "\n"
+                lineas[indice] = "threads={0}{1}".format(hilos, salto)
+                return "".join(lineas)
+
+    if indice_seccion is not None:
+        lineas.insert(indice_seccion + 1, "threads={0}\n".format(hilos))
+        return "".join(lineas)
+
+    if texto and not texto.endswith("\n"):
+        texto += "\n"
+    return texto + "[nfsd]\nthreads={0}\n".format(hilos)
+
+
+def archivo_configuracion_hilos(ruta_sysconfig=RUTA_SYSCONFIG_NFS, ruta_nfs_conf=RUTA_NFS_CONF):
+    """
+    Retorna (ruta, funcion_actualizar) del archivo donde se guarda el número de hilos:
+    /etc/sysconfig/nfs si define USE_KERNEL_NFSD_NUMBER (openSUSE), si no /etc/nfs.conf
+    """
+    try:
+        with open(ruta_sysconfig, 'r') as f:
+            if _LINEA_SYSCONFIG.search(f.read()):
+                return ruta_sysconfig, actualizar_sysconfig
+    except OSError:
+        pass
+    return ruta_nfs_conf, actualizar_nfs_conf
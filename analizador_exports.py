@@ -0,0 +1,303 @@
+"""
+Analizador de solapamientos y conflictos entre exportaciones
+Usa un trie binario de prefijos CIDR y árboles de prefijos (rutas y dominios)
+para encontrar, para cada regla, la regla más específica que la contiene,
+sin comparar todas las parejas entre sí
+"""
+import ipaddress
+
+
+# Categorías de opciones: si dos reglas que se solapan difieren en alguna,
+# un cliente recibe permisos distintos según qué regla aplique el servidor
+# (el primer valor es el que usa NFS por defecto)
+CATEGORIAS_OPCIONES = {
+    'acceso': ('ro', 'rw'),
+    'squash': ('root_squash', 'no_root_squash', 'all_squash'),
+    'escritura': ('sync', 'async'),
+    'puertos': ('secure', 'insecure'),
+    'subarbol': ('no_subtree_check', 'subtree_check'),
+}
+
+# Tipos de hallazgo y su severidad
+SEVERIDADES = {
+    'duplicado': 'aviso',
+    'conflicto': 'error',
+    'solapamiento': 'info',
+    'anidada': 'info',
+    'anidada_conflicto': 'aviso',
+}
+
+
+def resumir_opciones(opciones):
+    """
+    Retorna {categoria: valor} con el valor efectivo de cada categoría
+    (el último que aparece, o el valor por defecto)
+    """
+    resumen = {categoria: valores[0] for categoria, valores in CATEGORIAS_OPCIONES.items()}
+    for opcion in opciones:
+        if opcion == 'no_all_squash':
+            continue
+        if opcion == 'no_secure':
+            opcion = 'insecure'
+        for categoria, valores in CATEGORIAS_OPCIONES.items():
+            if opcion in valores:
+                resumen[categoria] = opcion
+    return resumen
+
+
+def diferencias_opciones(opciones_a, opciones_b):
+    """Retorna la lista de categorías en las que dos listas de opciones difieren"""
+    resumen_a = resumir_opciones(opciones_a)
+    resumen_b = resumir_opciones(opciones_b)
+    return sorted(c for c in CATEGORIAS_OPCIONES if resumen_a[c] != resumen_b[c])
+
+
+class TrieCIDR:
+    """
+    Trie binario de prefijos IP (un trie por versión de IP)
+    Cada nodo es [hijo_0, hijo_1, valor]; insertar devuelve el valor del
+    prefijo más largo ya insertado que contiene al nuevo
+    """
+
+    def __init__(self):
+        self._raices = {4: [None, None, None], 6: [None, None, None]}
+
+    def insertar(self, red, valor):
+        nodo = self._raices[red.version]
+        ancestro = None
+        bits = red.max_prefixlen
+        direccion = int(red.network_address)
+
+        for i in range(red.prefixlen):
+            if nodo[2] is not None:
+                ancestro = nodo[2]
+            bit = (direccion >> (bits - 1 - i)) & 1
+            siguiente = nodo[bit]
+            if siguiente is None:
+                siguiente = [None, None, None]
+                nodo[bit] = siguiente
+            nodo = siguiente
+
+        anterior = nodo[2]
+        if anterior is None:
+            nodo[2] = valor
+        return ancestro, anterior
+
+
+class ArbolPrefijos:
+    """
+    Árbol de prefijos por componentes (rutas: /a/b/c; dominios: c.b.a)
+    insertar devuelve el valor del prefijo más largo ya insertado que lo contiene
+    """
+
+    def __init__(self):
+        self._raiz = [{}, None]
+
+    def insertar(self, componentes, valor):
+        nodo = self._raiz
+        ancestro = None
+        for componente in componentes:
+            if nodo[1] is not None:
+                ancestro = nodo[1]
+            hijos = nodo[0]
+            siguiente = hijos.get(componente)
+            if siguiente is None:
+                siguiente = [{}, None]
+                hijos[componente] = siguiente
+            nodo = siguiente
+
+        anterior = nodo[1]
+        if anterior is None:
+            nodo[1] = valor
+        return ancestro, anterior
+
+    def buscar_ancestro(self, componentes):
+        """Valor del prefijo más largo (estricto) de componentes, sin insertar nada"""
+        nodo = self._raiz
+        ancestro = None
+        for componente in componentes:
+            if nodo[1] is not None:
+                ancestro = nodo[1]
+            nodo = nodo[0].get(componente)
+            if nodo is None:
+                break
+        return ancestro
+
+
+def _componentes_ruta(ruta):
+    return [c for c in ruta.split('/') if c]
+
+
+def clasificar_host(host):
+    """
+    Retorna (tipo, clave, orden) de una especificación de cliente
+    tipo: 'todos', 'red', 'dominio', 'comodin_dominio' u 'otro' (netgroups, patrones complejos)
+    orden permite insertar primero lo más general
+    """
+    if host in ('*', ''):
+        return 'todos', None, -1
+    if host.startswith('@'):
+        return 'otro', host, 0
+    try:
+        red = ipaddress.ip_network(host, strict=False)
+        return 'red', red, red.prefixlen
+    except ValueError:
+        pass
+
+    host = host.lower().rstrip('.')
+    etiquetas = host.split('.')
+    if etiquetas[0] == '*' and not any(c in host[1:] for c in '*?['):
+        return 'comodin_dominio', list(reversed(etiquetas[1:])), len(etiquetas) - 1
+    if not any(c in host for c in '*?['):
+        return 'dominio', list(reversed(etiquetas)), len(etiquetas)
+    return 'otro', host, 0
+
+
+class AnalizadorExports:
+    """
+    Recibe las reglas (ruta, host, opciones, origen) y reporta:
+    - duplicado: el mismo host aparece dos veces para la misma ruta
+    - conflicto / solapamiento: una regla de host está contenida en otra más general
+      de la misma ruta (con o sin opciones contradictorias)
+    - anidada / anidada_conflicto: una ruta exportada está dentro de otra exportada
+    """
+
+    def __init__(self):
+        self.reglas = []
+
+    def agregar(self, ruta, host, opciones, origen=None):
+        """
+        Agrega una regla; origen es un diccionario libre (archivo, numero_linea...)
+        que se copia en los hallazgos
+        """
+        self.reglas.append({
+            'ruta': ruta,
+            'host': host,
+            'opciones': list(opciones),
+            'origen': origen or {}
+        })
+
+    def _hallazgo(self, tipo, regla, otra, diferencias, mensaje):
+        return {
+            'tipo': tipo,
+            'severidad': SEVERIDADES[tipo],
+            'ruta': regla['ruta'],
+            'host': regla['host'],
+            'origen': regla['origen'],
+            'otra_ruta': otra['ruta'],
+            'otro_host': otra['host'],
+            'otro_origen': otra['origen'],
+            'diferencias': diferencias,
+            'mensaje': mensaje
+        }
+
+    def _analizar_hosts(self, reglas, hallazgos):
+        """Solapamientos entre los hosts de una misma ruta"""
+        trie = TrieCIDR()
+        comodines = ArbolPrefijos()
+        exactos = {}
+        todos = None
+
+        clasificadas = [(clasificar_host(regla['host']), regla) for regla in reglas]
+        # Primero lo más general: así cada regla encuentra a su contenedora al insertarse
+        clasificadas.sort(key=lambda x: x[0][2])
+
+        for (tipo, clave, _), regla in clasificadas:
+            if tipo == 'todos':
+                if todos is not None:
+                    self._reportar_duplicado(regla, todos, hallazgos)
+                else:
+                    todos = regla
+                continue
+
+            contenedora = None
+            if tipo == 'red':
+                contenedora, anterior = trie.insertar(clave, regla)
+                if anterior is not None:
+                    self._reportar_duplicado(regla, anterior, hallazgos)
+                    continue
+            else:
+                marca = (tipo, tuple(clave) if isinstance(clave, list) else clave)
+                if marca in exactos:
+                    self._reportar_duplicado(regla, exactos[marca], hallazgos)
+                    continue
+                exactos[marca] = regla
+
+                # "*.b.a" se guarda en el nodo a/b: cubre a cualquier host que esté por debajo
+                if tipo == 'comodin_dominio':
+                    contenedora, _ = comodines.insertar(clave, regla)
+                elif tipo == 'dominio':
+                    contenedora = comodines.buscar_ancestro(clave)
+
+            contenedora = contenedora or todos
+            if contenedora is not None:
+                diferencias = diferencias_opciones(regla['opciones'], contenedora['opciones'])
+                tipo_hallazgo = 'conflicto' if diferencias else 'solapamiento'
+                if diferencias:
+                    mensaje = "{0}: {1} está incluido en {2} con opciones distintas ({3})".format(
+                        regla['ruta'], regla['host'], contenedora['host'] or '*', ", ".join(diferencias)
+                    )
+                else:
+                    mensaje = "{0}: {1} ya está cubierto por {2} con las mismas opciones".format(
+                        regla['ruta'], regla['host'], contenedora['host'] or '*'
+                    )
+                hallazgos.append(self._hallazgo(tipo_hallazgo, regla, contenedora, diferencias, mensaje))
+
+    def _reportar_duplicado(self, regla, anterior, hallazgos):
+        diferencias = diferencias_opciones(regla['opciones'], anterior['opciones'])
+        mensaje = "{0}: {1} aparece más de una vez".format(regla['ruta'], regla['host'] or '*')
+        if diferencias:
+            mensaje += " con opciones distintas ({0})".format(", ".join(diferencias))
+        hallazgos.append(self._hallazgo('duplicado', regla, anterior, diferencias, mensaje))
+
+    def _analizar_rutas(self, por_ruta, hallazgos):
+        """Exportaciones anidadas: cada ruta contra la ruta exportada más cercana que la contiene"""
+        arbol = ArbolPrefijos()
+        rutas = sorted(por_ruta, key=lambda r: len(_componentes_ruta(r)))
+        for ruta in rutas:
+            ancestro, _ = arbol.insertar(_componentes_ruta(ruta), ruta)
+            if ancestro is None:
+                continue
+
+            # Se comparan los hosts que aparecen en ambas rutas
+            propias = {regla['host']: regla for regla in por_ruta[ruta]}
+            padre = {regla['host']: regla for regla in por_ruta[ancestro]}
+            comunes = [host for host in propias if host in padre]
+
+            con_diferencias = []
+            for host in comunes:
+                diferencias = diferencias_opciones(propias[host]['opciones'], padre[host]['opciones'])
+                if diferencias:
+                    con_diferencias.append((host, diferencias))
+
+            regla = por_ruta[ruta][0]
+            otra = por_ruta[ancestro][0]
+            if con_diferencias:
+                host, diferencias = con_diferencias[0]
+                regla, otra = propias[host], padre[host]
+                mensaje = "{0} está dentro de {1} y el host {2} recibe opciones distintas ({3})".format(
+                    ruta, ancestro, host, ", ".join(diferencias)
+                )
+                hallazgos.append(self._hallazgo('anidada_conflicto', regla, otra, diferencias, mensaje))
+            else:
+                mensaje = "{0} está dentro de la exportación {1}".format(ruta, ancestro)
+                hallazgos.append(self._hallazgo('anidada', regla, otra, [], mensaje))
+
+    def analizar(self):
+        """
+        Ejecuta el análisis y retorna la lista de hallazgos
+        (primero los de mayor severidad)
+        """
+        por_ruta = {}
+        for regla in self.reglas:
+            clave = '/' + '/'.join(_componentes_ruta(regla['ruta']))
+            por_ruta.setdefault(clave, []).append(regla)
+
+        hallazgos = []
+        for reglas in por_ruta.values():
+            self._analizar_hosts(reglas, hallazgos)
+        self._analizar_rutas(por_ruta, hallazgos)
+
+        orden = {'error': 0, 'aviso': 1, 'info': 2}
+        hallazgos.sort(key=lambda h: (orden[h['severidad']], h['ruta'], h['host']))
+        return hallazgos
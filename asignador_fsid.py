@@ -0,0 +1,103 @@
+"""
+Asignador de fsid para exportaciones
+Mantiene los fsid numéricos usados (1-9999) en un mapa de bytes
+"""
+
+FSID_MINIMO = 1
+FSID_MAXIMO = 9999
+
+LIBRE = b'\x00'
+
+
+def extraer_fsid(opciones):
+    """
+    Retorna el fsid numérico de una lista de opciones o None
+    (fsid=root y los fsid UUID no ocupan números)
+    """
+    for opcion in opciones:
+        if opcion.startswith('fsid='):
+            try:
+                return int(opcion.split('=', 1)[1])
+            except ValueError:
+                return None
+    return None
+
+
+class AsignadorFsid:
+    """
+    Mapa de ocupación de fsid: una posición por número, 0 = libre
+    La búsqueda del siguiente libre usa bytearray.find (sin recorrer en Python)
+    """
+
+    def __init__(self, fsids_usados=()):
+        self._mapa = bytearray(FSID_MAXIMO + 1)
+        # 0 está reservado (fsid=0 es la raíz de NFSv4)
+        self._mapa[0] = 1
+        self._ocupados = 0
+        for fsid in fsids_usados:
+            self.ocupar(fsid)
+
+    def __contains__(self, fsid):
+        return FSID_MINIMO <= fsid <= FSID_MAXIMO and self._mapa[fsid] == 1
+
+    def __len__(self):
+        return self._ocupados
+
+    def copiar(self):
+        """Retorna una copia independiente (para asignar sin tocar el original)"""
+        copia = AsignadorFsid()
+        copia._mapa[:] = self._mapa
+        copia._ocupados = self._ocupados
+        return copia
+
+    def ocupar(self, fsid):
+        """
+        Marca un fsid como usado
+        Retorna False si ya estaba usado (colisión) o está fuera de rango
+        """
+        if not FSID_MINIMO <= fsid <= FSID_MAXIMO or self._mapa[fsid]:
+            return False
+        self._mapa[fsid] = 1
+        self._ocupados += 1
+        return True
+
+    def liberar(self, fsid):
+        """Marca un fsid como libre"""
+        if FSID_MINIMO <= fsid <= FSID_MAXIMO and self._mapa[fsid]:
+            self._mapa[fsid] = 0
+            self._ocupados -= 1
+
+    def libres(self):
+        """Cantidad de fsid disponibles"""
+        return FSID_MAXIMO - FSID_MINIMO + 1 - self._ocupados
+
+    def asignar(self, preferido=None):
+        """
+        Asigna y marca como usado un fsid libre
+        Usa preferido si está libre; si no, el siguiente libre (dando la vuelta al final)
+        Lanza ValueError si no quedan fsid
+        """
+        if preferido is None or not FSID_MINIMO <= preferido <= FSID_MAXIMO:
+            preferido = FSID_MINIMO
+
+        fsid = self._mapa.find(LIBRE, preferido)
+        if fsid == -1:
+            fsid = self._mapa.find(LIBRE, FSID_MINIMO, preferido)
+        if fsid == -1:
+            raise ValueError("No quedan fsid libres entre {0} y {1}".format(FSID_MINIMO, FSID_MAXIMO))
+
+        self._mapa[fsid] = 1
+        self._ocupados += 1
+        return fsid
+
+    def asignar_varios(self, preferidos):
+        """
+        Asigna un fsid por cada valor preferido (puede ser None)
+        Si no alcanzan, no asigna ninguno y lanza ValueError
+        """
+        preferidos = list(preferidos)
+        if len(preferidos) > self.libres():
+            raise ValueError("Se necesitan {0} fsid y solo quedan {1} libres".format(
+                len(preferidos), self.libres()
+            ))
+        return [self.asignar(preferido) for preferido in preferidos]
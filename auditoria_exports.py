@@ -0,0 +1,177 @@
+"""
+Registro de auditoría de los cambios en exports
+Cada alta, baja o modificación de un par ruta/host se guarda como una fila de
+un catálogo SQLite en el que solo se agregan filas, con fecha, usuario, archivo
+y opciones antes y después. Los índices por ruta y por host responden quién
+cambió una exportación y cuándo sin recorrer el registro completo
+"""
+import os
+import time
+import getpass
+import sqlite3
+
+try:
+    import pwd
+except ImportError:
+    pwd = None
+
+from modelo_exports import diferencia_exportaciones, normalizar_ruta
+
+
+ACCIONES = {
+    'alta': "Agregada",
+    'baja': "Eliminada",
+    'modificacion': "Modificada",
+}
+
+# Filas que retorna una consulta del historial si no se indica otro límite
+LIMITE_HISTORIAL = 500
+
+
+def usuario_actual():
+    """
+    Retorna el usuario que hace el cambio
+    Con sudo o pkexec es el usuario que lo lanzó, no root
+    """
+    usuario = os.environ.get('SUDO_USER')
+    if usuario:
+        return usuario
+    uid = os.environ.get('PKEXEC_UID')
+    if uid and uid.isdigit() and pwd is not None:
+        try:
+            return pwd.getpwuid(int(uid)).pw_name
+        except KeyError:
+            return uid
+    try:
+        return getpass.getuser()
+    except Exception:
+        return str(os.getuid()) if hasattr(os, 'getuid') else "desconocido"
+
+
+def cambios_entre(anteriores, actuales):
+    """
+    Compara dos resultados de ModeloExports.exportaciones()
+    Retorna una lista de (accion, ruta, host, opciones_antes, opciones_despues)
+    ordenada por ruta y host; las opciones son None en altas (antes) y bajas (después)
+    """
+    cambios, bajas = diferencia_exportaciones(anteriores, actuales)
+    resultado = [('baja', ruta, host, anteriores[(ruta, host)], None) for ruta, host in bajas]
+    for (ruta, host), opciones in cambios.items():
+        anterior = anteriores.get((ruta, host))
+        accion = 'alta' if anterior is None else 'modificacion'
+        resultado.append((accion, ruta, host, anterior, opciones))
+    resultado.sort(key=lambda cambio: (cambio[1], cambio[2]))
+    return resultado
+
+
+def _texto_opciones(opciones):
+    return None if opciones is None else ",".join(opciones)
+
+
+def _lista_opciones(texto):
+    if texto is None:
+        return None
+    return [opcion for opcion in texto.split(',') if opcion]
+
+
+class RegistroAuditoria:
+    """
+    Catálogo SQLite de cambios por par ruta/host
+    Los triggers rechazan UPDATE y DELETE: el historial solo crece
+    """
+
+    def __init__(self, ruta_db):
+        self.ruta_db = ruta_db
+        directorio = os.path.dirname(os.path.abspath(ruta_db))
+        if not os.path.exists(directorio):
+            os.makedirs(directorio)
+
+        self.conexion = sqlite3.connect(ruta_db)
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS cambios ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " fecha REAL NOT NULL,"
+            " usuario TEXT NOT NULL,"
+            " archivo TEXT NOT NULL,"
+            " origen TEXT NOT NULL,"
+            " accion TEXT NOT NULL,"
+            " ruta TEXT NOT NULL,"
+            " host TEXT NOT NULL,"
+            " antes TEXT,"
+            " despues TEXT)"
+        )
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS cambios_ruta ON cambios (ruta, fecha)")
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS cambios_host ON cambios (host, fecha)")
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS cambios_fecha ON cambios (fecha)")
+        for operacion in ('UPDATE', 'DELETE'):
+            self.conexion.execute(
+                "CREATE TRIGGER IF NOT EXISTS cambios_sin_{0} BEFORE {1} ON cambios "
+                "BEGIN SELECT RAISE(ABORT, 'el registro de auditoría solo admite altas'); END".format(
+                    operacion.lower(), operacion
+                )
+            )
+        self.conexion.commit()
+
+    def registrar(self, archivo, cambios, origen, usuario=None, fecha=None):
+        """
+        Agrega los cambios (resultado de cambios_entre) en una sola transacción
+        origen indica qué los produjo ('transaccion', 'restauracion'...)
+        Retorna el número de filas agregadas
+        """
+        if not cambios:
+            return 0
+        usuario = usuario or usuario_actual()
+        fecha = time.time() if fecha is None else fecha
+        with self.conexion:
+            self.conexion.executemany(
+                "INSERT INTO cambios (fecha, usuario, archivo, origen, accion, ruta, host, antes, despues)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (fecha, usuario, archivo, origen, accion, ruta, host,
+                     _texto_opciones(antes), _texto_opciones(despues))
+                    for accion, ruta, host, antes, despues in cambios
+                ]
+            )
+        return len(cambios)
+
+    def historial(self, ruta=None, host=None, desde=None, hasta=None, limite=LIMITE_HISTORIAL):
+        """
+        Retorna los cambios más recientes primero, como lista de {'id', 'fecha', 'usuario',
+        'archivo', 'origen', 'accion', 'ruta', 'host', 'antes', 'despues'}
+        ruta y host filtran por igualdad (usan sus índices); desde/hasta son timestamps
+        """
+        condiciones = []
+        parametros = []
+        if ruta is not None:
+            condiciones.append("ruta = ?")
+            parametros.append(normalizar_ruta(ruta))
+        if host is not None:
+            condiciones.append("host = ?")
+            parametros.append(host)
+        if desde is not None:
+            condiciones.append("fecha >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append("fecha <= ?")
+            parametros.append(hasta)
+
+        consulta = ("SELECT id, fecha, usuario, archivo, origen, accion, ruta, host, antes, despues"
+                    " FROM cambios")
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += " ORDER BY fecha DESC, id DESC"
+        if limite is not None:
+            consulta += " LIMIT ?"
+            parametros.append(limite)
+
+        return [
+            {
+                'id': fila[0], 'fecha': fila[1], 'usuario': fila[2], 'archivo': fila[3],
+                'origen': fila[4], 'accion': fila[5], 'ruta': fila[6], 'host': fila[7],
+                'antes': _lista_opciones(fila[8]), 'despues': _lista_opciones(fila[9]),
+            }
+            for fila in self.conexion.execute(consulta, parametros)
+        ]
+
+    def cerrar(self):
+        self.conexion.close()
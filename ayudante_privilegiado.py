@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Ayudante privilegiado persistente
+Un proceso root (lanzado una sola vez con sudo) atiende por un socket Unix
+un conjunto cerrado de operaciones tipadas (exportfs, mount, umount...),
+en lugar de pagar sudo y una shell en cada comando
+
+Protocolo: una línea JSON por solicitud y por respuesta
+    -> {"id": 1, "operacion": "exportfs_exportar", "argumentos": {...}}
+    <- {"id": 1, "success": true, "stdout": "...", "stderr": "...", "codigo": 0, "duracion": 0.01}
+
+Uso del lado privilegiado (lo hace ClienteAyudante):
+    sudo -n python3 ayudante_privilegiado.py --padre PID
+El socket siempre es DIRECTORIO_SOCKETS/ayudante-<uid>-<pid>.sock, con el uid
+de SUDO_UID: el llamador no elige ninguna ruta que root vaya a tocar
+"""
+import os
+import re
+import sys
+import stat
+import json
+import time
+import atexit
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+import socketserver
+
+from utils.ejecucion import ejecutar
+
+
+RUTA_SCRIPT = os.path.abspath(__file__)
+DIRECTORIO_SOCKETS = "/run/configurador-nfs"
+
+# Segundos que se espera a que el ayudante cree su socket
+ESPERA_INICIO = 10
+
+# Cada cuánto comprueba el ayudante que el proceso que lo lanzó sigue vivo
+INTERVALO_VIGILANCIA = 5
+
+MENSAJE_SIN_PERMISOS = (
+    "Se requieren permisos de root.\n\n"
+    "Ejecute la aplicación como:\n"
+    "sudo python3 main.py\n\n"
+    "O configure sudoers para permitir el ayudante sin contraseña:\n"
+    "sudo visudo\n"
+    "# Agregue esta línea al final:\n"
+    "%sudo ALL=(ALL) NOPASSWD: /usr/bin/python3 {0} --padre *"
+).format(RUTA_SCRIPT)
+
+# Nada puede empezar por '-' (se confundiría con una opción del comando)
+_DESTINO_EXPORTFS = re.compile(r'^[^\s-]\S*:/[^\x00\n]*$')
+_OPCION = re.compile(r'^[A-Za-z0-9_]+(=[A-Za-z0-9_.:@/+-]+)?$')
+_SERVIDOR = re.compile(r'^[A-Za-z0-9_.\[][A-Za-z0-9_.:\[\]-]*$')
+
+SERVICIOS_PERMITIDOS = ('nfs-server', 'nfsserver', 'rpcbind')
+
+
+# ---------------------------------------------------------------------------
+# Operaciones permitidas
+# ---------------------------------------------------------------------------
+
+def _texto(argumentos, nombre):
+    valor = argumentos.get(nombre)
+    if not isinstance(valor, str) or not valor or '\x00' in valor or '\n' in valor:
+        raise ValueError("Argumento '{0}' no válido".format(nombre))
+    return valor
+
+
+def _ruta_absoluta(argumentos, nombre):
+    valor = _texto(argumentos, nombre)
+    if not valor.startswith('/'):
+        raise ValueError("'{0}' debe ser una ruta absoluta".format(nombre))
+    return valor
+
+
+def _destinos(argumentos):
+    destinos = argumentos.get('destinos')
+    if not isinstance(destinos, list) or not destinos:
+        raise ValueError("Se requiere una lista de destinos host:/ruta")
+    for destino in destinos:
+        if not isinstance(destino, str) or not _DESTINO_EXPORTFS.match(destino):
+            raise ValueError("Destino no válido: {0!r}".format(destino))
+    return destinos
+
+
+def _opciones(argumentos, nombre='opciones'):
+    opciones = argumentos.get(nombre) or []
+    if not isinstance(opciones, list):
+        raise ValueError("'{0}' debe ser una lista".format(nombre))
+    for opcion in opciones:
+        if not isinstance(opcion, str) or not _OPCION.match(opcion):
+            raise ValueError("Opción no válida: {0!r}".format(opcion))
+    return opciones
+
+
+def _servicio(argumentos):
+    servicio = _texto(argumentos, 'servicio')
+    if servicio not in SERVICIOS_PERMITIDOS:
+        raise ValueError("Servicio no permitido: {0}".format(servicio))
+    return servicio
+
+
+def _hilos(argumentos):
+    hilos = argumentos.get('hilos')
+    if isinstance(hilos, bool) or not isinstance(hilos, int) or not 1 <= hilos <= 1024:
+        raise ValueError("Número de hilos no válido: {0!r}".format(hilos))
+    return str(hilos)
+
+
+def _exportfs_exportar(argumentos):
+    comando = ['exportfs', '-i']
+    opciones = _opciones(argumentos)
+    if opciones:
+        comando += ['-o', ",".join(opciones)]
+    return comando + _destinos(argumentos)
+
+
+def _montar(argumentos):
+    servidor = _texto(argumentos, 'servidor')
+    if not _SERVIDOR.match(servidor):
+        raise ValueError("Servidor no válido: {0}".format(servidor))
+    comando = ['mount', '-t', 'nfs']
+    opciones = _opciones(argumentos)
+    if opciones:
+        comando += ['-o', ",".join(opciones)]
+    return comando + [
+        "{0}:{1}".format(servidor, _ruta_absoluta(argumentos, 'ruta_remota')),
+        _ruta_absoluta(argumentos, 'punto_montaje')
+    ]
+
+
+# nombre -> (construir argv a partir de los argumentos, requiere root, timeout)
+OPERACIONES = {
+    'exportfs_recargar': (lambda a: ['exportfs', '-ra'], True, 30),
+    'exportfs_exportar': (_exportfs_exportar, True, 30),
+    'exportfs_retirar': (lambda a: ['exportfs', '-u'] + _destinos(a), True, 30),
+    'montar': (_montar, True, 60),
+    'desmontar': (lambda a: ['umount', _ruta_absoluta(a, 'punto_montaje')], True, 60),
+    'listar': (lambda a: ['ls', '-lA', '--', _ruta_absoluta(a, 'ruta')], True, 30),
+    'iniciar_servicio': (lambda a: ['systemctl', 'start', _servicio(a)], True, 60),
+    'ajustar_hilos_nfsd': (lambda a: ['rpc.nfsd', _hilos(a)], True, 30),
+    'estado_servicio': (lambda a: ['systemctl', 'is-active', _servicio(a)], False, 10),
+}
+
+
+def construir_comando(operacion, argumentos):
+    """
+    Valida una operación y sus argumentos
+    Retorna (argv, requiere_root, timeout); ValueError si no está permitida
+    """
+    if operacion not in OPERACIONES:
+        raise ValueError("Operación no permitida: {0}".format(operacion))
+    if not isinstance(argumentos, dict):
+        raise ValueError("Los argumentos deben ser un diccionario")
+    construir, requiere_root, timeout = OPERACIONES[operacion]
+    return construir(argumentos), requiere_root, timeout
+
+
+def resultado_error(mensaje, codigo=-1, duracion=0.0):
+    return {"success": False, "stdout": "", "stderr": mensaje, "codigo": codigo, "duracion": duracion}
+
+
+def ejecutar_argv(comando, timeout):
+    """Ejecuta un argv sin shell y retorna el resultado en el formato del protocolo"""
+    return ejecutar(comando, timeout=timeout).como_diccionario()
+
+
+def ejecutar_operacion(operacion, argumentos):
+    """Valida y ejecuta una operación en este proceso"""
+    try:
+        comando, _, timeout = construir_comando(operacion, argumentos)
+    except ValueError as e:
+        return resultado_error(str(e))
+    return ejecutar_argv(comando, timeout)
+
+
+# ---------------------------------------------------------------------------
+# Lado privilegiado
+# ---------------------------------------------------------------------------
+
+class _ManejadorSolicitudes(socketserver.StreamRequestHandler):
+    """Atiende las solicitudes de una conexión, una por línea"""
+
+    def handle(self):
+        if not self.server.conexion_autorizada(self.request):
+            return
+
+        for linea in self.rfile:
+            identificador = None
+            try:
+                solicitud = json.loads(linea.decode())
+                identificador = solicitud.get('id')
+                operacion = solicitud['operacion']
+                if operacion == 'salir':
+                    respuesta = {"success": True, "stdout": "", "stderr": "", "codigo": 0, "duracion": 0.0}
+                    threading.Thread(target=self.server.shutdown).start()
+                else:
+                    respuesta = ejecutar_operacion(operacion, solicitud.get('argumentos') or {})
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                respuesta = resultado_error("Solicitud no válida: {0}".format(e))
+
+            respuesta['id'] = identificador
+            self.wfile.write((json.dumps(respuesta) + "\n").encode())
+            self.wfile.flush()
+
+
+class ServidorAyudante(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor del socket; solo acepta conexiones del usuario que lo lanzó (o de root)"""
+
+    daemon_threads = True
+
+    def __init__(self, ruta_socket, uid_permitido):
+        self.uid_permitido = uid_permitido
+        socketserver.UnixStreamServer.__init__(self, ruta_socket, _ManejadorSolicitudes)
+
+    def conexion_autorizada(self, conexion):
+        credenciales = conexion.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', credenciales)
+        return uid in (0, self.uid_permitido)
+
+
+def ruta_socket(uid, pid):
+    """Ruta del socket del ayudante de la aplicación pid del usuario uid"""
+    return os.path.join(DIRECTORIO_SOCKETS, "ayudante-{0}-{1}.sock".format(uid, pid))
+
+
+def _preparar_directorio_sockets():
+    """
+    Crea DIRECTORIO_SOCKETS si no existe
+    ValueError si la ruta existe pero no es un directorio de root (por ejemplo un enlace)
+    """
+    try:
+        estado = os.lstat(DIRECTORIO_SOCKETS)
+    except FileNotFoundError:
+        os.makedirs(DIRECTORIO_SOCKETS, 0o755)
+        estado = os.lstat(DIRECTORIO_SOCKETS)
+    if not stat.S_ISDIR(estado.st_mode) or estado.st_uid != 0:
+        raise ValueError("{0} no es un directorio de root".format(DIRECTORIO_SOCKETS))
+
+
+def _eliminar_socket(ruta):
+    """Elimina ruta solo si es un socket (nunca otro tipo de archivo)"""
+    try:
+        if stat.S_ISSOCK(os.lstat(ruta).st_mode):
+            os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _vigilar_padre(servidor, pid):
+    """Detiene el ayudante cuando termina la aplicación que lo lanzó"""
+    while os.path.exists("/proc/{0}".format(pid)):
+        time.sleep(INTERVALO_VIGILANCIA)
+    servidor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ayudante privilegiado del Configurador NFS")
+    parser.add_argument('--padre', type=int, required=True)
+    argumentos = parser.parse_args()
+
+    if os.geteuid() != 0:
+        print("El ayudante debe ejecutarse como root", file=sys.stderr)
+        return 1
+
+    # El usuario lo fija sudo, no los argumentos
+    uid = os.environ.get('SUDO_UID', "")
+    if not uid.isdigit():
+        print("El ayudante debe lanzarse con sudo (falta SUDO_UID)", file=sys.stderr)
+        return 1
+    uid = int(uid)
+
+    try:
+        _preparar_directorio_sockets()
+    except (OSError, ValueError) as e:
+        print("No se pudo preparar {0}: {1}".format(DIRECTORIO_SOCKETS, e), file=sys.stderr)
+        return 1
+    ruta = ruta_socket(uid, argumentos.padre)
+    if os.path.lexists(ruta) and not stat.S_ISSOCK(os.lstat(ruta).st_mode):
+        print("{0} existe y no es un socket".format(ruta), file=sys.stderr)
+        return 1
+    _eliminar_socket(ruta)
+
+    # El socket se crea sin permisos y solo después se entrega al usuario
+    mascara = os.umask(0o177)
+    try:
+        servidor = ServidorAyudante(ruta, uid)
+    finally:
+        os.umask(mascara)
+    os.chown(ruta, uid, -1)
+
+    vigilante = threading.Thread(target=_vigilar_padre, args=(servidor, argumentos.padre))
+    vigilante.daemon = True
+    vigilante.start()
+
+    try:
+        servidor.serve_forever()
+    finally:
+        servidor.server_close()
+        _eliminar_socket(ruta)
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Lado de la aplicación
+# ---------------------------------------------------------------------------
+
+class ClienteAyudante:
+    """
+    Conexión persistente con el ayudante
+    - Como root, o para operaciones que no lo requieren, ejecuta directamente
+    - Si no, lanza el ayudante con sudo -n la primera vez y reutiliza el socket
+    - Si el ayudante no puede iniciarse, cae a sudo -n por comando
+    """
+
+    def __init__(self):
+        self.es_root = os.geteuid() == 0 if hasattr(os, 'geteuid') else False
+        uid = os.getuid() if hasattr(os, 'getuid') else 0
+        self.ruta_socket = ruta_socket(uid, os.getpid())
+        self._proceso = None
+        self._conexion = None
+        self._archivo = None
+        self._siguiente_id = 1
+        self._bloqueo = threading.Lock()
+        self._no_disponible = None
+
+    def _conectar(self):
+        conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conexion.connect(self.ruta_socket)
+        except OSError:
+            conexion.close()
+            raise
+        self._conexion = conexion
+        self._archivo = conexion.makefile('rwb')
+
+    def _cerrar_conexion(self):
+        for recurso in (self._archivo, self._conexion):
+            if recurso is not None:
+                try:
+                    recurso.close()
+                except OSError:
+                    pass
+        self._archivo = None
+        self._conexion = None
+
+    def _iniciar(self):
+        """Lanza el ayudante y espera a que su socket acepte conexiones"""
+        self._proceso = subprocess.Popen(
+            [
+                'sudo', '-n', sys.executable, RUTA_SCRIPT,
+                '--padre', str(os.getpid())
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            start_new_session=True
+        )
+
+        limite = time.monotonic() + ESPERA_INICIO
+        while time.monotonic() < limite:
+            if self._proceso.poll() is not None:
+                error = self._proceso.stderr.read().strip()
+                self._proceso = None
+                raise OSError(error or "El ayudante terminó al iniciar")
+            try:
+                self._conectar()
+                return
+            except OSError:
+                time.sleep(0.05)
+        raise OSError("El ayudante no respondió en {0} s".format(ESPERA_INICIO))
+
+    def _solicitar(self, operacion, argumentos):
+        identificador = self._siguiente_id
+        self._siguiente_id += 1
+        mensaje = {"id": identificador, "operacion": operacion, "argumentos": argumentos}
+        self._archivo.write((json.dumps(mensaje) + "\n").encode())
+        self._archivo.flush()
+        linea = self._archivo.readline()
+        if not linea:
+            raise OSError("El ayudante cerró la conexión")
+        respuesta = json.loads(linea.decode())
+        respuesta.pop('id', None)
+        return respuesta
+
+    def _ejecutar_con_sudo(self, comando, timeout):
+        resultado = ejecutar_argv(['sudo', '-n'] + comando, timeout)
+        stderr = resultado["stderr"].lower()
+        if not resultado["success"] and ("a password is required" in stderr or "no password" in stderr):
+            resultado["stderr"] = MENSAJE_SIN_PERMISOS
+        return resultado
+
+    def ejecutar(self, operacion, **argumentos):
+        """
+        Ejecuta una operación permitida
+        Retorna {"success", "stdout", "stderr", "codigo", "duracion"}
+        """
+        try:
+            comando, requiere_root, timeout = construir_comando(operacion, argumentos)
+        except ValueError as e:
+            return resultado_error(str(e))
+
+        if self.es_root or not requiere_root:
+            return ejecutar_argv(comando, timeout)
+
+        with self._bloqueo:
+            if self._no_disponible is None:
+                # Un reintento: el ayudante pudo haber terminado entre dos operaciones
+                error = None
+                for _ in range(2):
+                    try:
+                        if self._archivo is None:
+                            if self._proceso is not None and self._proceso.poll() is None:
+                                self._conectar()
+                            else:
+                                self._iniciar()
+                        return self._solicitar(operacion, argumentos)
+                    except (OSError, ValueError) as e:
+                        self._cerrar_conexion()
+                        error = e
+                        if self._proceso is None:
+                            break
+                self._no_disponible = str(error)
+                _registrar_aviso("Ayudante privilegiado no disponible ({0}), se usará sudo por comando".format(
+                    self._no_disponible
+                ))
+
+        return self._ejecutar_con_sudo(comando, timeout)
+
+    def detener(self):
+        """Detiene el ayudante (si se lanzó) y cierra la conexión"""
+        with self._bloqueo:
+            if self._archivo is not None:
+                try:
+                    self._solicitar('salir', {})
+                except (OSError, ValueError):
+                    pass
+            self._cerrar_conexion()
+            if self._proceso is not None:
+                try:
+                    self._proceso.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    pass
+                self._proceso = None
+
+
+def _registrar_aviso(mensaje):
+    # El logger se importa aquí para que el lado privilegiado no lo necesite
+    from utils.logger import logger
+    logger.warning(mensaje)
+
+
+_ayudante = None
+_bloqueo_ayudante = threading.Lock()
+
+
+def obtener_ayudante():
+    """Retorna el ClienteAyudante compartido por toda la aplicación"""
+    global _ayudante
+    with _bloqueo_ayudante:
+        if _ayudante is None:
+            _ayudante = ClienteAyudante()
+            atexit.register(_ayudante.detener)
+        return _ayudante
+
+
+if __name__ == "__main__":
+    sys.exit(main())
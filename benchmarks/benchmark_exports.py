@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parser de exports
+Genera un archivo exports sintético, mide el parseo y verifica que el
+documento reproduce el texto original byte a byte
+El objetivo (OBJETIVO_SEGUNDOS para 100k líneas) se aplica a parsear(); cargar_modelo()
+añade la lectura del archivo y un diccionario de configuración por línea
+
+Uso: python3 benchmarks/benchmark_exports.py [lineas] [repeticiones]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser_exports import parsear, sin_recolector_de_ciclos
+from modelo_exports import cargar_modelo, configuracion_desde_entrada
+
+
+# Segundos que puede tardar parsear() por cada 100k líneas
+OBJETIVO_SEGUNDOS = 1.0
+
+
+def generar_exports(lineas, semilla=42):
+    """
+    Genera el texto de un archivo exports con la mezcla habitual de un servidor grande:
+    sobre todo líneas simples, y algunas con varios clientes, comentarios,
+    continuaciones, rutas entre comillas y opciones por defecto
+    """
+    aleatorio = random.Random(semilla)
+    partes = []
+    for i in range(lineas):
+        red = "10.{0}.{1}.0/24".format(i // 256 % 256, i % 256)
+        tipo = aleatorio.random()
+        if tipo < 0.02:
+            partes.append("# Grupo {0}\n".format(i))
+        elif tipo < 0.03:
+            partes.append("\n")
+        elif tipo < 0.13:
+            partes.append("/srv/proyectos/p{0} {1}(rw,sync,no_subtree_check) 192.168.{2}.5(ro) # equipo {0}\n".format(
+                i, red, i % 256
+            ))
+        elif tipo < 0.15:
+            partes.append("/srv/compartido/c{0} {1}(rw,sync) \\\n    192.168.{2}.0/24(ro,root_squash)\n".format(
+                i, red, i % 256
+            ))
+        elif tipo < 0.16:
+            partes.append('"/srv/con espacios/e{0}" {1}(ro)\n'.format(i, red))
+        elif tipo < 0.17:
+            partes.append("/srv/defecto/d{0} -sync,no_subtree_check {1} host{0}.ejemplo(rw)\n".format(i, red))
+        else:
+            partes.append("/srv/datos/d{0} {1}(rw,sync,no_subtree_check,fsid={2})\n".format(
+                i, red, i % 9999 + 1
+            ))
+    return "".join(partes)
+
+
+def medir(funcion, repeticiones):
+    """Retorna el mejor tiempo (en segundos) de varias ejecuciones"""
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        if mejor is None or duracion < mejor:
+            mejor = duracion
+    return mejor, resultado
+
+
+def main():
+    lineas = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    texto = generar_exports(lineas)
+    print("Archivo sintético: {0} líneas, {1:.1f} MB".format(
+        texto.count("\n"), len(texto.encode()) / (1024 * 1024)
+    ))
+
+    tiempo, documento = medir(lambda: parsear(texto), repeticiones)
+    entradas = documento.entradas()
+    clientes = sum(len(entrada.clientes) for entrada in entradas)
+    print("parsear():       {0:.3f} s  ({1} entradas, {2} clientes)".format(tiempo, len(entradas), clientes))
+    objetivo = OBJETIVO_SEGUNDOS * lineas / 100000
+    if tiempo > objetivo:
+        print("[ERROR] El parseo supera el objetivo de {0:.2f} s".format(objetivo))
+        return 1
+
+    if documento.texto() != texto:
+        print("[ERROR] El documento no reproduce el texto original")
+        return 1
+    print("Ida y vuelta:    idéntico byte a byte")
+
+    def convertir():
+        with sin_recolector_de_ciclos():
+            return [configuracion_desde_entrada(entrada) for entrada in entradas]
+    tiempo, _ = medir(convertir, repeticiones)
+    print("configuraciones: {0:.3f} s  (un diccionario por entrada)".format(tiempo))
+
+    descriptor, ruta = tempfile.mkstemp(prefix="exports-benchmark-")
+    try:
+        with os.fdopen(descriptor, 'w', newline='') as f:
+            f.write(texto)
+        tiempo, modelo = medir(lambda: cargar_modelo(ruta), repeticiones)
+        print("cargar_modelo(): {0:.3f} s  ({1} configuraciones, lectura incluida)".format(tiempo, len(modelo)))
+    finally:
+        os.remove(ruta)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
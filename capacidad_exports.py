@@ -0,0 +1,149 @@
+"""
+Capacidad de los filesystems exportados
+Usa os.statvfs (sin lanzar df) una sola vez por filesystem aunque varias
+exportaciones compartan disco, guarda las medidas unos segundos y estima
+el ritmo de crecimiento con las medidas anteriores
+"""
+import os
+import time
+import threading
+from collections import deque
+
+
+# Segundos que se reutiliza una medida del mismo filesystem
+TTL_CACHE = 5.0
+
+# Medidas que se conservan por filesystem para estimar el crecimiento
+MUESTRAS_CRECIMIENTO = 720
+
+# Segundos mínimos entre la primera y la última medida para estimar el crecimiento
+INTERVALO_MINIMO_CRECIMIENTO = 30.0
+
+_UNIDADES = ('B', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB')
+
+
+def formatear_bytes(valor):
+    """Retorna valor en la unidad binaria más adecuada (ej: '1.5 GiB')"""
+    valor = float(valor)
+    for unidad in _UNIDADES:
+        if abs(valor) < 1024 or unidad == _UNIDADES[-1]:
+            return "{0:.1f} {1}".format(valor, unidad) if unidad != 'B' else "{0:.0f} B".format(valor)
+        valor /= 1024
+
+
+def punto_montaje(ruta):
+    """Retorna el punto de montaje del filesystem que contiene ruta"""
+    ruta = os.path.realpath(ruta)
+    while not os.path.ismount(ruta):
+        ruta = os.path.dirname(ruta)
+    return ruta
+
+
+def medir_filesystem(ruta):
+    """
+    Mide el filesystem que contiene ruta con os.statvfs
+    Retorna {'total', 'usados', 'libres', 'porcentaje', 'inodos_total',
+    'inodos_usados', 'inodos_libres', 'porcentaje_inodos'} (bytes e inodos);
+    'libres' es el espacio disponible para usuarios sin privilegios, como en df
+    OSError si la ruta no existe o no es accesible
+    """
+    estado = os.statvfs(ruta)
+    total = estado.f_blocks * estado.f_frsize
+    usados = (estado.f_blocks - estado.f_bfree) * estado.f_frsize
+    libres = estado.f_bavail * estado.f_frsize
+    inodos_usados = estado.f_files - estado.f_ffree
+
+    # Igual que df: el espacio reservado para root no cuenta como disponible
+    utilizable = usados + libres
+    return {
+        'total': total,
+        'usados': usados,
+        'libres': libres,
+        'porcentaje': 100.0 * usados / utilizable if utilizable else 0.0,
+        'inodos_total': estado.f_files,
+        'inodos_usados': inodos_usados,
+        'inodos_libres': estado.f_favail,
+        'porcentaje_inodos': 100.0 * inodos_usados / estado.f_files if estado.f_files else 0.0,
+    }
+
+
+def pendiente(puntos):
+    """Pendiente por mínimos cuadrados de una secuencia de (x, y)"""
+    n = len(puntos)
+    media_x = sum(x for x, _ in puntos) / n
+    media_y = sum(y for _, y in puntos) / n
+    varianza = sum((x - media_x) ** 2 for x, _ in puntos)
+    if not varianza:
+        return 0.0
+    return sum((x - media_x) * (y - media_y) for x, y in puntos) / varianza
+
+
+class MonitorCapacidad:
+    """
+    Mide la capacidad de muchas rutas agrupándolas por filesystem (st_dev)
+    Cada filesystem se mide como mucho una vez cada ttl segundos
+    """
+
+    def __init__(self, ttl=TTL_CACHE):
+        self.ttl = ttl
+        # dispositivo -> (instante, datos del filesystem)
+        self._cache = {}
+        # dispositivo -> deque de (instante, bytes usados)
+        self._historial = {}
+        self._bloqueo = threading.Lock()
+
+    def _medir_dispositivo(self, dispositivo, ruta):
+        ahora = time.monotonic()
+        en_cache = self._cache.get(dispositivo)
+        if en_cache is not None and ahora - en_cache[0] < self.ttl:
+            return en_cache[1]
+
+        datos = medir_filesystem(ruta)
+        datos['dispositivo'] = dispositivo
+        anterior = en_cache[1] if en_cache is not None else None
+        datos['punto_montaje'] = anterior['punto_montaje'] if anterior else punto_montaje(ruta)
+
+        historial = self._historial.setdefault(dispositivo, deque(maxlen=MUESTRAS_CRECIMIENTO))
+        historial.append((ahora, datos['usados']))
+        datos['crecimiento'] = self._estimar_crecimiento(historial)
+        if datos['crecimiento'] and datos['crecimiento'] > 0:
+            datos['horas_hasta_lleno'] = datos['libres'] / datos['crecimiento'] / 3600.0
+        else:
+            datos['horas_hasta_lleno'] = None
+
+        self._cache[dispositivo] = (ahora, datos)
+        return datos
+
+    @staticmethod
+    def _estimar_crecimiento(historial):
+        """Bytes por segundo (None si las medidas cubren poco tiempo)"""
+        if len(historial) < 2 or historial[-1][0] - historial[0][0] < INTERVALO_MINIMO_CRECIMIENTO:
+            return None
+        return pendiente(historial)
+
+    def medir(self, rutas):
+        """
+        Mide la capacidad de cada ruta
+        Retorna una lista (en el orden de rutas) de {'ruta', 'filesystem', 'error'}:
+        'filesystem' es el diccionario de medir_filesystem con 'dispositivo',
+        'punto_montaje', 'crecimiento' (bytes/s o None) y 'horas_hasta_lleno';
+        las rutas del mismo filesystem comparten el mismo diccionario
+        """
+        resultado = []
+        medidos = {}
+        with self._bloqueo:
+            for ruta in rutas:
+                try:
+                    dispositivo = os.stat(ruta).st_dev
+                    filesystem = medidos.get(dispositivo)
+                    if filesystem is None:
+                        filesystem = medidos[dispositivo] = self._medir_dispositivo(dispositivo, ruta)
+                    resultado.append({'ruta': ruta, 'filesystem': filesystem, 'error': None})
+                except OSError as e:
+                    resultado.append({'ruta': ruta, 'filesystem': None, 'error': e.strerror or str(e)})
+        return resultado
+
+    def invalidar(self):
+        """Descarta las medidas en caché (el historial de crecimiento se conserva)"""
+        with self._bloqueo:
+            self._cache.clear()
@@ -3,8 +3,8 @@ Cliente NFS
 Basado en anistopera con mejoras
 """
 import os
-import subprocess
 
+from ayudante_privilegiado import obtener_ayudante
 from utils.validaciones import validar_ip, validar_punto_montaje
 from utils.logger import logger
 
@@ -20,25 +20,12 @@ class ClienteNFS:
         self.es_root = os.geteuid() == 0 if hasattr(os, 'geteuid') else False
         logger.info("ClienteNFS inicializado")
 
-    def _run_command(self, command):
+    def _ejecutar_operacion(self, operacion, **argumentos):
         """
-        Ejecuta un comando en el sistema y devuelve el resultado
+        Ejecuta una operación del sistema (mount, umount, ls) a través del
+        ayudante privilegiado persistente, sin shell ni un sudo por comando
         """
-        try:
-            if not self.es_root and not command.startswith("sudo"):
-                command = "sudo {0}".format(command)
-            
-            result = subprocess.run(
-                command,
-                shell=True,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            return {"success": True, "stdout": result.stdout, "stderr": result.stderr}
-        except subprocess.CalledProcessError as e:
-            return {"success": False, "stdout": e.stdout, "stderr": e.stderr}
+        return obtener_ayudante().ejecutar(operacion, **argumentos)
 
     def montar_recurso(self, ip_master, ruta_remota):
         """
@@ -76,14 +63,17 @@ class ClienteNFS:
             return {"success": True, "message": "[OK] El recurso ya estaba montado en {0}".format(self.punto_montaje)}
         
         # Primero intentar con versión 3 (más compatible)
-        mount_command = "mount -t nfs -o vers=3 {0}:{1} {2}".format(ip_master, ruta_remota, self.punto_montaje)
-        mount_result = self._run_command(mount_command)
+        mount_result = self._ejecutar_operacion(
+            'montar', servidor=ip_master, ruta_remota=ruta_remota,
+            punto_montaje=self.punto_montaje, opciones=['vers=3']
+        )
 
         # Si falla con vers=3, intentar sin especificar versión
         if not mount_result["success"]:
             logger.info("Reintentando montaje sin especificar versión de NFS")
-            mount_command = "mount -t nfs {0}:{1} {2}".format(ip_master, ruta_remota, self.punto_montaje)
-            mount_result = self._run_command(mount_command)
+            mount_result = self._ejecutar_operacion(
+                'montar', servidor=ip_master, ruta_remota=ruta_remota, punto_montaje=self.punto_montaje
+            )
 
         if not mount_result["success"]:
             stderr = mount_result["stderr"].lower()
@@ -115,7 +105,7 @@ class ClienteNFS:
             logger.info("El recurso no estaba montado")
             return {"success": True, "message": "[INFO] El recurso no estaba montado"}
 
-        umount_result = self._run_command("umount {0}".format(self.punto_montaje))
+        umount_result = self._ejecutar_operacion('desmontar', punto_montaje=self.punto_montaje)
         if umount_result["success"]:
             logger.exito("Recurso desmontado")
             return {"success": True, "message": "[OK] Recurso desmontado con éxito"}
@@ -135,7 +125,7 @@ class ClienteNFS:
             logger.error("El recurso no está montado")
             return {"success": False, "message": "[ERROR] El recurso no está montado"}
         
-        list_result = self._run_command("ls -lA {0}".format(self.punto_montaje))
+        list_result = self._ejecutar_operacion('listar', ruta=self.punto_montaje)
         if list_result["success"]:
             logger.info("Contenido listado correctamente")
             return {"success": True, "message": "[INFO] Contenido del recurso compartido:", "data": list_result["stdout"]}
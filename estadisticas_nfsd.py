@@ -0,0 +1,274 @@
+"""
+Estadísticas del servidor NFS leídas directamente del kernel
+Parsea /proc/net/rpc/nfsd y /proc/fs/nfsd/pool_stats (sin lanzar nfsstat)
+y calcula tasas por segundo entre dos lecturas
+"""
+import time
+import threading
+from collections import deque
+
+from utils.logger import logger
+
+
+RUTA_NFSD = "/proc/net/rpc/nfsd"
+RUTA_POOL_STATS = "/proc/fs/nfsd/pool_stats"
+RUTA_HILOS = "/proc/fs/nfsd/threads"
+
+# Segundos entre muestras del colector en segundo plano
+INTERVALO_MUESTREO = 2.0
+
+# Muestras que se conservan para el panel
+MUESTRAS_HISTORIAL = 150
+
+# Nombres de las operaciones de cada versión, en el orden en que aparecen en /proc
+OPERACIONES_V2 = (
+    'NULL', 'GETATTR', 'SETATTR', 'ROOT', 'LOOKUP', 'READLINK', 'READ', 'WRCACHE',
+    'WRITE', 'CREATE', 'REMOVE', 'RENAME', 'LINK', 'SYMLINK', 'MKDIR', 'RMDIR',
+    'READDIR', 'FSSTAT'
+)
+OPERACIONES_V3 = (
+    'NULL', 'GETATTR', 'SETATTR', 'LOOKUP', 'ACCESS', 'READLINK', 'READ', 'WRITE',
+    'CREATE', 'MKDIR', 'SYMLINK', 'MKNOD', 'REMOVE', 'RMDIR', 'RENAME', 'LINK',
+    'READDIR', 'READDIRPLUS', 'FSSTAT', 'FSINFO', 'PATHCONF', 'COMMIT'
+)
+# En proc4ops la posición es el número de operación de NFSv4 (RFC 7530)
+OPERACIONES_V4 = {
+    3: 'ACCESS', 4: 'CLOSE', 5: 'COMMIT', 6: 'CREATE', 9: 'GETATTR', 15: 'LOOKUP',
+    18: 'OPEN', 25: 'READ', 26: 'READDIR', 28: 'REMOVE', 29: 'RENAME', 34: 'SETATTR',
+    38: 'WRITE'
+}
+
+# Operaciones que se muestran siempre (sumando todas las versiones)
+OPERACIONES_PRINCIPALES = ('READ', 'WRITE', 'GETATTR', 'COMMIT')
+
+
+def _enteros(campos):
+    resultado = []
+    for campo in campos:
+        try:
+            resultado.append(int(campo))
+        except ValueError:
+            resultado.append(0)
+    return resultado
+
+
+def parsear_nfsd(texto):
+    """
+    Parsea el contenido de /proc/net/rpc/nfsd
+    Retorna {'cache': {...}, 'io': {...}, 'hilos', 'red': {...}, 'rpc': {...},
+    'operaciones': {'READ': total, ...}} con contadores acumulados desde el arranque
+    """
+    datos = {
+        'cache': {'aciertos': 0, 'fallos': 0, 'sin_cache': 0},
+        'io': {'leidos': 0, 'escritos': 0},
+        'hilos': 0,
+        'red': {'paquetes': 0, 'udp': 0, 'tcp': 0, 'conexiones_tcp': 0},
+        'rpc': {'llamadas': 0, 'erroneas': 0},
+        'operaciones': {}
+    }
+    operaciones = datos['operaciones']
+
+    for linea in texto.splitlines():
+        campos = linea.split()
+        if not campos:
+            continue
+        clave, valores = campos[0], _enteros(campos[1:])
+
+        if clave == 'rc' and len(valores) >= 3:
+            datos['cache'] = {'aciertos': valores[0], 'fallos': valores[1], 'sin_cache': valores[2]}
+        elif clave == 'io' and len(valores) >= 2:
+            datos['io'] = {'leidos': valores[0], 'escritos': valores[1]}
+        elif clave == 'th' and valores:
+            datos['hilos'] = valores[0]
+        elif clave == 'net' and len(valores) >= 4:
+            datos['red'] = {
+                'paquetes': valores[0], 'udp': valores[1], 'tcp': valores[2], 'conexiones_tcp': valores[3]
+            }
+        elif clave == 'rpc' and len(valores) >= 2:
+            datos['rpc'] = {'llamadas': valores[0], 'erroneas': valores[1]}
+        elif clave in ('proc2', 'proc3') and valores:
+            nombres = OPERACIONES_V2 if clave == 'proc2' else OPERACIONES_V3
+            # El primer valor es el número de contadores que siguen
+            for nombre, valor in zip(nombres, valores[1:]):
+                operaciones[nombre] = operaciones.get(nombre, 0) + valor
+        elif clave == 'proc4ops' and valores:
+            for numero, valor in enumerate(valores[1:]):
+                nombre = OPERACIONES_V4.get(numero)
+                if nombre is not None:
+                    operaciones[nombre] = operaciones.get(nombre, 0) + valor
+        elif clave == 'proc4' and len(valores) >= 3:
+            operaciones['COMPOUND'] = operaciones.get('COMPOUND', 0) + valores[2]
+
+    return datos
+
+
+def parsear_pool_stats(texto):
+    """
+    Parsea /proc/fs/nfsd/pool_stats (una línea por pool de hilos)
+    Retorna la suma de todos los pools: {'paquetes', 'encolados', 'despertados', 'expirados'}
+    'encolados' cuenta las peticiones que llegaron sin ningún hilo libre
+    """
+    total = {'paquetes': 0, 'encolados': 0, 'despertados': 0, 'expirados': 0}
+    for linea in texto.splitlines():
+        if linea.startswith('#') or not linea.strip():
+            continue
+        valores = _enteros(linea.split())
+        if len(valores) >= 5:
+            total['paquetes'] += valores[1]
+            total['encolados'] += valores[2]
+            total['despertados'] += valores[3]
+            total['expirados'] += valores[4]
+    return total
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def leer_estadisticas(ruta_nfsd=RUTA_NFSD, ruta_pool=RUTA_POOL_STATS, ruta_hilos=RUTA_HILOS):
+    """
+    Lee los contadores actuales del servidor
+    Retorna el diccionario de parsear_nfsd con 'instante' y 'pool', o None si
+    el kernel no expone estadísticas de nfsd (módulo no cargado)
+    """
+    texto = _leer(ruta_nfsd)
+    if texto is None:
+        return None
+
+    datos = parsear_nfsd(texto)
+    datos['instante'] = time.monotonic()
+
+    texto_pool = _leer(ruta_pool)
+    datos['pool'] = parsear_pool_stats(texto_pool) if texto_pool is not None else None
+
+    texto_hilos = _leer(ruta_hilos)
+    if texto_hilos is not None and texto_hilos.strip().isdigit():
+        datos['hilos'] = int(texto_hilos.strip())
+    return datos
+
+
+def _delta(actual, anterior):
+    # Un contador menor que el anterior indica que nfsd se reinició
+    return actual - anterior if actual >= anterior else actual
+
+
+def calcular_tasas(anterior, actual):
+    """
+    Calcula las tasas por segundo entre dos lecturas de leer_estadisticas
+    Retorna {'intervalo', 'operaciones': {nombre: por_segundo}, 'rpc', 'rpc_erroneas',
+    'bytes_leidos', 'bytes_escritos', 'retransmisiones', 'hilos', 'uso_hilos',
+    'encoladas'}; uso_hilos es la fracción de peticiones que esperaron por un hilo
+    (None si no hay pool_stats)
+    """
+    intervalo = actual['instante'] - anterior['instante']
+    if intervalo <= 0:
+        return None
+
+    def tasa(valor_actual, valor_anterior):
+        return _delta(valor_actual, valor_anterior) / intervalo
+
+    operaciones = {}
+    nombres = set(OPERACIONES_PRINCIPALES) | set(actual['operaciones'])
+    for nombre in nombres:
+        operaciones[nombre] = tasa(
+            actual['operaciones'].get(nombre, 0), anterior['operaciones'].get(nombre, 0)
+        )
+
+    uso_hilos = None
+    encoladas = None
+    if actual.get('pool') is not None and anterior.get('pool') is not None:
+        paquetes = _delta(actual['pool']['paquetes'], anterior['pool']['paquetes'])
+        encolados = _delta(actual['pool']['encolados'], anterior['pool']['encolados'])
+        encoladas = encolados / intervalo
+        uso_hilos = min(1.0, encolados / paquetes) if paquetes else 0.0
+
+    return {
+        'intervalo': intervalo,
+        'operaciones': operaciones,
+        'rpc': tasa(actual['rpc']['llamadas'], anterior['rpc']['llamadas']),
+        'rpc_erroneas': tasa(actual['rpc']['erroneas'], anterior['rpc']['erroneas']),
+        'bytes_leidos': tasa(actual['io']['leidos'], anterior['io']['leidos']),
+        'bytes_escritos': tasa(actual['io']['escritos'], anterior['io']['escritos']),
+        # Un acierto de la caché de respuestas es una petición repetida por el cliente
+        'retransmisiones': tasa(actual['cache']['aciertos'], anterior['cache']['aciertos']),
+        'hilos': actual['hilos'],
+        'uso_hilos': uso_hilos,
+        'encoladas': encoladas
+    }
+
+
+class ColectorEstadisticasNfsd:
+    """
+    Muestrea las estadísticas de nfsd cada cierto intervalo en un hilo
+    y conserva un historial de tasas para el panel
+    """
+
+    def __init__(self, intervalo=INTERVALO_MUESTREO, ruta_nfsd=RUTA_NFSD,
+                 ruta_pool=RUTA_POOL_STATS, ruta_hilos=RUTA_HILOS):
+        self.intervalo = intervalo
+        self.rutas = (ruta_nfsd, ruta_pool, ruta_hilos)
+        self.historial = deque(maxlen=MUESTRAS_HISTORIAL)
+        self._anterior = None
+        self._bloqueo = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def muestrear(self):
+        """
+        Toma una lectura y calcula las tasas respecto de la anterior
+        Retorna las tasas, o None en la primera lectura o si no hay datos de nfsd
+        """
+        actual = leer_estadisticas(*self.rutas)
+        if actual is None:
+            return None
+
+        with self._bloqueo:
+            anterior, self._anterior = self._anterior, actual
+            if anterior is None:
+                return None
+            tasas = calcular_tasas(anterior, actual)
+            if tasas is not None:
+                tasas['fecha'] = time.time()
+                self.historial.append(tasas)
+            return tasas
+
+    def ultima_muestra(self):
+        """Retorna las tasas más recientes o None"""
+        with self._bloqueo:
+            return self.historial[-1] if self.historial else None
+
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        """Inicia el muestreo periódico en segundo plano"""
+        if self.activo():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="colector-nfsd")
+        self._hilo.daemon = True
+        self._hilo.start()
+        logger.debug("Colector de estadísticas nfsd iniciado ({0} s)".format(self.intervalo))
+
+    def _bucle(self):
+        # La primera lectura también va dentro del try: un error no debe terminar el hilo
+        while True:
+            try:
+                self.muestrear()
+            except Exception as e:
+                logger.warning("Error leyendo estadísticas de nfsd: {0}".format(e))
+            if self._detener.wait(self.intervalo):
+                break
+
+    def detener(self):
+        """Detiene el muestreo"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.intervalo + 1)
+            self._hilo = None
+        with self._bloqueo:
+            self._anterior = None
@@ -0,0 +1,330 @@
+"""
+Estado real de las exportaciones según el kernel y nfs-utils
+Lee /var/lib/nfs/etab (lo que exportfs aplicó), /proc/fs/nfs/exports (la tabla
+del kernel), /var/lib/nfs/rmtab (montajes NFSv3) y /proc/fs/nfsd/clients/*
+(clientes NFSv4 y sus estados abiertos) sin lanzar procesos, y compara lo
+aplicado con lo configurado en /etc/exports
+"""
+import os
+import re
+import threading
+
+from modelo_exports import firma_archivo, normalizar_ruta
+from perfiles_exports import resumir_opciones_perfil
+
+
+RUTA_ETAB = "/var/lib/nfs/etab"
+RUTA_RMTAB = "/var/lib/nfs/rmtab"
+RUTA_EXPORTS_KERNEL = "/proc/fs/nfs/exports"
+RUTA_CLIENTES_NFSD = "/proc/fs/nfsd/clients"
+
+# Estados de cada par ruta/host al comparar configuración y etab
+ESTADOS = {
+    'ok': "Aplicada",
+    'no_aplicada': "Configurada pero no aplicada",
+    'obsoleta': "Aplicada pero ya no configurada",
+    'opciones_distintas': "Aplicada con otras opciones",
+}
+
+_OCTAL = re.compile(r'\\([0-7]{3})')
+_ESTADO_NFSD = re.compile(r'^-\s*0x[0-9a-f]+:\s*\{\s*type:\s*(\w+)(.*)\}\s*$')
+_ARCHIVO_ESTADO = re.compile(r'filename:\s*"((?:[^"\\]|\\.)*)"')
+_SUPERBLOQUE_ESTADO = re.compile(r'superblock:\s*"([0-9a-f]+):([0-9a-f]+):')
+
+
+def _desescapar(texto):
+    """nfs-utils y el kernel escriben los espacios y caracteres raros como \\ooo"""
+    return _OCTAL.sub(lambda m: chr(int(m.group(1), 8)), texto)
+
+
+def parsear_tabla_exportaciones(texto):
+    """
+    Parsea etab o /proc/fs/nfs/exports ('ruta<tab>host(opciones)' por línea)
+    Retorna {(ruta_normalizada, host): (opciones, ...)}
+    """
+    resultado = {}
+    for linea in texto.splitlines():
+        linea = linea.strip()
+        if not linea or linea.startswith('#'):
+            continue
+        partes = linea.split()
+        ruta = normalizar_ruta(_desescapar(partes[0]))
+        for cliente in partes[1:]:
+            if cliente.startswith('#'):
+                break
+            if '(' in cliente and cliente.endswith(')'):
+                host, opciones = cliente[:-1].split('(', 1)
+                opciones = tuple(o for o in opciones.split(',') if o)
+            else:
+                host, opciones = cliente, ()
+            resultado[(ruta, host)] = opciones
+    return resultado
+
+
+def parsear_rmtab(texto):
+    """
+    Parsea rmtab ('cliente:ruta:0xcontador' por línea, montajes NFSv3 vistos por mountd)
+    Retorna una lista de (cliente, ruta_normalizada)
+    """
+    montajes = []
+    for linea in texto.splitlines():
+        linea = linea.strip()
+        posicion = linea.find(':/')
+        if posicion <= 0:
+            continue
+        ruta = linea[posicion + 1:].rsplit(':', 1)[0]
+        montajes.append((linea[:posicion], normalizar_ruta(_desescapar(ruta))))
+    return montajes
+
+
+def parsear_info_cliente(texto):
+    """
+    Parsea /proc/fs/nfsd/clients/<id>/info
+    Retorna {'direccion', 'nombre', 'version', 'estado', 'callback'}
+    """
+    campos = {}
+    for linea in texto.splitlines():
+        if ':' in linea:
+            clave, valor = linea.split(':', 1)
+            campos[clave.strip().lower()] = valor.strip().strip('"')
+
+    direccion = campos.get('address', "")
+    # 10.0.0.5:768 o [fe80::1]:768 -> sin el puerto
+    if direccion.startswith('['):
+        direccion = direccion[1:].split(']', 1)[0]
+    elif direccion.count(':') == 1:
+        direccion = direccion.split(':', 1)[0]
+    version = campos.get('minor version')
+    return {
+        'direccion': direccion,
+        'nombre': campos.get('name', ""),
+        'version': "4.{0}".format(version) if version is not None else "4",
+        'estado': campos.get('status', ""),
+        'callback': campos.get('callback state', ""),
+    }
+
+
+def parsear_estados_cliente(texto):
+    """
+    Parsea /proc/fs/nfsd/clients/<id>/states
+    Retorna {'abiertos', 'bloqueos', 'delegaciones', 'archivos'}; archivos es una
+    lista de (dispositivo, nombre) de los archivos abiertos, con dispositivo
+    (mayor, menor) tomado de 'superblock' (None si no aparece)
+    """
+    resumen = {'abiertos': 0, 'bloqueos': 0, 'delegaciones': 0, 'archivos': []}
+    tipos = {'open': 'abiertos', 'lock': 'bloqueos', 'deleg': 'delegaciones'}
+    for linea in texto.splitlines():
+        coincidencia = _ESTADO_NFSD.match(linea.strip())
+        if not coincidencia:
+            continue
+        tipo, resto = coincidencia.group(1), coincidencia.group(2)
+        clave = tipos.get(tipo)
+        if clave is not None:
+            resumen[clave] += 1
+        if tipo != 'open':
+            continue
+        archivo = _ARCHIVO_ESTADO.search(resto)
+        bloque = _SUPERBLOQUE_ESTADO.search(resto)
+        dispositivo = (int(bloque.group(1), 16), int(bloque.group(2), 16)) if bloque else None
+        resumen['archivos'].append((dispositivo, archivo.group(1) if archivo else ""))
+    return resumen
+
+
+def ruta_exportada_de(archivo, rutas):
+    """Retorna la ruta exportada (de un conjunto) más larga que contiene archivo, o None"""
+    ruta = normalizar_ruta(archivo)
+    while True:
+        if ruta in rutas:
+            return ruta
+        padre = os.path.dirname(ruta)
+        if padre == ruta:
+            return None
+        ruta = padre
+
+
+def _dispositivos_de(rutas):
+    """Retorna {(mayor, menor): [rutas]} de las rutas exportadas que existen"""
+    dispositivos = {}
+    for ruta in rutas:
+        try:
+            dispositivo = os.stat(ruta).st_dev
+        except OSError:
+            continue
+        dispositivos.setdefault((os.major(dispositivo), os.minor(dispositivo)), []).append(ruta)
+    return dispositivos
+
+
+def comparar_opciones(configuradas, aplicadas):
+    """
+    Retorna las diferencias entre las opciones configuradas y las de etab como
+    lista de 'categoria: configurado != aplicado' (etab escribe todas las opciones
+    explícitamente, así que los valores por defecto también se comparan)
+    """
+    diferencias = []
+    resumen_config = resumir_opciones_perfil(configuradas)
+    resumen_aplicado = resumir_opciones_perfil(aplicadas)
+    for categoria in sorted(resumen_config):
+        if resumen_config[categoria] != resumen_aplicado[categoria]:
+            diferencias.append("{0}: {1} != {2}".format(
+                categoria, resumen_config[categoria], resumen_aplicado[categoria]
+            ))
+
+    fsid_config = next((o for o in configuradas if o.startswith('fsid=')), None)
+    fsid_aplicado = next((o for o in aplicadas if o.startswith('fsid=')), None)
+    if fsid_config is not None and fsid_config != fsid_aplicado:
+        diferencias.append("fsid: {0} != {1}".format(fsid_config, fsid_aplicado))
+    return diferencias
+
+
+class VistaKernel:
+    """
+    Lee las fuentes del kernel y de nfs-utils y las vuelve a parsear solo si cambiaron
+    etab y rmtab se vigilan por su firma (inodo, mtime, tamaño); los archivos de
+    /proc no tienen mtime ni tamaño útiles y se releen en cada actualización
+    (son lecturas de memoria, sin procesos)
+    """
+
+    def __init__(self, ruta_etab=RUTA_ETAB, ruta_rmtab=RUTA_RMTAB,
+                 ruta_exports_kernel=RUTA_EXPORTS_KERNEL, ruta_clientes=RUTA_CLIENTES_NFSD):
+        self.ruta_etab = ruta_etab
+        self.ruta_rmtab = ruta_rmtab
+        self.ruta_exports_kernel = ruta_exports_kernel
+        self.ruta_clientes = ruta_clientes
+        # ruta -> (firma, datos parseados)
+        self._cache = {}
+        self._bloqueo = threading.Lock()
+
+    def _leer(self, ruta, parsear, vacio):
+        """Retorna los datos parseados de ruta, reutilizando los anteriores si la firma no cambió"""
+        firma = firma_archivo(ruta)
+        if firma is None:
+            return vacio
+        en_cache = self._cache.get(ruta)
+        # Tamaño 0: archivo de /proc, siempre hay que leerlo
+        if en_cache is not None and firma[2] and en_cache[0] == firma:
+            return en_cache[1]
+        try:
+            with open(ruta, 'r', errors='replace') as f:
+                datos = parsear(f.read())
+        except OSError:
+            return vacio
+        self._cache[ruta] = (firma, datos)
+        return datos
+
+    def _leer_texto(self, ruta):
+        try:
+            with open(ruta, 'r', errors='replace') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def clientes_nfsv4(self):
+        """Retorna una lista con la información y los estados de cada cliente NFSv4"""
+        try:
+            identificadores = sorted(os.listdir(self.ruta_clientes))
+        except OSError:
+            return []
+
+        clientes = []
+        for identificador in identificadores:
+            directorio = os.path.join(self.ruta_clientes, identificador)
+            info = self._leer_texto(os.path.join(directorio, 'info'))
+            if info is None:
+                # El cliente desapareció mientras se recorría el directorio
+                continue
+            cliente = parsear_info_cliente(info)
+            cliente['id'] = identificador
+            cliente.update(parsear_estados_cliente(self._leer_texto(os.path.join(directorio, 'states')) or ""))
+            clientes.append(cliente)
+        return clientes
+
+    def exportaciones_aplicadas(self):
+        """Retorna {(ruta, host): opciones} de etab ({} si no existe)"""
+        with self._bloqueo:
+            return self._leer(self.ruta_etab, parsear_tabla_exportaciones, {})
+
+    def leer(self):
+        """
+        Retorna {'aplicadas': {(ruta, host): opciones} de etab,
+        'kernel': set de (ruta, host) de /proc/fs/nfs/exports (None si no existe),
+        'montajes_v3': [(cliente, ruta)], 'clientes_v4': [...]}
+        """
+        with self._bloqueo:
+            kernel = None
+            if os.path.exists(self.ruta_exports_kernel):
+                kernel = set(self._leer(self.ruta_exports_kernel, parsear_tabla_exportaciones, {}))
+            return {
+                'aplicadas': self._leer(self.ruta_etab, parsear_tabla_exportaciones, {}),
+                'kernel': kernel,
+                'montajes_v3': self._leer(self.ruta_rmtab, parsear_rmtab, []),
+                'clientes_v4': self.clientes_nfsv4(),
+            }
+
+
+def combinar(configuradas, lectura):
+    """
+    Une la configuración ({(ruta, host): opciones} de los modelos de exports) con
+    una lectura de VistaKernel
+    Retorna (exportaciones, clientes):
+    exportaciones: lista de {'ruta', 'host', 'estado', 'configuradas', 'aplicadas',
+    'en_kernel', 'diferencias', 'clientes'} ordenada por ruta y host
+    clientes: lista de {'direccion', 'nombre', 'version', 'estado', 'abiertos',
+    'bloqueos', 'delegaciones', 'rutas'}
+    """
+    aplicadas = lectura['aplicadas']
+    kernel = lectura['kernel']
+    rutas = sorted(set(ruta for ruta, _ in configuradas) | set(ruta for ruta, _ in aplicadas))
+
+    clientes = []
+    uso_por_ruta = {}
+    for direccion, ruta in lectura['montajes_v3']:
+        uso_por_ruta.setdefault(ruta, set()).add(direccion)
+        clientes.append({
+            'direccion': direccion, 'nombre': "", 'version': "3", 'estado': "montado",
+            'abiertos': 0, 'bloqueos': 0, 'delegaciones': 0, 'rutas': [ruta]
+        })
+    dispositivos = None
+    conjunto_rutas = set(rutas)
+    for cliente in lectura['clientes_v4']:
+        rutas_cliente = set()
+        for dispositivo, nombre in cliente['archivos']:
+            # El nombre suele ser relativo; el dispositivo identifica el filesystem
+            ruta = ruta_exportada_de(nombre, conjunto_rutas) if nombre.startswith('/') else None
+            if ruta is not None:
+                rutas_cliente.add(ruta)
+            elif dispositivo is not None:
+                if dispositivos is None:
+                    dispositivos = _dispositivos_de(rutas)
+                rutas_cliente.update(dispositivos.get(dispositivo, ()))
+        for ruta in rutas_cliente:
+            uso_por_ruta.setdefault(ruta, set()).add(cliente['direccion'])
+        datos = dict((clave, cliente[clave]) for clave in (
+            'direccion', 'nombre', 'version', 'estado', 'abiertos', 'bloqueos', 'delegaciones'
+        ))
+        datos['rutas'] = sorted(rutas_cliente)
+        clientes.append(datos)
+
+    exportaciones = []
+    for clave in sorted(set(configuradas) | set(aplicadas)):
+        ruta, host = clave
+        configurada = configuradas.get(clave)
+        aplicada = aplicadas.get(clave)
+        diferencias = []
+        if aplicada is None:
+            estado = 'no_aplicada'
+        elif configurada is None:
+            estado = 'obsoleta'
+        else:
+            diferencias = comparar_opciones(configurada, aplicada)
+            estado = 'opciones_distintas' if diferencias else 'ok'
+        exportaciones.append({
+            'ruta': ruta,
+            'host': host,
+            'estado': estado,
+            'configuradas': configurada,
+            'aplicadas': aplicada,
+            'en_kernel': None if kernel is None else clave in kernel,
+            'diferencias': diferencias,
+            'clientes': sorted(uso_por_ruta.get(ruta, ())),
+        })
+    return exportaciones, clientes
@@ -3,16 +3,44 @@ Gestor NFS - Servidor
 Basado en diegootm con mejoras de ambos repositorios
 """
 import os
-import shutil
-import subprocess
+import json
+import time
 import stat
 import hashlib
+import socket
+import ipaddress
 from datetime import datetime
 
+from modelo_exports import cargar_modelo, cargar_modelos, firma_archivo, diferencia_exportaciones, normalizar_ruta
+from asignador_fsid import AsignadorFsid, extraer_fsid
+from parser_exports import formatear_entrada
+from transaccion_exports import TransaccionExports, escribir_atomico
+from respaldos_exports import AlmacenRespaldos
+from analizador_exports import AnalizadorExports
+from perfiles_exports import PERFILES, expandir_perfil, evaluar_opciones, carga_desde_muestras
+from ayudante_privilegiado import obtener_ayudante
+from estadisticas_nfsd import ColectorEstadisticasNfsd, leer_estadisticas, calcular_tasas
+from ajuste_hilos_nfsd import leer_hilos_actuales, recomendar_hilos, archivo_configuracion_hilos
+from capacidad_exports import MonitorCapacidad
+from estado_kernel import VistaKernel, combinar, comparar_opciones
+from auditoria_exports import RegistroAuditoria, cambios_entre, LIMITE_HISTORIAL
+from reconciliador_exports import normalizar_especificacion, planificar
+from importacion_exports import leer_filas, validar_filas, escribir_filas, formato_archivo
+from resolutor_accesos import ResolutorAccesos, cargar_netgroups, RUTA_NETGROUP
 from utils.validaciones import validar_ruta, validar_red, validar_opciones_nfs
 from utils.logger import logger
 
 
+DIRECTORIO_ESTADO_EXPORTS = os.path.expanduser('~/.config/configurador-nfs/exports')
+
+# Destinos host:ruta por llamada a exportfs (evita líneas de comando demasiado largas)
+MAX_DESTINOS_POR_LLAMADA = 100
+
+# Por debajo de este número de cambios siempre se aplica de forma incremental;
+# por encima, solo si afecta a menos de la mitad de las exportaciones
+MAX_CAMBIOS_INCREMENTALES = 200
+
+
 class GestorNFS:
     """
     Clase para gestionar /etc/exports de forma completa y segura
@@ -22,9 +50,36 @@ class GestorNFS:
 
     def __init__(self, ruta_exports="/etc/exports"):
         self.ruta_exports = ruta_exports
-        self.ruta_respaldo = "{0}.respaldo".format(ruta_exports)
+        self.ruta_respaldos = "{0}.respaldos".format(ruta_exports)
+        self._almacen_respaldos = None
+        self.ruta_auditoria = "{0}.auditoria.db".format(ruta_exports)
+        self._registro_auditoria = None
         self.es_root = os.geteuid() == 0 if hasattr(os, 'geteuid') else False
         
+        self.ruta_exports_d = "{0}.d".format(ruta_exports)
+        
+        # Modelo parseado de /etc/exports (se invalida cuando cambia la firma del archivo)
+        self._modelo = None
+        self._modelos_d = {}
+        
+        # Mapa de fsid usados, reconstruido solo cuando cambian los archivos de exports
+        self._asignador_fsid = None
+        self._firmas_asignador = None
+        
+        # Índices de acceso por cliente, con la misma invalidación que el asignador
+        self.ruta_netgroup = RUTA_NETGROUP
+        self._resolutor_accesos = None
+        self._firmas_resolutor = None
+        
+        # Colector de estadísticas de nfsd (se crea al usarlo)
+        self._colector_estadisticas = None
+        
+        # Medidas de capacidad por filesystem, con historial para el crecimiento
+        self._monitor_capacidad = None
+        
+        # Lector de etab, rmtab y /proc (reutiliza lo parseado si no cambió)
+        self._vista_kernel = None
+        
         # Opciones NFS con sus descripciones
         self.opciones_info = {
             'ro': 'Solo lectura - Los clientes pueden leer pero no modificar',
@@ -40,6 +95,8 @@ class GestorNFS:
             'insecure': 'Permite conexiones desde puertos > 1024',
             'secure': 'Solo permite conexiones desde puertos < 1024 (más seguro)',
             'no_secure': 'Alias de insecure - Permite puertos > 1024',
+            'wdelay': 'Agrupa escrituras cercanas antes de ir al disco (solo con sync)',
+            'no_wdelay': 'Escribe de inmediato - Menor latencia con escrituras pequeñas',
             'anonuid': 'UID del usuario anónimo (ejemplo: anonuid=1000)',
             'anongid': 'GID del grupo anónimo (ejemplo: anongid=1000)',
             'fsid': 'ID único del filesystem (requerido para archivos)'
@@ -49,47 +106,13 @@ class GestorNFS:
         
         logger.info("GestorNFS inicializado")
 
-    def _run_command(self, command):
+    def _ejecutar_operacion(self, operacion, **argumentos):
         """
-        Ejecuta un comando del sistema con sudo si es necesario
-        Usa sudo -n para no pedir contraseña interactivamente
+        Ejecuta una operación del sistema (exportfs, systemctl, mount...) a través del
+        ayudante privilegiado persistente, sin shell ni un sudo por comando
+        Retorna {"success", "stdout", "stderr", "codigo", "duracion"}
         """
-        try:
-            # Si no somos root, agregar sudo -n (non-interactive)
-            if not self.es_root and not command.startswith("sudo"):
-                command = "sudo -n {0}".format(command)
-            
-            result = subprocess.run(
-                command,
-                shell=True,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                timeout=30
-            )
-            return {"success": True, "stdout": result.stdout, "stderr": result.stderr}
-        except subprocess.CalledProcessError as e:
-            stderr_lower = str(e.stderr).lower()
-            
-            # Si falla por sudo no-password, dar instrucción clara
-            if "sudo: a password is required" in stderr_lower or "no password" in stderr_lower:
-                mensaje_error = "Se requieren permisos de root.\n\n" +\
-                               "Ejecute la aplicación como:\n" +\
-                               "sudo python3 main.py\n\n" +\
-                               "O configure sudoers para permitir estos comandos sin contraseña:\n" +\
-                               "sudo visudo\n" +\
-                               "# Agregue estas líneas al final:\n" +\
-                               "%sudo ALL=(ALL) NOPASSWD: /usr/sbin/exportfs\n" +\
-                               "%sudo ALL=(ALL) NOPASSWD: /bin/mount\n" +\
-                               "%sudo ALL=(ALL) NOPASSWD: /bin/umount"
-                return {"success": False, "stdout": e.stdout, "stderr": mensaje_error}
-            
-            return {"success": False, "stdout": e.stdout, "stderr": e.stderr}
-        except subprocess.TimeoutExpired:
-            return {"success": False, "stdout": "", "stderr": "Comando tardó demasiado (timeout)"}
-        except Exception as e:
-            return {"success": False, "stdout": "", "stderr": str(e)}
+        return obtener_ayudante().ejecutar(operacion, **argumentos)
 
     def obtener_descripcion_opcion(self, opcion):
         """Retorna la descripción de una opción NFS"""
@@ -109,24 +132,283 @@ class GestorNFS:
         numero = int(hash_hex[:4], 16) % 9999 + 1
         return numero
 
+    def _modelos_exports_d(self):
+        """
+        Retorna los modelos de los archivos *.exports de exports.d
+        Solo se vuelven a parsear (en paralelo) los archivos cuya firma cambió
+        """
+        try:
+            nombres = sorted(n for n in os.listdir(self.ruta_exports_d) if n.endswith('.exports'))
+        except OSError:
+            nombres = []
+
+        modelos = {}
+        cambiados = []
+        for nombre in nombres:
+            ruta = os.path.join(self.ruta_exports_d, nombre)
+            modelo = self._modelos_d.get(ruta)
+            if modelo is None or modelo.firma != firma_archivo(ruta):
+                cambiados.append(ruta)
+            else:
+                modelos[ruta] = modelo
+
+        if cambiados:
+            nuevos, errores = cargar_modelos(cambiados)
+            for ruta, error in errores.items():
+                logger.warning("No se pudo leer {0}: {1}".format(ruta, error))
+            modelos.update(nuevos)
+            logger.debug("exports.d: {0} archivos parseados, {1} en caché".format(
+                len(nuevos), len(modelos) - len(nuevos)
+            ))
+
+        # Se conserva el orden alfabético, que es el que usa exportfs
+        self._modelos_d = {ruta: modelos[ruta] for ruta in sorted(modelos)}
+        return self._modelos_d
+
+    def listar_drop_ins(self):
+        """Retorna las rutas de los archivos *.exports de exports.d"""
+        return list(self._modelos_exports_d())
+
+    def _resolver_archivo(self, archivo=None):
+        """
+        Retorna la ruta del archivo a editar
+        None es el archivo principal; un nombre sin directorio ('equipo' o
+        'equipo.exports') se busca en exports.d
+        """
+        if archivo is None or archivo == self.ruta_exports or \
+                os.path.abspath(archivo) == os.path.abspath(self.ruta_exports):
+            return self.ruta_exports
+
+        if os.sep not in archivo:
+            if not archivo.endswith('.exports'):
+                archivo += '.exports'
+            return os.path.join(self.ruta_exports_d, archivo)
+
+        ruta = os.path.abspath(archivo)
+        if os.path.dirname(ruta) != os.path.abspath(self.ruta_exports_d) or not ruta.endswith('.exports'):
+            raise ValueError("{0} no es un archivo *.exports de {1}".format(archivo, self.ruta_exports_d))
+        return ruta
+
+    def _configuraciones_con_origen(self):
+        """
+        Retorna (archivo, configuracion) de /etc/exports y de exports.d
+        """
+        resultado = [(self.ruta_exports, config) for config in self.obtener_modelo().configuraciones]
+        for ruta, modelo in self._modelos_exports_d().items():
+            resultado.extend((ruta, config) for config in modelo.configuraciones)
+        return resultado
+
+    def _firmas_exports(self):
+        """Firmas de /etc/exports y de cada drop-in (cambian si cambia algún archivo)"""
+        return (self.obtener_modelo().firma,) + tuple(
+            (ruta, modelo.firma) for ruta, modelo in self._modelos_exports_d().items()
+        )
+
+    def obtener_asignador_fsid(self):
+        """
+        Retorna el asignador de fsid con los fsid usados en /etc/exports y exports.d
+        Se reconstruye solo si alguno de esos archivos cambió
+        """
+        firmas = self._firmas_exports()
+        if self._asignador_fsid is None or self._firmas_asignador != firmas:
+            fsids = (extraer_fsid(config['opciones']) for _, config in self._configuraciones_con_origen())
+            self._asignador_fsid = AsignadorFsid(f for f in fsids if f is not None)
+            self._firmas_asignador = firmas
+        return self._asignador_fsid
+
     def obtener_fsids_usados(self):
         """
-        Retorna un conjunto con todos los fsid ya usados en /etc/exports
+        Retorna un conjunto con todos los fsid ya usados en /etc/exports y exports.d
         """
         fsids_usados = set()
-        configuraciones = self.leer_configuracion_actual()
-        
-        for config in configuraciones:
-            for opcion in config['opciones']:
-                if opcion.startswith('fsid='):
-                    try:
-                        fsid = int(opcion.split('=')[1])
-                        fsids_usados.add(fsid)
-                    except ValueError:
-                        pass
-        
+        for _, config in self._configuraciones_con_origen():
+            fsid = extraer_fsid(config['opciones'])
+            if fsid is not None:
+                fsids_usados.add(fsid)
         return fsids_usados
 
+    def detectar_colisiones_fsid(self):
+        """
+        Retorna {fsid: [(archivo, carpeta), ...]} con los fsid que usan rutas distintas
+        (la misma ruta exportada a varios hosts puede repetir su fsid)
+        """
+        por_fsid = {}
+        for archivo, config in self._configuraciones_con_origen():
+            fsid = extraer_fsid(config['opciones'])
+            if fsid is not None:
+                por_fsid.setdefault(fsid, []).append((archivo, config['carpeta']))
+
+        return {
+            fsid: usos for fsid, usos in por_fsid.items()
+            if len(set(normalizar_ruta(carpeta) for _, carpeta in usos)) > 1
+        }
+
+    def analizar_exportaciones(self):
+        """
+        Busca reglas que se solapan o se contradicen en /etc/exports y exports.d
+        (hosts contenidos en redes o comodines con otras opciones, hosts repetidos,
+        rutas exportadas dentro de otras)
+        Retorna {"success", "message", "hallazgos", "conflictos"}; success es False
+        si hay algún hallazgo de severidad 'error'
+        """
+        analizador = AnalizadorExports()
+        for archivo, config in self._configuraciones_con_origen():
+            origen = {'archivo': archivo, 'numero_linea': config['numero_linea']}
+            for host, opciones in config['clientes']:
+                analizador.agregar(config['carpeta'], host, opciones, origen)
+
+        hallazgos = analizador.analizar()
+        conflictos = sum(1 for h in hallazgos if h['severidad'] == 'error')
+        avisos = sum(1 for h in hallazgos if h['severidad'] == 'aviso')
+
+        if conflictos:
+            mensaje = "[ERROR] {0} conflictos y {1} avisos en las exportaciones".format(conflictos, avisos)
+            logger.warning(mensaje)
+        elif avisos:
+            mensaje = "[AVISO] {0} avisos en las exportaciones".format(avisos)
+            logger.info(mensaje)
+        else:
+            mensaje = "[OK] No hay reglas contradictorias"
+
+        return {
+            "success": conflictos == 0,
+            "message": mensaje,
+            "hallazgos": hallazgos,
+            "conflictos": conflictos
+        }
+
+    def obtener_perfiles(self):
+        """Retorna {clave: {'nombre', 'descripcion', 'opciones'}} con los perfiles de rendimiento"""
+        return {clave: dict(perfil) for clave, perfil in PERFILES.items()}
+
+    def expandir_perfil(self, perfil, opciones=()):
+        """
+        Retorna las opciones con el perfil aplicado (las demás opciones se conservan)
+        KeyError si el perfil no existe
+        """
+        return expandir_perfil(perfil, opciones)
+
+    def _carga_observada(self):
+        """Mezcla de operaciones del historial del colector de nfsd (None sin muestras)"""
+        return carga_desde_muestras(list(self.obtener_colector_estadisticas().historial))
+
+    def evaluar_rendimiento(self, ruta, opciones):
+        """
+        Revisa las opciones de una exportación con las reglas de rendimiento
+        (subtree_check con renombrados, sync con mucha escritura...), usando la carga
+        observada por el colector de estadísticas si está disponible
+        Retorna una lista de {'regla', 'severidad', 'mensaje'}
+        """
+        return evaluar_opciones(opciones, ruta, self._carga_observada())
+
+    def aplicar_perfil(self, perfil, indices, archivo=None):
+        """
+        Aplica un perfil de rendimiento a varias configuraciones en una sola transacción
+        Cada host conserva sus demás opciones (rw, squash, fsid...)
+        Retorna {"success", "message", "modificadas", "avisos"}; avisos es
+        {indice: [avisos de las reglas de rendimiento]} con las opciones nuevas
+        """
+        if perfil not in PERFILES:
+            return {
+                "success": False,
+                "message": "[ERROR] Perfil desconocido: {0}".format(perfil),
+                "modificadas": 0,
+                "avisos": {}
+            }
+
+        carga = self._carga_observada()
+        avisos = {}
+        try:
+            transaccion = self.iniciar_transaccion(archivo)
+            for indice in indices:
+                transaccion._verificar_indice(indice)
+                config = transaccion.configuraciones[indice]
+                clientes = [
+                    (host, expandir_perfil(perfil, opciones)) for host, opciones in config['clientes']
+                ]
+                transaccion.modificar(indice, clientes=clientes)
+
+                vistos = {}
+                for _, opciones in clientes:
+                    for aviso in evaluar_opciones(opciones, config['carpeta'], carga):
+                        vistos.setdefault(aviso['regla'], aviso)
+                if vistos:
+                    avisos[indice] = list(vistos.values())
+        except (IndexError, ValueError) as e:
+            logger.error("Error aplicando el perfil {0}: {1}".format(perfil, e))
+            return {"success": False, "message": "[ERROR] {0}".format(e), "modificadas": 0, "avisos": {}}
+
+        resultado = transaccion.confirmar()
+        if not resultado["success"]:
+            return {"success": False, "message": resultado["message"], "modificadas": 0, "avisos": avisos}
+
+        mensaje = "[OK] Perfil '{0}' aplicado a {1} exportaciones".format(
+            PERFILES[perfil]['nombre'], len(transaccion.modificaciones)
+        )
+        logger.exito(mensaje)
+        return {
+            "success": True,
+            "message": mensaje,
+            "modificadas": len(transaccion.modificaciones),
+            "avisos": avisos
+        }
+
+    def obtener_resolutor_accesos(self):
+        """
+        Retorna el resolutor de accesos por cliente de /etc/exports, exports.d y netgroup
+        Se reconstruye solo si alguno de esos archivos cambió
+        """
+        firmas = self._firmas_exports() + (firma_archivo(self.ruta_netgroup),)
+        if self._resolutor_accesos is None or self._firmas_resolutor != firmas:
+            resolutor = ResolutorAccesos(cargar_netgroups(self.ruta_netgroup))
+            for archivo, config in self._configuraciones_con_origen():
+                origen = {'archivo': archivo, 'numero_linea': config['numero_linea']}
+                for host, opciones in config['clientes']:
+                    resolutor.agregar(config['carpeta'], host, opciones, origen)
+            self._resolutor_accesos = resolutor
+            self._firmas_resolutor = firmas
+            logger.debug("Índice de accesos construido: {0} reglas".format(len(resolutor)))
+        return self._resolutor_accesos
+
+    def resolver_acceso_cliente(self, cliente, grupos=None, resolver_dns=False):
+        """
+        Indica qué exportaciones puede montar un cliente (IP o nombre) y con qué opciones
+        Con resolver_dns=True también se consideran su nombre inverso o sus direcciones
+        Retorna una lista de {ruta, host, tipo, opciones, origen}
+        """
+        nombres = []
+        ips = []
+        if resolver_dns:
+            try:
+                ipaddress.ip_address(cliente)
+                nombre, alias, _ = socket.gethostbyaddr(cliente)
+                nombres = [nombre] + alias
+            except ValueError:
+                try:
+                    ips = socket.gethostbyname_ex(cliente)[2]
+                except OSError as e:
+                    logger.warning("No se pudo resolver {0}: {1}".format(cliente, e))
+            except OSError as e:
+                logger.warning("No se pudo resolver {0}: {1}".format(cliente, e))
+
+        return self.obtener_resolutor_accesos().resolver(cliente, nombres=nombres, ips=ips, grupos=grupos)
+
+    def auditar_accesos_red(self, red):
+        """
+        Acceso de todas las direcciones de una red (por ejemplo una /16), agrupadas
+        en rangos con el mismo resultado
+        Retorna {"success", "message", "rangos"}
+        """
+        try:
+            rangos = self.obtener_resolutor_accesos().auditar_red(red)
+        except ValueError as e:
+            return {"success": False, "message": "[ERROR] Red no válida: {0}".format(e), "rangos": []}
+        return {
+            "success": True,
+            "message": "[OK] {0}: {1} rangos con distinto acceso".format(red, len(rangos)),
+            "rangos": rangos
+        }
+
     def verificar_y_ajustar_permisos(self, ruta, opciones):
         """
         Verifica los permisos del sistema de archivos
@@ -184,161 +466,347 @@ class GestorNFS:
             logger.error("Error aplicando permisos: {0}".format(str(e)))
             return (False, "Error aplicando permisos: {0}".format(str(e)))
 
-    def leer_configuracion_actual(self):
+    def obtener_modelo(self, archivo=None):
+        """
+        Retorna el modelo parseado de /etc/exports (o de un archivo de exports.d)
+        Solo vuelve a parsear si cambió el inodo, el mtime o el tamaño del archivo
+        """
+        ruta = self._resolver_archivo(archivo)
+        if ruta != self.ruta_exports:
+            modelo = self._modelos_exports_d().get(ruta)
+            # Un drop-in que todavía no existe se trata como vacío
+            return modelo if modelo is not None else cargar_modelo(ruta)
+
+        if self._modelo is None or self._modelo.firma != firma_archivo(self.ruta_exports):
+            self._modelo = cargar_modelo(self.ruta_exports)
+            logger.debug("Exports parseado: {0} configuraciones".format(len(self._modelo)))
+        return self._modelo
+
+    def invalidar_cache(self, archivo=None):
+        """
+        Descarta el modelo en memoria (se usa después de escribir el archivo)
+        """
+        ruta = self._resolver_archivo(archivo)
+        if ruta == self.ruta_exports:
+            self._modelo = None
+        else:
+            self._modelos_d.pop(ruta, None)
+
+    def leer_configuracion_actual(self, archivo=None):
         """
-        Lee /etc/exports y devuelve lista de configuraciones
+        Lee /etc/exports (o un archivo de exports.d) y devuelve lista de configuraciones
         """
-        configuraciones = []
         try:
-            if not os.path.exists(self.ruta_exports):
-                return configuraciones
-
-            with open(self.ruta_exports, 'r') as f:
-                for num, linea in enumerate(f, 1):
-                    linea_raw = linea.rstrip("\n")
-                    linea_strip = linea_raw.strip()
-                    if not linea_strip or linea_strip.startswith('#'):
-                        continue
-                    
-                    try:
-                        idx_open = linea_raw.index('(')
-                        idx_close = linea_raw.rindex(')')
-                    except ValueError:
-                        continue
-
-                    antes = linea_raw[:idx_open].strip()
-                    texto_opciones = linea_raw[idx_open+1:idx_close].strip()
-                    partes_antes = antes.split()
-                    if not partes_antes:
-                        continue
-                    
-                    carpeta = partes_antes[0]
-                    hosts = " ".join(partes_antes[1:]) if len(partes_antes) > 1 else "*"
-                    opciones = [o.strip() for o in texto_opciones.split(',') if o.strip()]
-                    
-                    configuraciones.append({
-                        'carpeta': carpeta,
-                        'hosts': hosts,
-                        'opciones': opciones,
-                        'linea_original': linea_raw,
-                        'numero_linea': num
-                    })
-            return configuraciones
+            return list(self.obtener_modelo(archivo).configuraciones)
         except Exception as e:
             logger.error("Error leyendo configuración: {0}".format(e))
             return []
 
+    def leer_configuracion_completa(self):
+        """
+        Devuelve las configuraciones de /etc/exports seguidas de las de exports.d
+        Cada configuración indica su archivo en 'archivo_origen'
+        """
+        try:
+            return [config for _, config in self._configuraciones_con_origen()]
+        except Exception as e:
+            logger.error("Error leyendo configuración: {0}".format(e))
+            return []
+
+    def buscar_exportaciones(self, ruta=None, host=None, opcion=None, bajo_ruta=None):
+        """
+        Busca configuraciones usando los índices del modelo
+        Los criterios indicados se combinan (todas deben cumplirse)
+        Retorna una lista de (indice, configuracion)
+        """
+        modelo = self.obtener_modelo()
+        criterios = []
+        if ruta:
+            criterios.append(modelo.posiciones('ruta', ruta))
+        if host:
+            criterios.append(modelo.posiciones('host', host))
+        if opcion:
+            criterios.append(modelo.posiciones('opcion', opcion))
+        if bajo_ruta:
+            criterios.append(modelo.posiciones_bajo_ruta(bajo_ruta))
+
+        if not criterios:
+            return list(enumerate(modelo.configuraciones))
+
+        # Se intersecta empezando por el conjunto más pequeño
+        criterios.sort(key=len)
+        posiciones = set(criterios[0])
+        for otro in criterios[1:]:
+            posiciones.intersection_update(otro)
+
+        return [(i, modelo.configuraciones[i]) for i in sorted(posiciones)]
+
+    def buscar_por_ruta(self, ruta):
+        """Retorna las configuraciones que exportan exactamente esa ruta"""
+        return [config for _, config in self.buscar_exportaciones(ruta=ruta)]
+
+    def buscar_por_host(self, host):
+        """Retorna las configuraciones que incluyen esa especificación de host (ej: 10.0.3.0/24)"""
+        return [config for _, config in self.buscar_exportaciones(host=host)]
+
+    def buscar_por_opcion(self, opcion):
+        """Retorna las configuraciones con esa opción (ej: 'rw', 'fsid' o 'fsid=5')"""
+        return [config for _, config in self.buscar_exportaciones(opcion=opcion)]
+
     def _validar_parametros(self, carpeta, hosts, opciones):
         """
         Valida los parámetros básicos antes de agregar configuración
         Solo valida que no estén vacíos, el resto lo maneja NFS
+        Retorna (valido, mensaje)
         """
         if not carpeta or not carpeta.strip():
-            logger.error("Carpeta es requerida")
-            return False
+            return (False, "Carpeta es requerida")
         
         if not hosts or not hosts.strip():
-            logger.error("Hosts son requeridos")
-            return False
+            return (False, "Hosts son requeridos")
         
         if not isinstance(opciones, list):
-            logger.error("Opciones deben ser lista")
-            return False
+            return (False, "Opciones deben ser lista")
         
         # Validar que la ruta existe (básico)
         if not os.path.exists(carpeta):
-            logger.error("Ruta no existe: {0}".format(carpeta))
-            return False
+            return (False, "Ruta no existe: {0}".format(carpeta))
         
         # Si todo está bien, permitir continuar
-        return True
+        return (True, "")
+
+    def _necesita_fsid(self, carpeta, opciones, es_archivo=None):
+        """
+        Los archivos individuales necesitan fsid para poder exportarse
+        es_archivo evita consultar el sistema de archivos si ya se sabe
+        """
+        if es_archivo is None:
+            es_archivo = os.path.isfile(carpeta)
+        return es_archivo and not any('fsid=' in opt for opt in opciones)
+
+    def _completar_opciones(self, carpeta, opciones, fsid=None, es_archivo=None):
+        """
+        Retorna las opciones a escribir para carpeta
+        Los archivos individuales reciben el fsid asignado y no_subtree_check
+        """
+        opciones = list(opciones)
+        if es_archivo is None:
+            es_archivo = os.path.isfile(carpeta)
+        if not es_archivo:
+            return opciones
+        
+        if fsid is not None and self._necesita_fsid(carpeta, opciones, True):
+            opciones.append('fsid={0}'.format(fsid))
+            logger.info("Archivo individual detectado - Agregando fsid={0}".format(fsid))
+        
+        if 'no_subtree_check' not in opciones and 'subtree_check' not in opciones:
+            opciones.append('no_subtree_check')
+            logger.info("Agregando no_subtree_check (recomendado para archivos)")
+        
+        return opciones
 
     def _formatear_linea_exports(self, carpeta, hosts, opciones):
         """
         Formatea una línea para /etc/exports
-        Si no hay opciones, formatea sin paréntesis
+        Cada host recibe las opciones (host1(rw) host2(rw)); si no hay opciones,
+        se escriben solo los hosts y NFS usará sus valores por defecto
         """
-        if opciones:
-            texto_opciones = ",".join(opciones)
-            return "{0} {1}({2})".format(carpeta, hosts, texto_opciones)
-        else:
-            # Sin opciones - NFS usará sus valores por defecto
-            return "{0} {1}".format(carpeta, hosts)
+        return formatear_entrada(carpeta, [(host, opciones) for host in hosts.split()])
 
-    def _crear_respaldo(self):
+    def obtener_almacen_respaldos(self):
         """
-        Crea un respaldo de /etc/exports
+        Retorna el almacén de respaldos (se crea la primera vez que se usa)
         """
+        if self._almacen_respaldos is None:
+            self._almacen_respaldos = AlmacenRespaldos(self.ruta_respaldos)
+        return self._almacen_respaldos
+
+    def _crear_respaldo(self, ruta=None):
+        """
+        Crea un respaldo de /etc/exports (o del archivo indicado)
+        Retorna el id del respaldo o None
+        """
+        ruta = ruta or self.ruta_exports
         try:
-            if os.path.exists(self.ruta_exports):
-                marca_tiempo = datetime.now().strftime("%Y%m%d_%H%M%S")
-                ruta_respaldo_timestamp = "{0}.{1}".format(self.ruta_respaldo, marca_tiempo)
-                shutil.copy2(self.ruta_exports, ruta_respaldo_timestamp)
-                logger.info("Respaldo creado: {0}".format(ruta_respaldo_timestamp))
+            return self.obtener_almacen_respaldos().guardar(ruta)
         except Exception as e:
             logger.error("Error creando respaldo: {0}".format(e))
+            return None
 
-    def agregar_configuracion(self, carpeta, hosts, opciones, ajustar_permisos=False):
+    def obtener_registro_auditoria(self):
         """
-        Agrega una nueva línea a /etc/exports
-        Soporta archivos individuales agregando fsid automáticamente
+        Retorna el registro de auditoría de cambios (se crea la primera vez que se usa)
+        """
+        if self._registro_auditoria is None:
+            self._registro_auditoria = RegistroAuditoria(self.ruta_auditoria)
+        return self._registro_auditoria
+
+    def _auditar(self, ruta, anteriores, origen):
+        """
+        Registra los pares ruta/host que cambiaron en ruta respecto a anteriores
+        ({(ruta, host): opciones} leído antes de escribir)
+        El archivo ya está escrito: un error del registro se informa pero no se propaga
+        Retorna el número de cambios registrados
+        """
+        try:
+            cambios = cambios_entre(anteriores, self.obtener_modelo(ruta).exportaciones())
+            return self.obtener_registro_auditoria().registrar(ruta, cambios, origen)
+        except Exception as e:
+            logger.error("Error registrando los cambios de {0} en la auditoría: {1}".format(ruta, e))
+            return 0
+
+    def historial_cambios(self, ruta=None, host=None, desde=None, hasta=None, limite=LIMITE_HISTORIAL):
+        """
+        Retorna quién cambió qué y cuándo (lo más reciente primero), filtrando
+        por ruta exportada y/o host; ver RegistroAuditoria.historial
         """
         try:
-            if not self._validar_parametros(carpeta, hosts, opciones):
+            return self.obtener_registro_auditoria().historial(ruta, host, desde, hasta, limite)
+        except Exception as e:
+            logger.error("Error consultando la auditoría: {0}".format(e))
+            return []
+
+    def listar_respaldos(self, archivo=None):
+        """
+        Retorna los respaldos (del más reciente al más antiguo)
+        archivo limita la lista a /etc/exports o a un drop-in de exports.d
+        """
+        if archivo is not None:
+            archivo = self._resolver_archivo(archivo)
+        return self.obtener_almacen_respaldos().listar(archivo)
+
+    def diferencias_respaldo(self, identificador, otro=None):
+        """
+        Retorna el diff unificado entre un respaldo y el archivo actual
+        (o entre dos respaldos si se indica otro)
+        """
+        almacen = self.obtener_almacen_respaldos()
+        respaldo = almacen.obtener(identificador)
+        if respaldo is None:
+            raise KeyError("No existe el respaldo {0}".format(identificador))
+        anterior = almacen.leer(identificador)
+        nombre_anterior = "{0} (respaldo {1})".format(respaldo['archivo'], identificador)
+
+        if otro is not None:
+            nuevo = almacen.leer(otro)
+            nombre_nuevo = "{0} (respaldo {1})".format(almacen.obtener(otro)['archivo'], otro)
+        else:
+            try:
+                with open(respaldo['archivo'], 'rb') as f:
+                    nuevo = f.read()
+            except FileNotFoundError:
+                nuevo = b""
+            nombre_nuevo = "{0} (actual)".format(respaldo['archivo'])
+
+        return almacen.diferencias(anterior, nuevo, nombre_anterior, nombre_nuevo)
+
+    def restaurar_respaldo(self, identificador):
+        """
+        Restaura un respaldo sobre su archivo original
+        El contenido actual se respalda antes de reemplazarlo
+        """
+        try:
+            almacen = self.obtener_almacen_respaldos()
+            respaldo = almacen.obtener(identificador)
+            if respaldo is None:
+                logger.error("No existe el respaldo {0}".format(identificador))
                 return False
             
-            # Si es un archivo, agregar fsid si no existe
-            if os.path.isfile(carpeta):
-                tiene_fsid = any('fsid=' in opt for opt in opciones)
-                
-                if not tiene_fsid:
-                    fsid = self.generar_fsid_desde_ruta(carpeta)
-                    fsids_usados = self.obtener_fsids_usados()
-                    
-                    while fsid in fsids_usados:
-                        fsid = (fsid + 1) % 9999 + 1
-                    
-                    opciones.append('fsid={0}'.format(fsid))
-                    logger.info("Archivo individual detectado - Agregando fsid={0}".format(fsid))
-                
-                if 'no_subtree_check' not in opciones and 'subtree_check' not in opciones:
-                    opciones.append('no_subtree_check')
-                    logger.info("Agregando no_subtree_check (recomendado para archivos)")
-            
-            # Si se solicita, ajustar permisos del filesystem
-            if ajustar_permisos:
-                exito, mensaje = self.aplicar_permisos_filesystem(carpeta, opciones)
-                if not exito:
-                    logger.warning("No se pudieron ajustar los permisos del filesystem")
+            ruta = self._resolver_archivo(respaldo['archivo'])
+            contenido = almacen.leer(identificador)
+            anteriores = self.obtener_modelo(ruta).exportaciones()
             
-            self._crear_respaldo()
-            linea = self._formatear_linea_exports(carpeta, hosts, opciones)
+            self._crear_respaldo(ruta)
+            escribir_atomico(ruta, contenido.decode())
+            self.invalidar_cache(ruta)
+            self._auditar(ruta, anteriores, 'restauracion')
             
-            with open(self.ruta_exports, 'a') as f:
-                f.write("\n" + linea + "\n")
+            logger.exito("Respaldo {0} restaurado en {1}".format(identificador, ruta))
+            return True
+        except Exception as e:
+            logger.error("Error restaurando respaldo: {0}".format(e))
+            return False
+
+    def importar_respaldos_antiguos(self, eliminar=True):
+        """
+        Incorpora al almacén las copias completas del esquema anterior
+        (exports.respaldo.AAAAMMDD_HHMMSS y exports.d/*.exports.respaldo.*)
+        Con eliminar=True se borran las copias ya importadas
+        Retorna el número de copias procesadas
+        """
+        candidatos = []
+        directorios = [os.path.dirname(os.path.abspath(self.ruta_exports)), self.ruta_exports_d]
+        for directorio in directorios:
+            try:
+                nombres = os.listdir(directorio)
+            except OSError:
+                continue
+            for nombre in nombres:
+                base, separador, marca = nombre.rpartition('.respaldo.')
+                if not separador:
+                    continue
+                try:
+                    fecha = datetime.strptime(marca, "%Y%m%d_%H%M%S")
+                except ValueError:
+                    continue
+                original = os.path.join(directorio, base)
+                if original != os.path.abspath(self.ruta_exports) and not base.endswith('.exports'):
+                    continue
+                candidatos.append((fecha, original, os.path.join(directorio, nombre)))
+
+        almacen = self.obtener_almacen_respaldos()
+        originales = set()
+        for fecha, original, ruta_copia in sorted(candidatos):
+            almacen.importar(ruta_copia, original, time.mktime(fecha.timetuple()))
+            originales.add(os.path.abspath(original))
+            if eliminar:
+                os.remove(ruta_copia)
+
+        for original in originales:
+            almacen.aplicar_retencion(original)
+
+        logger.info("{0} respaldos antiguos importados".format(len(candidatos)))
+        return len(candidatos)
+
+    def iniciar_transaccion(self, archivo=None):
+        """
+        Inicia una transacción para agregar, eliminar o modificar muchas
+        configuraciones con una sola validación, un respaldo y una escritura
+        archivo permite editar un drop-in de exports.d en lugar de /etc/exports
+        """
+        return TransaccionExports(self, archivo)
+
+    def agregar_configuracion(self, carpeta, hosts, opciones, ajustar_permisos=False, archivo=None):
+        """
+        Agrega una nueva línea a /etc/exports (o al drop-in indicado en archivo)
+        Soporta archivos individuales agregando fsid automáticamente
+        """
+        try:
+            transaccion = self.iniciar_transaccion(archivo)
+            transaccion.agregar(carpeta, hosts, opciones, ajustar_permisos=ajustar_permisos)
+            resultado = transaccion.confirmar()
+            if not resultado["success"]:
+                return False
             
-            logger.exito("Configuración agregada: {0}".format(linea))
+            logger.exito("Configuración agregada: {0}".format(resultado["agregadas"][0]))
             return True
         except Exception as e:
             logger.error("Error agregando configuración: {0}".format(e))
             return False
 
-    def eliminar_configuracion(self, indice):
+    def eliminar_configuracion(self, indice, archivo=None):
         """
-        Elimina la configuración por índice
+        Elimina la configuración por índice (dentro de /etc/exports o del drop-in indicado)
+        Los comentarios y el resto de líneas del archivo se conservan
         """
         try:
-            configs = self.leer_configuracion_actual()
-            if indice < 0 or indice >= len(configs):
+            transaccion = self.iniciar_transaccion(archivo)
+            if indice < 0 or indice >= len(transaccion.configuraciones):
                 return False
             
-            self._crear_respaldo()
-            
-            with open(self.ruta_exports, 'w') as f:
-                for i, c in enumerate(configs):
-                    if i == indice:
-                        continue
-                    f.write(c['linea_original'].rstrip("\n") + "\n")
+            transaccion.eliminar(indice)
+            if not transaccion.confirmar()["success"]:
+                return False
             
             logger.info("Configuración {0} eliminada".format(indice))
             return True
@@ -346,13 +814,132 @@ class GestorNFS:
             logger.error("Error eliminando configuración: {0}".format(e))
             return False
 
-    def aplicar_cambios_nfs(self):
+    def _ruta_estado_aplicado(self):
+        """Ruta del registro de las exportaciones aplicadas por última vez"""
+        nombre = hashlib.sha1(os.path.abspath(self.ruta_exports).encode()).hexdigest()[:16]
+        return os.path.join(DIRECTORIO_ESTADO_EXPORTS, "aplicado-{0}.json".format(nombre))
+
+    def _cargar_exportaciones_aplicadas(self):
+        """
+        Retorna {(ruta, host): opciones} de la última aplicación o None si no hay registro
+        """
+        try:
+            with open(self._ruta_estado_aplicado(), 'r') as f:
+                datos = json.load(f)
+            return {(ruta, host): tuple(opciones) for ruta, host, opciones in datos['exportaciones']}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _guardar_exportaciones_aplicadas(self, exportaciones):
+        """Registra las exportaciones que quedaron aplicadas"""
+        try:
+            if not os.path.exists(DIRECTORIO_ESTADO_EXPORTS):
+                os.makedirs(DIRECTORIO_ESTADO_EXPORTS)
+            datos = {
+                'ruta_exports': self.ruta_exports,
+                'exportaciones': [
+                    [ruta, host, list(opciones)]
+                    for (ruta, host), opciones in sorted(exportaciones.items())
+                ]
+            }
+            ruta = self._ruta_estado_aplicado()
+            temporal = ruta + ".tmp"
+            with open(temporal, 'w') as f:
+                json.dump(datos, f)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning("No se pudo guardar el estado aplicado: {0}".format(e))
+
+    def _registro_coincide_con_etab(self, anteriores):
+        """
+        Comprueba que el registro de la última aplicación coincide con lo que el
+        servidor tiene aplicado (etab): los mismos pares ruta/host y las mismas
+        opciones efectivas. Deja de coincidir tras un exportfs -u/-ua externo o si
+        otro usuario (con otro registro) aplicó cambios
+        """
+        aplicadas = self.obtener_vista_kernel().exportaciones_aplicadas()
+        if set(aplicadas) != set(anteriores):
+            return False
+        return not any(
+            comparar_opciones(opciones, aplicadas[clave]) for clave, opciones in anteriores.items()
+        )
+
+    def _aplicar_incremental(self, cambios, bajas):
         """
-        Ejecuta 'exportfs -ra' para aplicar cambios
+        Aplica solo la diferencia con exportfs
+        Primero desexporta las bajas y luego exporta los pares nuevos o modificados,
+        agrupados por opciones para usar pocas llamadas
+        Retorna True si todas las llamadas tuvieron éxito
+        """
+        operaciones = []
+
+        destinos = ["{0}:{1}".format(host, ruta) for ruta, host in bajas]
+        for inicio in range(0, len(destinos), MAX_DESTINOS_POR_LLAMADA):
+            lote = destinos[inicio:inicio + MAX_DESTINOS_POR_LLAMADA]
+            operaciones.append(('exportfs_retirar', {'destinos': lote}))
+
+        por_opciones = {}
+        for (ruta, host), opciones in sorted(cambios.items()):
+            por_opciones.setdefault(opciones, []).append("{0}:{1}".format(host, ruta))
+
+        for opciones, destinos in por_opciones.items():
+            # exportfs -i: las opciones son exactamente las de la línea, sin mezclar con /etc/exports
+            for inicio in range(0, len(destinos), MAX_DESTINOS_POR_LLAMADA):
+                lote = destinos[inicio:inicio + MAX_DESTINOS_POR_LLAMADA]
+                operaciones.append(('exportfs_exportar', {'destinos': lote, 'opciones': list(opciones)}))
+
+        for operacion, argumentos in operaciones:
+            resultado = self._ejecutar_operacion(operacion, **argumentos)
+            if not resultado["success"]:
+                logger.error("Error en exportfs: {0}".format(resultado["stderr"]))
+                return False
+
+        logger.exito("Cambios NFS aplicados de forma incremental: {0} exportados, {1} retirados ({2} llamadas)".format(
+            len(cambios), len(bajas), len(operaciones)
+        ))
+        return True
+
+    def _exportaciones_configuradas(self):
+        """{(ruta, host): opciones} de /etc/exports y exports.d, como los combina exportfs"""
+        # exportfs lee /etc/exports y después exports.d
+        actuales = self.obtener_modelo().exportaciones()
+        for modelo in self._modelos_exports_d().values():
+            actuales.update(modelo.exportaciones())
+        return actuales
+
+    def aplicar_cambios_nfs(self, incremental=True):
+        """
+        Aplica los cambios de /etc/exports
+        Con incremental=True solo exporta o retira los pares host:ruta que cambiaron
+        desde la última aplicación; 'exportfs -ra' se usa si no hay registro previo,
+        si el registro no coincide con etab, si la diferencia es muy grande o si
+        alguna llamada puntual falla
         """
         try:
-            resultado = self._run_command("exportfs -ra")
+            actuales = self._exportaciones_configuradas()
+            
+            if incremental:
+                anteriores = self._cargar_exportaciones_aplicadas()
+                if anteriores is not None and not self._registro_coincide_con_etab(anteriores):
+                    logger.warning("Las exportaciones aplicadas (etab) no coinciden con el registro, "
+                                   "se usará exportfs -ra")
+                    anteriores = None
+                if anteriores is not None:
+                    cambios, bajas = diferencia_exportaciones(anteriores, actuales)
+                    if not cambios and not bajas:
+                        logger.info("No hay cambios de exportaciones pendientes")
+                        return True
+                    
+                    total = len(cambios) + len(bajas)
+                    if total <= max(MAX_CAMBIOS_INCREMENTALES, len(actuales) // 2):
+                        if self._aplicar_incremental(cambios, bajas):
+                            self._guardar_exportaciones_aplicadas(actuales)
+                            return True
+                        logger.warning("Aplicación incremental fallida, se usará exportfs -ra")
+            
+            resultado = self._ejecutar_operacion('exportfs_recargar')
             if resultado["success"]:
+                self._guardar_exportaciones_aplicadas(actuales)
                 logger.exito("Cambios NFS aplicados con exportfs -ra")
                 return True
             else:
@@ -362,12 +949,167 @@ class GestorNFS:
             logger.error("Error aplicando cambios NFS: {0}".format(e))
             return False
 
+    def importar_exportaciones(self, ruta_origen, archivo=None, todo_o_nada=False):
+        """
+        Importa exportaciones desde un CSV, JSON o JSON Lines (ver importacion_exports)
+        Todas las filas se validan antes de escribir y los errores se informan juntos;
+        las filas válidas se agregan en una sola transacción (ninguna si todo_o_nada
+        y hay errores). Los pares ruta/host que ya están exportados se omiten
+        Retorna {"success", "message", "importadas", "existentes", "errores"};
+        success es False si alguna fila tuvo errores o la escritura falló
+        """
+        resultado = {"success": False, "message": "", "importadas": 0, "existentes": 0, "errores": []}
+        try:
+            validas, errores = validar_filas(leer_filas(ruta_origen))
+            transaccion = self.iniciar_transaccion(archivo)
+        except (OSError, ValueError) as e:
+            resultado["message"] = "[ERROR] No se pudo leer {0}: {1}".format(ruta_origen, e)
+            logger.error(resultado["message"])
+            return resultado
+
+        exportados = set(self.obtener_modelo(transaccion.ruta).exportaciones())
+        vistos = {}
+        for numero, ruta, hosts, opciones, tipo in validas:
+            clave_ruta = normalizar_ruta(ruta)
+            nuevos = []
+            for host in hosts.split():
+                clave = (clave_ruta, host)
+                if clave in vistos:
+                    errores.append((numero, "{0} {1} repetido (fila {2})".format(ruta, host, vistos[clave])))
+                elif clave in exportados:
+                    resultado["existentes"] += 1
+                else:
+                    vistos[clave] = numero
+                    nuevos.append(host)
+            if nuevos:
+                # La fila ya se validó (la ruta, en paralelo): la transacción no repite los stat
+                transaccion.agregar(ruta, " ".join(nuevos), opciones, tipo=tipo)
+
+        errores.sort()
+        resultado["errores"] = ["Fila {0}: {1}".format(numero, mensaje) for numero, mensaje in errores]
+
+        if errores and todo_o_nada:
+            transaccion.descartar()
+            resultado["message"] = "[ERROR] {0} filas con errores, no se importó nada".format(len(errores))
+            logger.error(resultado["message"])
+            return resultado
+
+        if len(transaccion):
+            confirmacion = transaccion.confirmar()
+            if not confirmacion["success"]:
+                resultado["errores"].extend(confirmacion["errores"])
+                resultado["message"] = confirmacion["message"]
+                return resultado
+            resultado["importadas"] = len(confirmacion["agregadas"])
+        else:
+            transaccion.descartar()
+
+        resultado["success"] = not errores
+        resultado["message"] = "{0} {1} exportaciones importadas, {2} ya existían, {3} filas con errores".format(
+            "[AVISO]" if errores else "[OK]", resultado["importadas"], resultado["existentes"], len(errores)
+        )
+        logger.info(resultado["message"])
+        return resultado
+
+    def exportar_exportaciones(self, ruta_destino, archivo=None):
+        """
+        Guarda las exportaciones de /etc/exports (o del drop-in indicado) en CSV, JSON
+        o JSON Lines según la extensión, con una fila por host que se puede volver a importar
+        Retorna {"success", "message", "filas"}
+        """
+        try:
+            formato = formato_archivo(ruta_destino)
+            configuraciones = self.obtener_modelo(archivo).configuraciones
+            temporal = ruta_destino + ".tmp"
+            with open(temporal, 'w', newline='' if formato == 'csv' else None) as f:
+                filas = escribir_filas(f, configuraciones, formato)
+            os.replace(temporal, ruta_destino)
+        except (OSError, ValueError) as e:
+            mensaje = "[ERROR] No se pudo exportar a {0}: {1}".format(ruta_destino, e)
+            logger.error(mensaje)
+            return {"success": False, "message": mensaje, "filas": 0}
+
+        mensaje = "[OK] {0} filas guardadas en {1}".format(filas, ruta_destino)
+        logger.info(mensaje)
+        return {"success": True, "message": mensaje, "filas": filas}
+
+    def reconciliar(self, especificacion, archivo=None, aplicar=True, simular=False):
+        """
+        Lleva /etc/exports (o el drop-in indicado en archivo) al estado deseado
+        especificacion: lista de exportaciones o {"exportaciones": [...]} (ver reconciliador_exports)
+        Solo se escriben las líneas que difieren, en una transacción; con aplicar=True se
+        ejecuta después la aplicación incremental (solo los pares host:ruta que cambiaron)
+        Es idempotente: con el archivo ya reconciliado no se escribe nada
+        Retorna {"success", "message", "errores", "agregadas", "modificadas",
+        "eliminadas", "sin_cambios", "aplicado"}
+        """
+        resultado = {
+            "success": False, "message": "", "errores": [], "agregadas": [],
+            "modificadas": [], "eliminadas": [], "sin_cambios": 0, "aplicado": None
+        }
+        try:
+            deseado = normalizar_especificacion(especificacion)
+        except ValueError as e:
+            resultado["errores"] = str(e).splitlines()
+            resultado["message"] = "[ERROR] Especificación no válida ({0} errores)".format(len(resultado["errores"]))
+            logger.error(resultado["message"])
+            return resultado
+
+        try:
+            transaccion = self.iniciar_transaccion(archivo)
+        except ValueError as e:
+            resultado["message"] = "[ERROR] {0}".format(e)
+            return resultado
+
+        plan = planificar(transaccion.configuraciones, deseado)
+        for indice, clientes in plan['modificar'].items():
+            transaccion.modificar(indice, clientes=clientes)
+        for indice in plan['eliminar']:
+            transaccion.eliminar(indice)
+        for ruta, hosts, opciones in plan['agregar']:
+            transaccion.agregar(ruta, hosts, opciones)
+
+        resultado.update({
+            "agregadas": ["{0} {1} ({2})".format(r, h, ",".join(o)) for r, h, o in plan['agregar']],
+            "modificadas": [transaccion.configuraciones[i]['carpeta'] for i in sorted(plan['modificar'])],
+            "eliminadas": [transaccion.configuraciones[i]['carpeta'] for i in plan['eliminar']],
+            "sin_cambios": plan['sin_cambios']
+        })
+        resumen = "{0} agregadas, {1} modificadas, {2} eliminadas, {3} sin cambios".format(
+            len(plan['agregar']), len(plan['modificar']), len(plan['eliminar']), plan['sin_cambios']
+        )
+
+        if simular or not len(transaccion):
+            transaccion.descartar()
+        else:
+            confirmacion = transaccion.confirmar()
+            if not confirmacion["success"]:
+                resultado["errores"] = confirmacion["errores"]
+                resultado["message"] = confirmacion["message"]
+                return resultado
+
+        if simular:
+            resultado["success"] = True
+            resultado["message"] = "[SIMULACIÓN] {0}".format(resumen)
+            return resultado
+
+        if aplicar:
+            resultado["aplicado"] = self.aplicar_cambios_nfs(incremental=True)
+        resultado["success"] = resultado["aplicado"] is not False
+        if resultado["success"]:
+            resultado["message"] = "[OK] Reconciliado: {0}".format(resumen)
+            logger.info(resultado["message"])
+        else:
+            resultado["message"] = "[ERROR] Archivo reconciliado ({0}) pero exportfs falló".format(resumen)
+            logger.error(resultado["message"])
+        return resultado
+
     def verificar_servicio_nfs(self):
         """
         Verifica el estado del servicio NFS
         """
         try:
-            resultado = self._run_command("systemctl is-active nfs-server")
+            resultado = self._ejecutar_operacion('estado_servicio', servicio='nfs-server')
             
             if resultado["success"]:
                 return (True, "Servicio NFS activo y funcionando")
@@ -377,15 +1119,214 @@ class GestorNFS:
         except Exception as e:
             return (False, "No se pudo verificar el servicio NFS: {0}".format(str(e)))
 
-    def verificar_montajes_y_disco(self):
+    def obtener_colector_estadisticas(self):
+        """Retorna el colector de estadísticas de nfsd (se crea la primera vez)"""
+        if self._colector_estadisticas is None:
+            self._colector_estadisticas = ColectorEstadisticasNfsd()
+        return self._colector_estadisticas
+
+    def obtener_estadisticas_nfsd(self, intervalo=1.0):
+        """
+        Retorna {"success", "message", "datos"} con las tasas actuales del servidor
+        (operaciones por segundo, bytes, hilos, retransmisiones)
+        Si el colector no está activo se toman dos lecturas separadas por intervalo
+        """
+        colector = self.obtener_colector_estadisticas()
+        tasas = colector.ultima_muestra() if colector.activo() else None
+        if tasas is None:
+            if leer_estadisticas() is None:
+                return {
+                    "success": False,
+                    "message": "[ERROR] No hay estadísticas de nfsd (¿servidor NFS no iniciado?)",
+                    "datos": None
+                }
+            colector.muestrear()
+            time.sleep(intervalo)
+            tasas = colector.muestrear()
+
+        if tasas is None:
+            return {"success": False, "message": "[ERROR] No se pudieron calcular las tasas", "datos": None}
+        return {"success": True, "message": "[OK] Estadísticas de nfsd", "datos": tasas}
+
+    def _medir_tasas(self, intervalo):
+        """Mide las tasas de nfsd entre dos lecturas separadas por intervalo (None si no hay datos)"""
+        anterior = leer_estadisticas()
+        if anterior is None:
+            return None
+        time.sleep(intervalo)
+        actual = leer_estadisticas()
+        return calcular_tasas(anterior, actual) if actual is not None else None
+
+    def recomendar_hilos_nfsd(self):
+        """
+        Recomienda un número de hilos de nfsd según la saturación observada
+        por el colector de estadísticas (debe estar activo un tiempo para tener muestras)
+        Retorna {"success", "message", "recomendacion"}
+        """
+        colector = self.obtener_colector_estadisticas()
+        recomendacion = recomendar_hilos(list(colector.historial), leer_hilos_actuales())
+        if recomendacion['recomendado'] is None:
+            return {
+                "success": False,
+                "message": "[ERROR] {0}".format(recomendacion['motivo']),
+                "recomendacion": recomendacion
+            }
+        return {"success": True, "message": "[OK] {0}".format(recomendacion['motivo']), "recomendacion": recomendacion}
+
+    def aplicar_hilos_nfsd(self, hilos, persistir=True, intervalo=5.0):
+        """
+        Cambia el número de hilos de nfsd en caliente (rpc.nfsd) y, con persistir=True,
+        lo guarda en /etc/sysconfig/nfs o /etc/nfs.conf para el próximo arranque
+        Retorna {"success", "message", "antes", "despues", "archivo"} con las tasas
+        medidas durante intervalo segundos antes y después del cambio
+        """
+        colector = self.obtener_colector_estadisticas()
+        antes = colector.ultima_muestra() if colector.activo() else None
+        if antes is None:
+            antes = self._medir_tasas(intervalo)
+
+        resultado = self._ejecutar_operacion('ajustar_hilos_nfsd', hilos=hilos)
+        if not resultado["success"]:
+            logger.error("No se pudo ajustar los hilos de nfsd: {0}".format(resultado["stderr"]))
+            return {
+                "success": False,
+                "message": "[ERROR] No se pudo ajustar los hilos: {0}".format(resultado["stderr"]),
+                "antes": antes, "despues": None, "archivo": None
+            }
+        logger.exito("Hilos de nfsd ajustados a {0}".format(hilos))
+
+        archivo = None
+        mensaje = "[OK] nfsd con {0} hilos".format(hilos)
+        if persistir:
+            archivo, actualizar = archivo_configuracion_hilos()
+            try:
+                try:
+                    with open(archivo, 'r') as f:
+                        texto = f.read()
+                except FileNotFoundError:
+                    texto = ""
+                nuevo = actualizar(texto, hilos)
+                if nuevo != texto:
+                    if texto:
+                        self._crear_respaldo(archivo)
+                    escribir_atomico(archivo, nuevo)
+                mensaje += " (guardado en {0})".format(archivo)
+            except OSError as e:
+                logger.error("Error guardando el número de hilos en {0}: {1}".format(archivo, e))
+                return {
+                    "success": False,
+                    "message": "[ERROR] Hilos ajustados pero no guardados en {0}: {1}".format(archivo, e),
+                    "antes": antes, "despues": None, "archivo": archivo
+                }
+
+        return {
+            "success": True,
+            "message": mensaje,
+            "antes": antes,
+            "despues": self._medir_tasas(intervalo),
+            "archivo": archivo
+        }
+
+    def obtener_vista_kernel(self):
+        """Retorna el lector del estado del kernel (se crea la primera vez)"""
+        if self._vista_kernel is None:
+            self._vista_kernel = VistaKernel()
+        return self._vista_kernel
+
+    def estado_kernel(self):
+        """
+        Compara lo configurado con lo que exportfs aplicó (etab) y el kernel exporta,
+        y reúne los clientes conectados (rmtab para NFSv3, /proc/fs/nfsd/clients para NFSv4)
+        Retorna {"success", "message", "exportaciones", "clientes", "derivas"}; derivas
+        cuenta los pares ruta/host cuyo estado no es 'ok' (ver estado_kernel.combinar)
+        """
+        try:
+            vista = self.obtener_vista_kernel()
+            exportaciones, clientes = combinar(self._exportaciones_configuradas(), vista.leer())
+        except Exception as e:
+            logger.error("Error leyendo el estado del kernel: {0}".format(e))
+            return {
+                "success": False,
+                "message": "[ERROR] No se pudo leer el estado del kernel: {0}".format(e),
+                "exportaciones": [], "clientes": [], "derivas": 0
+            }
+
+        derivas = sum(1 for e in exportaciones if e['estado'] != 'ok')
+        if derivas:
+            mensaje = "[AVISO] {0} de {1} exportaciones difieren de lo aplicado, {2} clientes".format(
+                derivas, len(exportaciones), len(clientes)
+            )
+        else:
+            mensaje = "[OK] {0} exportaciones aplicadas, {1} clientes".format(len(exportaciones), len(clientes))
+        if not os.path.exists(vista.ruta_etab):
+            mensaje += " (no existe {0}: el servidor NFS no ha aplicado exportaciones)".format(vista.ruta_etab)
+        return {
+            "success": True,
+            "message": mensaje,
+            "exportaciones": exportaciones,
+            "clientes": clientes,
+            "derivas": derivas
+        }
+
+    def iniciar_servicio_nfs(self):
         """
-        Obtiene información de espacio en disco
+        Inicia el servicio nfs-server
+        Retorna (exito, mensaje)
         """
-        resultado = self._run_command("df -h")
+        resultado = self._ejecutar_operacion('iniciar_servicio', servicio='nfs-server')
         if resultado["success"]:
-            return {"success": True, "message": "Espacio en disco:", "data": resultado["stdout"]}
+            logger.exito("Servicio NFS iniciado")
+            return (True, "Servicio NFS iniciado")
+        logger.error("No se pudo iniciar el servicio NFS: {0}".format(resultado["stderr"]))
+        return (False, resultado["stderr"])
+
+    def montar_local(self, ruta_local, punto_montaje):
+        """
+        Monta una exportación de este mismo servidor (localhost) en punto_montaje
+        Retorna el resultado de la operación {"success", "stdout", "stderr", ...}
+        """
+        return self._ejecutar_operacion(
+            'montar', servidor='localhost', ruta_remota=ruta_local, punto_montaje=punto_montaje
+        )
+
+    def obtener_monitor_capacidad(self):
+        """Retorna el monitor de capacidad de los filesystems exportados (se crea la primera vez)"""
+        if self._monitor_capacidad is None:
+            self._monitor_capacidad = MonitorCapacidad()
+        return self._monitor_capacidad
+
+    def verificar_montajes_y_disco(self):
+        """
+        Mide el espacio y los inodos de cada ruta exportada (statvfs, una vez por filesystem)
+        Retorna {"success", "message", "exportaciones", "filesystems"}: exportaciones es
+        la lista de {'ruta', 'filesystem', 'error'} de MonitorCapacidad.medir y
+        filesystems los filesystems distintos, del más lleno al más vacío
+        """
+        rutas = []
+        for config in self.leer_configuracion_completa():
+            if config['carpeta'] not in rutas:
+                rutas.append(config['carpeta'])
+
+        exportaciones = self.obtener_monitor_capacidad().medir(rutas)
+        filesystems = {}
+        for exportacion in exportaciones:
+            if exportacion['filesystem'] is not None:
+                filesystems[exportacion['filesystem']['dispositivo']] = exportacion['filesystem']
+        filesystems = sorted(filesystems.values(), key=lambda f: f['porcentaje'], reverse=True)
+
+        errores = sum(1 for e in exportaciones if e['error'] is not None)
+        if not rutas:
+            mensaje = "No hay exportaciones configuradas"
         else:
-            return {"success": False, "message": "Error obteniendo información de disco"}
+            mensaje = "{0} exportaciones en {1} filesystems".format(len(rutas), len(filesystems))
+            if errores:
+                mensaje += " ({0} rutas no accesibles)".format(errores)
+        return {
+            "success": True,
+            "message": mensaje,
+            "exportaciones": exportaciones,
+            "filesystems": filesystems
+        }
 
     def obtener_opciones_validas(self):
         """
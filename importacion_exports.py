@@ -0,0 +1,244 @@
+"""
+Importación y exportación masiva de exportaciones NFS
+Lee filas de CSV, JSON (lista) o JSON Lines sin cargar el archivo completo,
+valida rutas, hosts y opciones por lotes (las rutas en paralelo, que es lo que
+cuesta: un stat por ruta) y reúne todos los errores en una sola pasada
+
+Columnas / claves de cada fila: ruta, hosts (separados por espacios),
+opciones ("rw,sync" o lista) y perfil (opcional, ver perfiles_exports)
+"""
+import os
+import csv
+import json
+import re
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+
+from perfiles_exports import PERFILES, expandir_perfil
+from utils.validaciones import validar_ruta, validar_red, validar_opciones_nfs
+
+
+# Filas que se validan juntas (las rutas del lote se comprueban en paralelo)
+TAMANO_LOTE = 1000
+
+# Hilos para comprobar rutas (la latencia de stat domina en discos de red)
+MAX_HILOS_VALIDACION = 16
+
+TAMANO_BLOQUE_LECTURA = 65536
+
+COLUMNAS = ('ruta', 'hosts', 'opciones', 'perfil')
+
+_SEPARADOR_OPCIONES = re.compile(r'[,;\s]+')
+_NETGROUP = re.compile(r'^@[A-Za-z0-9_.-]+$')
+_PATRON_HOST = re.compile(r'^[A-Za-z0-9_.*?\[\]-]+$')
+
+
+def formato_archivo(ruta):
+    """Retorna 'csv', 'json' o 'jsonl' según la extensión; ValueError si no se reconoce"""
+    extension = os.path.splitext(ruta)[1].lower()
+    formatos = {'.csv': 'csv', '.json': 'json', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+    if extension not in formatos:
+        raise ValueError("Formato no soportado: {0} (use .csv, .json o .jsonl)".format(ruta))
+    return formatos[extension]
+
+
+def _iterar_lista_json(archivo):
+    """
+    Recorre los elementos de una lista JSON leyendo el archivo por bloques
+    (cada elemento se decodifica en cuanto está completo)
+    """
+    decodificador = json.JSONDecoder()
+    buffer = ""
+    posicion = 0
+    inicio_lista = False
+    fin_archivo = False
+    leidos = 0
+
+    while True:
+        # Saltar espacios y separadores antes del siguiente elemento
+        while posicion < len(buffer) and buffer[posicion] in " \t\r\n,":
+            posicion += 1
+        if not inicio_lista and posicion < len(buffer):
+            if buffer[posicion] != '[':
+                raise ValueError("El JSON debe ser una lista de exportaciones")
+            inicio_lista = True
+            posicion += 1
+            continue
+        if inicio_lista and posicion < len(buffer) and buffer[posicion] == ']':
+            return
+
+        if posicion < len(buffer):
+            try:
+                elemento, fin = decodificador.raw_decode(buffer, posicion)
+            except ValueError:
+                if fin_archivo:
+                    raise ValueError("JSON no válido después del elemento {0}".format(leidos))
+            else:
+                yield elemento
+                leidos += 1
+                posicion = fin
+                continue
+        elif fin_archivo:
+            raise ValueError("JSON incompleto: falta ']'")
+
+        bloque = archivo.read(TAMANO_BLOQUE_LECTURA)
+        fin_archivo = not bloque
+        buffer = buffer[posicion:] + bloque
+        posicion = 0
+
+
+def leer_filas(ruta):
+    """
+    Genera (numero, fila) con las filas del archivo, sin leerlo entero
+    numero es la línea (CSV, JSON Lines) o la posición en la lista (JSON)
+    Una fila que no es un objeto se entrega como None
+    """
+    formato = formato_archivo(ruta)
+    with open(ruta, 'r', newline='' if formato == 'csv' else None) as archivo:
+        if formato == 'csv':
+            lector = csv.DictReader(archivo)
+            faltan = [c for c in ('ruta', 'hosts') if c not in (lector.fieldnames or [])]
+            if faltan:
+                raise ValueError("Faltan columnas en el CSV: {0}".format(", ".join(faltan)))
+            for fila in lector:
+                yield lector.line_num, fila
+        elif formato == 'jsonl':
+            for numero, linea in enumerate(archivo, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    fila = None
+                yield numero, fila if isinstance(fila, dict) else None
+        else:
+            for numero, fila in enumerate(_iterar_lista_json(archivo), 1):
+                yield numero, fila if isinstance(fila, dict) else None
+
+
+def validar_host(host):
+    """Valida un host de exports: IP, red, nombre, comodín (*.dominio) o @netgroup"""
+    if host.startswith('@'):
+        return (True, "") if _NETGROUP.match(host) else (False, "Netgroup no válido: {0}".format(host))
+    if ':' in host:
+        try:
+            ipaddress.ip_network(host, strict=False)
+            return (True, "")
+        except ValueError:
+            return (False, "Dirección IPv6 no válida: {0}".format(host))
+    if host != '*' and ('*' in host or '?' in host):
+        return (True, "") if _PATRON_HOST.match(host) else (False, "Comodín no válido: {0}".format(host))
+    return validar_red(host)
+
+
+def normalizar_fila(fila):
+    """
+    Valida lo que no depende del sistema de archivos
+    Retorna (ruta, hosts, opciones); ValueError con el motivo si la fila no es válida
+    """
+    if fila is None:
+        raise ValueError("La fila no es un objeto con ruta, hosts y opciones")
+
+    ruta = fila.get('ruta')
+    if not isinstance(ruta, str) or not ruta.strip().startswith('/'):
+        raise ValueError("'ruta' debe ser una ruta absoluta")
+    ruta = ruta.strip()
+
+    hosts = fila.get('hosts')
+    if isinstance(hosts, list):
+        hosts = " ".join(h for h in hosts if isinstance(h, str))
+    if not isinstance(hosts, str) or not hosts.split():
+        raise ValueError("'hosts' está vacío")
+    for host in hosts.split():
+        valido, mensaje = validar_host(host)
+        if not valido:
+            raise ValueError(mensaje)
+
+    opciones = fila.get('opciones') or []
+    if isinstance(opciones, str):
+        opciones = [o for o in _SEPARADOR_OPCIONES.split(opciones) if o]
+    if not isinstance(opciones, list) or not all(isinstance(o, str) for o in opciones):
+        raise ValueError("'opciones' debe ser un texto o una lista")
+
+    perfil = (fila.get('perfil') or "").strip()
+    if perfil:
+        if perfil not in PERFILES:
+            raise ValueError("Perfil desconocido: {0}".format(perfil))
+        opciones = expandir_perfil(perfil, opciones)
+
+    valido, mensaje = validar_opciones_nfs(opciones)
+    if not valido:
+        raise ValueError(mensaje)
+    return ruta, " ".join(hosts.split()), opciones
+
+
+def validar_filas(filas, max_hilos=MAX_HILOS_VALIDACION, tamano_lote=TAMANO_LOTE):
+    """
+    Valida filas (iterable de (numero, fila)) por lotes
+    Retorna (validas, errores): validas es una lista de (numero, ruta, hosts, opciones, tipo)
+    con tipo 'directorio' o 'archivo' (de validar_ruta) y errores una lista de
+    (numero, mensaje) con todos los problemas encontrados
+    """
+    validas = []
+    errores = []
+    rutas_comprobadas = {}
+
+    def procesar(lote):
+        pendientes = sorted(set(ruta for _, ruta, _, _ in lote) - set(rutas_comprobadas))
+        if pendientes:
+            with ThreadPoolExecutor(max_workers=min(max_hilos, len(pendientes))) as ejecutor:
+                for ruta, resultado in zip(pendientes, ejecutor.map(validar_ruta, pendientes)):
+                    rutas_comprobadas[ruta] = resultado
+        for numero, ruta, hosts, opciones in lote:
+            valida, tipo, mensaje = rutas_comprobadas[ruta]
+            if valida:
+                validas.append((numero, ruta, hosts, opciones, tipo))
+            else:
+                errores.append((numero, mensaje))
+
+    lote = []
+    for numero, fila in filas:
+        try:
+            lote.append((numero,) + normalizar_fila(fila))
+        except ValueError as e:
+            errores.append((numero, str(e)))
+            continue
+        if len(lote) >= tamano_lote:
+            procesar(lote)
+            lote = []
+    if lote:
+        procesar(lote)
+
+    errores.sort()
+    return validas, errores
+
+
+def escribir_filas(archivo, configuraciones, formato):
+    """
+    Escribe las configuraciones como filas de importación (una por host, con sus opciones)
+    formato: 'csv', 'json' o 'jsonl'
+    Retorna el número de filas escritas
+    """
+    filas = (
+        {'ruta': config['carpeta'], 'hosts': host, 'opciones': ",".join(opciones)}
+        for config in configuraciones
+        for host, opciones in config['clientes']
+    )
+    total = 0
+    if formato == 'csv':
+        escritor = csv.DictWriter(archivo, fieldnames=COLUMNAS[:3], lineterminator="\n")
+        escritor.writeheader()
+        for fila in filas:
+            escritor.writerow(fila)
+            total += 1
+    elif formato == 'jsonl':
+        for fila in filas:
+            archivo.write(json.dumps(fila, ensure_ascii=False) + "\n")
+            total += 1
+    else:
+        archivo.write("[\n")
+        for fila in filas:
+            archivo.write("{0}  {1}".format(",\n" if total else "", json.dumps(fila, ensure_ascii=False)))
+            total += 1
+        archivo.write("\n]\n")
+    return total
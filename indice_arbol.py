@@ -0,0 +1,272 @@
+"""
+Índice persistente de árboles de archivos
+Guarda tamaño, mtime, inodo y hash de cada archivo para que los recorridos
+posteriores solo lean los directorios que cambiaron
+"""
+import os
+import sqlite3
+import hashlib
+import time
+
+from utils.logger import logger
+
+
+DIRECTORIO_INDICES = os.path.expanduser('~/.config/configurador-nfs/indices')
+
+TAMANO_BLOQUE = 1024 * 1024
+
+# Un directorio modificado hace menos de este margen puede volver a cambiar
+# dentro del mismo tick de mtime: no se confía en él hasta el siguiente recorrido
+MARGEN_MTIME_NS = 2 * 10 ** 9
+
+
+def calcular_hash(ruta):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo
+    """
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        bloque = f.read(TAMANO_BLOQUE)
+        while bloque:
+            resumen.update(bloque)
+            bloque = f.read(TAMANO_BLOQUE)
+    return resumen.hexdigest()
+
+
+class IndiceArbol:
+    """
+    Índice (SQLite) de un árbol de archivos
+    Si el mtime de un directorio no cambió, su lista de entradas se toma del índice
+    en lugar de leerlo con readdir
+    """
+
+    def __init__(self, raiz, directorio=None):
+        self.raiz = os.path.abspath(raiz)
+
+        directorio = directorio or DIRECTORIO_INDICES
+        if not os.path.exists(directorio):
+            os.makedirs(directorio)
+
+        nombre = hashlib.sha1(self.raiz.encode()).hexdigest()[:16] + ".db"
+        self.ruta_db = os.path.join(directorio, nombre)
+        self.conexion = sqlite3.connect(self.ruta_db)
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS archivos ("
+            " ruta TEXT PRIMARY KEY,"
+            " padre TEXT NOT NULL,"
+            " tamano INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " inodo INTEGER NOT NULL,"
+            " hash TEXT)"
+        )
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS directorios ("
+            " ruta TEXT PRIMARY KEY,"
+            " padre TEXT,"
+            " mtime_ns INTEGER NOT NULL)"
+        )
+        self.conexion.commit()
+
+        # ruta -> [tamano, mtime_ns, inodo, hash]
+        self._archivos = {}
+        # ruta -> {'mtime_ns', 'archivos', 'subdirs'}
+        self._directorios = {}
+        self._archivos_pendientes = set()
+        self._archivos_eliminados = set()
+        self._directorios_pendientes = set()
+        self._directorios_eliminados = set()
+
+        self.ultimos_cambios = {'nuevos': [], 'modificados': [], 'eliminados': []}
+        self.estadisticas = {}
+
+        self._cargar()
+
+    def _cargar(self):
+        """Carga el índice persistido en memoria"""
+        for ruta, padre, mtime_ns in self.conexion.execute(
+            "SELECT ruta, padre, mtime_ns FROM directorios"
+        ):
+            self._directorios[ruta] = {'mtime_ns': mtime_ns, 'archivos': [], 'subdirs': []}
+
+        for ruta, padre, mtime_ns in self.conexion.execute(
+            "SELECT ruta, padre, mtime_ns FROM directorios WHERE padre IS NOT NULL"
+        ):
+            if padre in self._directorios:
+                self._directorios[padre]['subdirs'].append(os.path.basename(ruta))
+
+        for ruta, padre, tamano, mtime_ns, inodo, hash_contenido in self.conexion.execute(
+            "SELECT ruta, padre, tamano, mtime_ns, inodo, hash FROM archivos"
+        ):
+            self._archivos[ruta] = [tamano, mtime_ns, inodo, hash_contenido]
+            if padre in self._directorios:
+                self._directorios[padre]['archivos'].append(os.path.basename(ruta))
+
+    def _registrar_archivo(self, relativa, info):
+        """Actualiza la entrada de un archivo a partir de su stat"""
+        anterior = self._archivos.get(relativa)
+        if anterior is None:
+            self._archivos[relativa] = [info.st_size, info.st_mtime_ns, info.st_ino, None]
+            self._archivos_pendientes.add(relativa)
+            self.ultimos_cambios['nuevos'].append(relativa)
+        elif (anterior[0], anterior[1], anterior[2]) != (info.st_size, info.st_mtime_ns, info.st_ino):
+            self._archivos[relativa] = [info.st_size, info.st_mtime_ns, info.st_ino, None]
+            self._archivos_pendientes.add(relativa)
+            self.ultimos_cambios['modificados'].append(relativa)
+
+    def escanear(self, confiar_mtime_directorios=False):
+        """
+        Recorre el árbol y retorna ruta_relativa -> (tamano, mtime_ns)
+        Los directorios con el mismo mtime no se leen de nuevo; sus archivos
+        solo se consultan con stat, salvo que confiar_mtime_directorios sea True
+        (más rápido, pero no detecta archivos modificados sin cambiar de nombre)
+        """
+        inicio_ns = time.time_ns() if hasattr(time, 'time_ns') else int(time.time() * 10 ** 9)
+        self.ultimos_cambios = {'nuevos': [], 'modificados': [], 'eliminados': []}
+        estadisticas = {'directorios_leidos': 0, 'directorios_omitidos': 0, 'archivos_consultados': 0}
+
+        resultado = {}
+        directorios_vistos = set()
+        pila = ['']
+
+        while pila:
+            relativa_dir = pila.pop()
+            ruta_dir = os.path.join(self.raiz, relativa_dir) if relativa_dir else self.raiz
+            try:
+                info_dir = os.stat(ruta_dir)
+            except OSError:
+                continue
+
+            directorios_vistos.add(relativa_dir)
+            cache = self._directorios.get(relativa_dir)
+
+            if cache is not None and cache['mtime_ns'] == info_dir.st_mtime_ns:
+                estadisticas['directorios_omitidos'] += 1
+                for nombre in cache['archivos']:
+                    relativa = os.path.join(relativa_dir, nombre)
+                    datos = self._archivos.get(relativa)
+                    if confiar_mtime_directorios and datos is not None:
+                        resultado[relativa] = (datos[0], datos[1])
+                        continue
+                    try:
+                        info = os.lstat(os.path.join(ruta_dir, nombre))
+                    except OSError:
+                        continue
+                    estadisticas['archivos_consultados'] += 1
+                    self._registrar_archivo(relativa, info)
+                    resultado[relativa] = (info.st_size, info.st_mtime_ns)
+                subdirs = cache['subdirs']
+            else:
+                estadisticas['directorios_leidos'] += 1
+                archivos = []
+                subdirs = []
+                try:
+                    entradas = list(os.scandir(ruta_dir))
+                except OSError as e:
+                    logger.warning("No se pudo leer {0}: {1}".format(ruta_dir, e))
+                    continue
+
+                for entrada in entradas:
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            subdirs.append(entrada.name)
+                        elif entrada.is_file(follow_symlinks=False):
+                            info = entrada.stat(follow_symlinks=False)
+                            relativa = os.path.join(relativa_dir, entrada.name)
+                            archivos.append(entrada.name)
+                            estadisticas['archivos_consultados'] += 1
+                            self._registrar_archivo(relativa, info)
+                            resultado[relativa] = (info.st_size, info.st_mtime_ns)
+                    except OSError:
+                        continue
+
+                # Un directorio recién modificado se vuelve a leer en el próximo recorrido
+                mtime_ns = info_dir.st_mtime_ns
+                if inicio_ns - mtime_ns < MARGEN_MTIME_NS:
+                    mtime_ns = -1
+
+                self._directorios[relativa_dir] = {
+                    'mtime_ns': mtime_ns,
+                    'archivos': archivos,
+                    'subdirs': subdirs
+                }
+                self._directorios_pendientes.add(relativa_dir)
+
+            pila.extend(os.path.join(relativa_dir, subdir) for subdir in subdirs)
+
+        for relativa in [r for r in self._archivos if r not in resultado]:
+            del self._archivos[relativa]
+            self._archivos_pendientes.discard(relativa)
+            self._archivos_eliminados.add(relativa)
+            self.ultimos_cambios['eliminados'].append(relativa)
+
+        for relativa_dir in [d for d in self._directorios if d not in directorios_vistos]:
+            del self._directorios[relativa_dir]
+            self._directorios_pendientes.discard(relativa_dir)
+            self._directorios_eliminados.add(relativa_dir)
+
+        self.estadisticas = estadisticas
+        self.guardar()
+
+        logger.debug("Índice {0}: {1} leídos, {2} omitidos, {3} nuevos, {4} modificados, {5} eliminados".format(
+            self.raiz,
+            estadisticas['directorios_leidos'],
+            estadisticas['directorios_omitidos'],
+            len(self.ultimos_cambios['nuevos']),
+            len(self.ultimos_cambios['modificados']),
+            len(self.ultimos_cambios['eliminados'])
+        ))
+        return resultado
+
+    def obtener_hash(self, relativa):
+        """
+        Retorna el hash de un archivo, reutilizando el guardado si no cambió
+        """
+        ruta = os.path.join(self.raiz, relativa)
+        info = os.stat(ruta)
+        datos = self._archivos.get(relativa)
+
+        if datos is not None and datos[3] and (datos[0], datos[1], datos[2]) == (
+                info.st_size, info.st_mtime_ns, info.st_ino):
+            return datos[3]
+
+        hash_contenido = calcular_hash(ruta)
+        self._archivos[relativa] = [info.st_size, info.st_mtime_ns, info.st_ino, hash_contenido]
+        self._archivos_pendientes.add(relativa)
+        self._archivos_eliminados.discard(relativa)
+        return hash_contenido
+
+    def guardar(self):
+        """Escribe en disco solo las entradas que cambiaron"""
+        with self.conexion:
+            self.conexion.executemany(
+                "DELETE FROM archivos WHERE ruta = ?",
+                ((r,) for r in self._archivos_eliminados)
+            )
+            self.conexion.executemany(
+                "DELETE FROM directorios WHERE ruta = ?",
+                ((d,) for d in self._directorios_eliminados)
+            )
+            self.conexion.executemany(
+                "INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (r, os.path.dirname(r)) + tuple(self._archivos[r])
+                    for r in self._archivos_pendientes if r in self._archivos
+                )
+            )
+            self.conexion.executemany(
+                "INSERT OR REPLACE INTO directorios VALUES (?, ?, ?)",
+                (
+                    (d, os.path.dirname(d) if d else None, self._directorios[d]['mtime_ns'])
+                    for d in self._directorios_pendientes if d in self._directorios
+                )
+            )
+
+        self._archivos_pendientes.clear()
+        self._archivos_eliminados.clear()
+        self._directorios_pendientes.clear()
+        self._directorios_eliminados.clear()
+
+    def cerrar(self):
+        """Guarda los cambios pendientes y cierra el índice"""
+        self.guardar()
+        self.conexion.close()
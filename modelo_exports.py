@@ -0,0 +1,257 @@
+"""
+Modelo en memoria de /etc/exports
+Se parsea una sola vez y se reutiliza mientras el archivo no cambie
+"""
+import os
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+
+from parser_exports import parsear, sin_recolector_de_ciclos
+
+
+# Hilos para leer los archivos de exports.d (la lectura suele ser lo que domina)
+MAX_HILOS_PARSEO = 8
+
+
+def firma_archivo(ruta):
+    """
+    Retorna (inodo, mtime_ns, tamaño) de un archivo o None si no existe
+    Si la firma no cambió, el contenido parseado sigue siendo válido
+    """
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return None
+    return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+
+def configuracion_desde_entrada(entrada, archivo_origen=None):
+    """
+    Convierte una EntradaExports en el diccionario de configuración que usa la aplicación
+    'hosts' y 'opciones' resumen la línea (todos los hosts y la unión de sus opciones);
+    'clientes' conserva las opciones de cada host
+    """
+    if len(entrada.clientes) == 1:
+        cliente = entrada.clientes[0]
+        opciones = entrada.opciones_por_defecto + cliente.opciones
+        clientes = [(cliente.host, opciones)]
+        hosts = cliente.host
+    else:
+        clientes = [(c.host, entrada.opciones_efectivas(c)) for c in entrada.clientes]
+        hosts = " ".join(host for host, _ in clientes)
+        opciones = []
+        for _, opciones_cliente in clientes:
+            opciones.extend(o for o in opciones_cliente if o not in opciones)
+
+    return {
+        'carpeta': entrada.ruta,
+        'hosts': hosts,
+        'opciones': opciones,
+        'clientes': clientes,
+        'comentario': entrada.comentario,
+        'errores': entrada.errores,
+        'linea_original': entrada.texto.rstrip("\r\n"),
+        'numero_linea': entrada.numero_linea,
+        'inicio': entrada.inicio,
+        'fin': entrada.fin,
+        'archivo_origen': archivo_origen
+    }
+
+
+def describir_clientes(config, separador=', '):
+    """
+    Texto corto de los clientes de una configuración para mostrar en listas
+    'a b (rw, sync)' si todos comparten opciones, o 'a (rw) | b (ro)' si no
+    """
+    distintas = set(tuple(opciones) for _, opciones in config['clientes'])
+    if len(distintas) <= 1:
+        return "{0} ({1})".format(config['hosts'], separador.join(config['opciones']))
+    return " | ".join(
+        "{0} ({1})".format(host, separador.join(opciones)) for host, opciones in config['clientes']
+    )
+
+
+def parsear_texto(texto, archivo_origen=None):
+    """
+    Parsea el contenido de un archivo exports
+    Retorna (documento, configuraciones); ver parser_exports y configuracion_desde_entrada
+    """
+    with sin_recolector_de_ciclos():
+        documento = parsear(texto)
+        configuraciones = [
+            configuracion_desde_entrada(entrada, archivo_origen)
+            for entrada in documento.entradas()
+        ]
+    return documento, configuraciones
+
+
+def parsear_lineas(lineas, archivo_origen=None):
+    """
+    Parsea las líneas de un archivo exports
+    Retorna una lista de configuraciones (carpeta, hosts, opciones, clientes, comentario,
+    linea_original, numero_linea, inicio, fin, archivo_origen)
+    """
+    return parsear_texto("".join(lineas), archivo_origen)[1]
+
+
+def normalizar_ruta(ruta):
+    """Normaliza una ruta exportada para usarla como clave de índice"""
+    ruta = os.path.normpath(ruta.strip())
+    return ruta if ruta == '/' else ruta.rstrip('/')
+
+
+class ModeloExports:
+    """
+    Resultado del parseo de un archivo exports junto con la firma del archivo leído
+    Mantiene índices por ruta, host y opción, construidos la primera vez que se consultan
+    (el modelo no cambia: cuando el archivo cambia se crea un modelo nuevo)
+    """
+
+    def __init__(self, configuraciones, firma, documento=None):
+        self.configuraciones = configuraciones
+        self.firma = firma
+        self.documento = documento
+        self._indices = None
+
+    def __len__(self):
+        return len(self.configuraciones)
+
+    def _construir_indices(self):
+        """
+        Construye los índices en una sola pasada
+        Cada índice asocia una clave con la lista de posiciones en configuraciones
+        """
+        por_ruta = {}
+        por_host = {}
+        por_opcion = {}
+
+        for posicion, config in enumerate(self.configuraciones):
+            por_ruta.setdefault(normalizar_ruta(config['carpeta']), []).append(posicion)
+
+            for host, _ in config['clientes']:
+                por_host.setdefault(host, []).append(posicion)
+
+            for opcion in config['opciones']:
+                por_opcion.setdefault(opcion, []).append(posicion)
+                # fsid=5 también se encuentra buscando solo fsid
+                if '=' in opcion:
+                    por_opcion.setdefault(opcion.split('=', 1)[0], []).append(posicion)
+
+        self._indices = {
+            'ruta': por_ruta,
+            'host': por_host,
+            'opcion': por_opcion,
+            # Rutas ordenadas para búsquedas por prefijo con bisect
+            'rutas_ordenadas': sorted(por_ruta)
+        }
+
+    def _obtener_indices(self):
+        if self._indices is None:
+            self._construir_indices()
+        return self._indices
+
+    def posiciones(self, campo, valor):
+        """
+        Retorna las posiciones de las configuraciones cuyo campo ('ruta', 'host' u 'opcion')
+        coincide exactamente con valor
+        """
+        if campo == 'ruta':
+            valor = normalizar_ruta(valor)
+        elif campo not in ('host', 'opcion'):
+            raise ValueError("Campo de búsqueda desconocido: {0}".format(campo))
+        return list(self._obtener_indices()[campo].get(valor.strip(), []))
+
+    def posiciones_bajo_ruta(self, prefijo):
+        """
+        Retorna las posiciones de las configuraciones exportadas en prefijo o debajo de él
+        """
+        indices = self._obtener_indices()
+        prefijo = normalizar_ruta(prefijo)
+        rutas = indices['rutas_ordenadas']
+        base = prefijo.rstrip('/') + '/'
+
+        posiciones = list(indices['ruta'].get(prefijo, []))
+        for i in range(bisect.bisect_left(rutas, base), len(rutas)):
+            ruta = rutas[i]
+            if not ruta.startswith(base):
+                break
+            posiciones.extend(indices['ruta'][ruta])
+        return sorted(posiciones)
+
+    def claves(self, campo):
+        """Retorna los valores distintos indexados para un campo"""
+        return sorted(self._obtener_indices()[campo])
+
+    def exportaciones(self):
+        """
+        Retorna {(ruta, host): opciones} con una entrada por cada par exportado,
+        tal como lo ve exportfs (si un par se repite, gana la última línea)
+        """
+        resultado = {}
+        for config in self.configuraciones:
+            ruta = normalizar_ruta(config['carpeta'])
+            for host, opciones in config['clientes']:
+                resultado[(ruta, host)] = tuple(opciones)
+        return resultado
+
+
+def diferencia_exportaciones(anteriores, actuales):
+    """
+    Compara dos resultados de ModeloExports.exportaciones()
+    Retorna (cambios, bajas): cambios es {(ruta, host): opciones} con los pares
+    nuevos o con opciones distintas y bajas la lista de pares que ya no existen
+    """
+    cambios = {}
+    for clave, opciones in actuales.items():
+        if anteriores.get(clave) != opciones:
+            cambios[clave] = opciones
+    bajas = sorted(clave for clave in anteriores if clave not in actuales)
+    return cambios, bajas
+
+
+def cargar_modelo(ruta):
+    """
+    Lee y parsea un archivo exports
+    La firma se toma antes de leer: si el archivo cambia durante la lectura,
+    la siguiente consulta verá una firma distinta y volverá a parsear
+    """
+    firma = firma_archivo(ruta)
+    if firma is None:
+        return ModeloExports([], None)
+
+    # newline='' conserva los finales de línea para poder reescribir el archivo sin cambios
+    with open(ruta, 'r', newline='') as f:
+        documento, configuraciones = parsear_texto(f.read(), archivo_origen=ruta)
+
+    return ModeloExports(configuraciones, firma, documento)
+
+
+def cargar_modelos(rutas, max_hilos=MAX_HILOS_PARSEO):
+    """
+    Carga varios archivos exports en paralelo
+    Retorna {ruta: modelo}; los archivos que no se pudieron leer se omiten
+    y se informan en el segundo elemento como {ruta: error}
+    """
+    modelos = {}
+    errores = {}
+    if not rutas:
+        return modelos, errores
+
+    def cargar(ruta):
+        try:
+            return ruta, cargar_modelo(ruta), None
+        except (OSError, UnicodeDecodeError) as e:
+            return ruta, None, e
+
+    if len(rutas) == 1:
+        resultados = [cargar(rutas[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_hilos, len(rutas))) as ejecutor:
+            resultados = list(ejecutor.map(cargar, rutas))
+
+    for ruta, modelo, error in resultados:
+        if error is None:
+            modelos[ruta] = modelo
+        else:
+            errores[ruta] = error
+    return modelos, errores
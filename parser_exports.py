@@ -0,0 +1,299 @@
+"""
+Parser de archivos exports
+Convierte el texto en un documento estructurado (entradas, clientes, comentarios)
+que conserva el texto original: documento.texto() reproduce el archivo byte a byte
+"""
+import contextlib
+import gc
+import re
+
+
+# Tokenizador general (líneas con comillas, escapes, comentarios o continuaciones):
+# - espacio: blancos y continuaciones (barra invertida + salto de línea)
+# - comentario: desde '#' al inicio de un token hasta el fin de la línea
+# - palabra: ruta o cliente, con comillas, escapes y "(opciones)" pegadas
+_TOKEN = re.compile(r'''
+    (?P<espacio>(?:[ \t\f\v]|\\\r?\n)+)
+  | (?P<comentario>\#[^\r\n]*)
+  | (?P<nueva>\r?\n)
+  | (?P<palabra>(?:"[^"\r\n]*"?|\\[^\r\n]|[^\s"(\\])+(?:\([^)\r\n]*\)?)?|\([^)\r\n]*\)?)
+  | (?P<otro>.)
+''', re.VERBOSE)
+
+# Línea sin comillas, escapes, continuaciones ni opciones por defecto (la gran mayoría),
+# con un comentario opcional al final
+_LINEA_SIMPLE = re.compile(
+    r'([^\s"#\\()-][^\s"#\\()]*)'
+    r'((?:[ \t]+[^\s"#\\()-][^\s"#\\()]*(?:\([^\s"#\\()]*\))?)*)'
+    r'[ \t]*(#[^\r\n]*)?\r?\n'
+)
+
+_LINEA_VACIA = re.compile(r'[ \t\f\v]*(?:#[^\r\n]*)?\r?\n')
+
+# Caracteres que obligan a escribir una ruta entre comillas
+_CARACTERES_ESPECIALES = re.compile(r'[\s"#()\\]')
+
+_ESCAPE_OCTAL = re.compile(r'\\([0-7]{3})')
+
+
+class Cliente:
+    """Cliente de una entrada: host (o '*') y sus opciones explícitas"""
+
+    __slots__ = ('host', 'opciones', 'texto')
+
+    def __init__(self, host, opciones, texto):
+        self.host = host
+        self.opciones = opciones
+        self.texto = texto
+
+    def __repr__(self):
+        return "Cliente({0!r}, {1!r})".format(self.host, self.opciones)
+
+
+class EntradaExports:
+    """
+    Una exportación (puede ocupar varias líneas físicas con continuaciones)
+    inicio/fin son posiciones en el texto del archivo; texto incluye el salto de línea final
+    """
+
+    __slots__ = (
+        'ruta', 'ruta_texto', 'opciones_por_defecto', 'clientes', 'comentario',
+        'numero_linea', 'inicio', 'fin', 'texto', 'errores'
+    )
+
+    def __init__(self, ruta, ruta_texto, numero_linea, inicio):
+        self.ruta = ruta
+        self.ruta_texto = ruta_texto
+        self.opciones_por_defecto = []
+        self.clientes = []
+        self.comentario = None
+        self.numero_linea = numero_linea
+        self.inicio = inicio
+        self.fin = inicio
+        self.texto = ""
+        self.errores = []
+
+    def opciones_efectivas(self, cliente):
+        """Opciones que recibe un cliente: las de '-opciones' seguidas de las propias"""
+        if not self.opciones_por_defecto:
+            return list(cliente.opciones)
+        return self.opciones_por_defecto + cliente.opciones
+
+    def linea_sin_salto(self):
+        """Texto original sin el salto de línea final"""
+        return self.texto.rstrip("\r\n")
+
+    def __repr__(self):
+        return "EntradaExports({0!r}, {1!r})".format(self.ruta, self.clientes)
+
+
+class DocumentoExports:
+    """
+    Secuencia de nodos de un archivo exports
+    Cada nodo es una EntradaExports o un str (líneas en blanco y comentarios)
+    """
+
+    __slots__ = ('nodos',)
+
+    def __init__(self, nodos):
+        self.nodos = nodos
+
+    def entradas(self):
+        """Retorna solo las entradas (en orden)"""
+        return [nodo for nodo in self.nodos if not isinstance(nodo, str)]
+
+    def texto(self):
+        """Reconstruye el archivo exactamente como se leyó"""
+        return "".join(nodo if isinstance(nodo, str) else nodo.texto for nodo in self.nodos)
+
+
+@contextlib.contextmanager
+def sin_recolector_de_ciclos():
+    """
+    Pausa el recolector de ciclos mientras se crean las entradas
+    Las entradas no forman ciclos, y con cientos de miles de objetos pequeños
+    las pasadas del recolector hacen el parseo varias veces más lento
+    """
+    activo = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if activo:
+            gc.enable()
+
+
+def desescapar_ruta(texto):
+    """Quita comillas y convierte escapes octales (\\040 = espacio)"""
+    if '"' in texto:
+        texto = texto.replace('"', '')
+    if '\\' in texto:
+        texto = _ESCAPE_OCTAL.sub(lambda m: chr(int(m.group(1), 8)), texto)
+    return texto
+
+
+def formatear_ruta(ruta):
+    """Escribe una ruta entre comillas si contiene espacios u otros caracteres especiales"""
+    if _CARACTERES_ESPECIALES.search(ruta):
+        return '"{0}"'.format(ruta.replace('"', '\\042'))
+    return ruta
+
+
+def formatear_entrada(ruta, clientes, comentario=None):
+    """
+    Formatea una entrada sin salto de línea
+    clientes: lista de (host, opciones); un cliente sin opciones se escribe solo con el host
+    """
+    partes = [formatear_ruta(ruta)]
+    for host, opciones in clientes:
+        if opciones:
+            partes.append("{0}({1})".format(host, ",".join(opciones)))
+        else:
+            partes.append(host)
+    if comentario:
+        partes.append(comentario)
+    return " ".join(partes)
+
+
+def _separar_opciones(texto):
+    return [o.strip() for o in texto.split(',') if o.strip()]
+
+
+def _agregar_palabra(entrada, palabra):
+    """Interpreta una palabra después de la ruta: '-opciones', host, host(opciones) o (opciones)"""
+    if not entrada.clientes and palabra.startswith('-') and not entrada.opciones_por_defecto:
+        entrada.opciones_por_defecto = _separar_opciones(palabra[1:])
+        return
+
+    indice = palabra.find('(')
+    if indice == -1:
+        entrada.clientes.append(Cliente(palabra, [], palabra))
+        return
+
+    if not palabra.endswith(')'):
+        entrada.errores.append("Falta ')' en: {0}".format(palabra))
+        opciones = palabra[indice + 1:]
+    else:
+        opciones = palabra[indice + 1:-1]
+
+    # "(opciones)" separado de la ruta exporta a todos
+    host = palabra[:indice] or '*'
+    entrada.clientes.append(Cliente(host, _separar_opciones(opciones), palabra))
+
+
+def tokenizar(texto):
+    """
+    Genera (tipo, valor, inicio) para cada token del texto
+    tipo: 'espacio', 'comentario', 'nueva', 'palabra' u 'otro'
+    """
+    for m in _TOKEN.finditer(texto):
+        yield m.lastgroup, m.group(), m.start()
+
+
+def _parsear_linea_logica(texto, inicio, numero_linea):
+    """
+    Parsea una línea lógica (con sus continuaciones) con el tokenizador general
+    Retorna (nodo, posicion_siguiente, lineas_fisicas_consumidas)
+    """
+    entrada = None
+    lineas = 0
+    pos = inicio
+    n = len(texto)
+
+    while pos < n:
+        m = _TOKEN.match(texto, pos)
+        tipo = m.lastgroup
+        pos = m.end()
+
+        if tipo == 'palabra':
+            valor = m.group()
+            if entrada is None:
+                entrada = EntradaExports(desescapar_ruta(valor), valor, numero_linea, inicio)
+                if valor.count('"') % 2:
+                    entrada.errores.append("Comillas sin cerrar en la ruta")
+            else:
+                _agregar_palabra(entrada, valor)
+        elif tipo == 'nueva':
+            lineas += 1
+            break
+        elif tipo == 'espacio':
+            # Las continuaciones cuentan como líneas físicas
+            lineas += m.group().count("\n")
+        elif tipo == 'comentario':
+            if entrada is not None:
+                entrada.comentario = m.group()
+        elif entrada is not None:
+            entrada.errores.append("Carácter inesperado: {0!r}".format(m.group()))
+
+    if entrada is None:
+        return texto[inicio:pos], pos, lineas
+
+    entrada.fin = pos
+    entrada.texto = texto[inicio:pos]
+    if not entrada.clientes:
+        # Sin clientes, exportfs exporta a todos con las opciones por defecto
+        entrada.clientes.append(Cliente('*', [], ''))
+    return entrada, pos, lineas
+
+
+def parsear(texto):
+    """
+    Parsea el contenido de un archivo exports en una sola pasada
+    Las líneas simples se reconocen con una sola expresión regular; el resto
+    pasa por el tokenizador general
+    Retorna un DocumentoExports; las líneas mal formadas se conservan
+    con sus errores en entrada.errores
+    """
+    with sin_recolector_de_ciclos():
+        return _parsear(texto)
+
+
+def _parsear(texto):
+    nodos = []
+    agregar = nodos.append
+    simple = _LINEA_SIMPLE.match
+    vacia = _LINEA_VACIA.match
+    pos = 0
+    numero_linea = 1
+    n = len(texto)
+
+    while pos < n:
+        # Caso común: "ruta host(opciones) host(opciones)" sin comillas, escapes ni comentarios
+        m = simple(texto, pos)
+        if m is not None:
+            ruta, texto_clientes, comentario = m.groups()
+            fin = m.end()
+            entrada = EntradaExports(ruta, ruta, numero_linea, pos)
+            entrada.comentario = comentario
+            clientes = entrada.clientes
+            for palabra in texto_clientes.split():
+                indice = palabra.find('(')
+                if indice == -1:
+                    clientes.append(Cliente(palabra, [], palabra))
+                else:
+                    # Aquí las opciones no tienen espacios
+                    opciones = [o for o in palabra[indice + 1:-1].split(',') if o]
+                    clientes.append(Cliente(palabra[:indice], opciones, palabra))
+            if not clientes:
+                clientes.append(Cliente('*', [], ''))
+            entrada.fin = fin
+            entrada.texto = texto[pos:fin]
+            agregar(entrada)
+            pos = fin
+            numero_linea += 1
+            continue
+
+        # Líneas en blanco y comentarios
+        m = vacia(texto, pos)
+        if m is not None:
+            fin = m.end()
+            agregar(texto[pos:fin])
+            pos = fin
+            numero_linea += 1
+            continue
+
+        nodo, pos, lineas = _parsear_linea_logica(texto, pos, numero_linea)
+        agregar(nodo)
+        numero_linea += lineas
+
+    return DocumentoExports(nodos)
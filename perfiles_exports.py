@@ -0,0 +1,168 @@
+"""
+Perfiles de rendimiento para exportaciones
+Cada perfil fija un valor en algunas categorías de opciones (escritura, retraso
+de escritura, verificación de subárbol) y conserva el resto de opciones de la regla.
+Las reglas de rendimiento avisan de combinaciones lentas según la carga observada
+"""
+import os
+
+from analizador_exports import CATEGORIAS_OPCIONES
+
+
+# Categorías que puede fijar un perfil (el primer valor es el de NFS por defecto)
+CATEGORIAS_PERFIL = dict(CATEGORIAS_OPCIONES, retraso=('wdelay', 'no_wdelay'))
+
+PERFILES = {
+    'rendimiento': {
+        'nombre': "Alto rendimiento (archivos grandes)",
+        'descripcion': "async: el servidor confirma las escrituras sin esperar al disco",
+        'opciones': ('async', 'no_subtree_check'),
+    },
+    'latencia': {
+        'nombre': "Baja latencia (archivos pequeños)",
+        'descripcion': "sync sin agrupar escrituras (no_wdelay): cada escritura pequeña responde antes",
+        'opciones': ('sync', 'no_wdelay', 'no_subtree_check'),
+    },
+    'seguro': {
+        'nombre': "Sincrónico seguro",
+        'descripcion': "sync agrupando escrituras (wdelay): ningún dato confirmado se pierde",
+        'opciones': ('sync', 'wdelay', 'no_subtree_check'),
+    },
+}
+
+# Fracción de las operaciones a partir de la cual una carga se considera intensiva
+UMBRAL_ESCRITURAS = 0.30
+UMBRAL_RENOMBRADOS = 0.01
+
+# Operaciones que no cuentan para las proporciones (NFSv4 agrupa en COMPOUND)
+_OPERACIONES_IGNORADAS = ('NULL', 'COMPOUND')
+
+
+def _categoria(opcion):
+    if opcion == 'no_secure':
+        opcion = 'insecure'
+    for categoria, valores in CATEGORIAS_PERFIL.items():
+        if opcion in valores:
+            return categoria
+    return None
+
+
+def expandir_perfil(nombre, opciones=()):
+    """
+    Retorna las opciones resultantes de aplicar el perfil sobre opciones:
+    se quitan las opciones de las categorías que fija el perfil y se agregan
+    las del perfil; el resto (rw, squash, fsid...) se conserva en su orden
+    KeyError si el perfil no existe
+    """
+    perfil = PERFILES[nombre]
+    fijadas = set(_categoria(opcion) for opcion in perfil['opciones'])
+    resultado = [opcion for opcion in opciones if _categoria(opcion) not in fijadas]
+    return resultado + list(perfil['opciones'])
+
+
+def resumir_opciones_perfil(opciones):
+    """Retorna {categoria: valor efectivo} para las categorías de CATEGORIAS_PERFIL"""
+    resumen = {categoria: valores[0] for categoria, valores in CATEGORIAS_PERFIL.items()}
+    for opcion in opciones:
+        categoria = _categoria(opcion)
+        if categoria is not None:
+            resumen[categoria] = 'insecure' if opcion == 'no_secure' else opcion
+    return resumen
+
+
+def carga_desde_muestras(muestras):
+    """
+    Calcula la mezcla de operaciones a partir de las tasas del colector de nfsd
+    Retorna {'escrituras', 'renombrados'} como fracción de las operaciones,
+    o None si no hubo operaciones
+    """
+    totales = {}
+    for muestra in muestras:
+        for nombre, tasa in muestra['operaciones'].items():
+            if nombre not in _OPERACIONES_IGNORADAS:
+                totales[nombre] = totales.get(nombre, 0.0) + tasa * muestra['intervalo']
+
+    total = sum(totales.values())
+    if total <= 0:
+        return None
+    return {
+        'escrituras': (totales.get('WRITE', 0.0) + totales.get('COMMIT', 0.0)) / total,
+        'renombrados': totales.get('RENAME', 0.0) / total,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reglas de rendimiento: (resumen, contexto) -> (severidad, mensaje) o None
+# ---------------------------------------------------------------------------
+
+def _regla_subtree_check_renombrados(resumen, contexto):
+    if resumen['subarbol'] != 'subtree_check':
+        return None
+    carga = contexto['carga']
+    if carga is not None and carga['renombrados'] >= UMBRAL_RENOMBRADOS:
+        return ('aviso', "subtree_check con muchos renombrados ({0:.1f}% de las operaciones): "
+                         "cada archivo renombrado invalida sus file handles (errores ESTALE)".format(
+                             carga['renombrados'] * 100))
+    return ('info', "subtree_check verifica el subárbol en cada petición y falla con archivos "
+                    "abiertos que se renombran")
+
+
+def _regla_subtree_check_montaje(resumen, contexto):
+    if resumen['subarbol'] == 'subtree_check' and contexto['es_montaje']:
+        return ('info', "Se exporta el filesystem completo: subtree_check solo añade coste")
+    return None
+
+
+def _regla_sync_escrituras(resumen, contexto):
+    carga = contexto['carga']
+    if resumen['escritura'] != 'sync' or resumen['acceso'] != 'rw' or carga is None:
+        return None
+    if carga['escrituras'] >= UMBRAL_ESCRITURAS:
+        return ('aviso', "sync con carga de escritura alta ({0:.0f}% de las operaciones): cada "
+                         "escritura espera al disco; el perfil 'rendimiento' usa async".format(
+                             carga['escrituras'] * 100))
+    return None
+
+
+def _regla_async_datos(resumen, contexto):
+    if resumen['escritura'] == 'async' and resumen['acceso'] == 'rw':
+        return ('info', "async confirma escrituras que aún no están en disco: "
+                        "un corte del servidor puede perder datos")
+    return None
+
+
+def _regla_wdelay_async(resumen, contexto):
+    if resumen['escritura'] == 'async' and contexto['retraso_explicito']:
+        return ('info', "{0} no tiene efecto con async".format(resumen['retraso']))
+    return None
+
+
+REGLAS = (
+    ('subtree_check_renombrados', _regla_subtree_check_renombrados),
+    ('subtree_check_montaje', _regla_subtree_check_montaje),
+    ('sync_escrituras', _regla_sync_escrituras),
+    ('async_datos', _regla_async_datos),
+    ('wdelay_async', _regla_wdelay_async),
+)
+
+
+def evaluar_opciones(opciones, ruta=None, carga=None):
+    """
+    Aplica las reglas de rendimiento a las opciones de una exportación
+    carga: resultado de carga_desde_muestras (None si no hay estadísticas)
+    Retorna una lista de {'regla', 'severidad', 'mensaje'}
+    """
+    contexto = {
+        'carga': carga,
+        'es_montaje': bool(ruta) and os.path.ismount(ruta),
+        'retraso_explicito': any(o in CATEGORIAS_PERFIL['retraso'] for o in opciones),
+    }
+    resumen = resumir_opciones_perfil(opciones)
+
+    avisos = []
+    for identificador, regla in REGLAS:
+        resultado = regla(resumen, contexto)
+        if resultado is not None:
+            severidad, mensaje = resultado
+            avisos.append({'regla': identificador, 'severidad': severidad, 'mensaje': mensaje})
+    return avisos
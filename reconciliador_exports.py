@@ -0,0 +1,251 @@
+"""
+Reconciliación declarativa de exportaciones
+Recibe el estado deseado de un archivo exports (JSON, o YAML si PyYAML está
+instalado), calcula la diferencia mínima con el modelo parseado y la aplica en
+una sola transacción seguida de la aplicación incremental de exportfs
+
+Formato de la especificación:
+    {"exportaciones": [
+        {"ruta": "/srv/datos", "clientes": {"10.0.0.0/8": ["rw", "sync"], "*": ["ro"]}},
+        {"ruta": "/srv/pub", "hosts": "10.0.0.0/8 192.168.1.5", "opciones": ["ro"]},
+        {"ruta": "/srv/backup", "hosts": ["10.0.3.0/24"], "opciones": ["rw"], "perfil": "rendimiento"}
+    ]}
+
+Uso desde cron o la gestión de configuración:
+    python3 reconciliador_exports.py estado.json [--archivo /etc/exports.d/gestionado.exports] [--simular]
+"""
+import os
+import sys
+import json
+import argparse
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from modelo_exports import normalizar_ruta
+from perfiles_exports import PERFILES, expandir_perfil
+from utils.validaciones import validar_opciones_nfs
+
+
+def cargar_especificacion(ruta):
+    """
+    Lee una especificación JSON o YAML (.yaml/.yml)
+    ValueError si no se puede leer o interpretar
+    """
+    try:
+        with open(ruta, 'r') as f:
+            texto = f.read()
+    except OSError as e:
+        raise ValueError("No se pudo leer {0}: {1}".format(ruta, e))
+
+    if ruta.endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise ValueError("Para especificaciones YAML se necesita PyYAML (pip install pyyaml)")
+        try:
+            return yaml.safe_load(texto)
+        except yaml.YAMLError as e:
+            raise ValueError("YAML no válido en {0}: {1}".format(ruta, e))
+
+    try:
+        return json.loads(texto)
+    except ValueError as e:
+        raise ValueError("JSON no válido en {0}: {1}".format(ruta, e))
+
+
+def _lista_hosts(hosts):
+    if isinstance(hosts, str):
+        return hosts.split()
+    if isinstance(hosts, list) and all(isinstance(h, str) for h in hosts):
+        return [h for h in hosts if h.strip()]
+    return None
+
+
+def _normalizar_entrada(entrada):
+    """
+    Retorna (ruta, [(host, [opciones])]) de una entrada de la especificación
+    ValueError con el motivo si no es válida
+    """
+    if not isinstance(entrada, dict):
+        raise ValueError("cada exportación debe ser un objeto")
+
+    ruta = entrada.get('ruta')
+    if not isinstance(ruta, str) or not ruta.startswith('/'):
+        raise ValueError("'ruta' debe ser una ruta absoluta")
+
+    if 'clientes' in entrada:
+        clientes = entrada['clientes']
+        if isinstance(clientes, dict):
+            clientes = list(clientes.items())
+        elif isinstance(clientes, list):
+            clientes = [(c.get('host'), c.get('opciones', [])) if isinstance(c, dict) else (None, None)
+                        for c in clientes]
+        else:
+            raise ValueError("'clientes' debe ser un objeto host -> opciones o una lista")
+    else:
+        hosts = _lista_hosts(entrada.get('hosts'))
+        if not hosts:
+            raise ValueError("se requiere 'clientes' o 'hosts'")
+        clientes = [(host, entrada.get('opciones', [])) for host in hosts]
+
+    if not clientes:
+        raise ValueError("la exportación no tiene clientes")
+
+    perfil = entrada.get('perfil')
+    if perfil is not None and perfil not in PERFILES:
+        raise ValueError("perfil desconocido: {0}".format(perfil))
+
+    resultado = []
+    for host, opciones in clientes:
+        if not isinstance(host, str) or not host.strip() or len(host.split()) != 1:
+            raise ValueError("host no válido: {0!r}".format(host))
+        if not isinstance(opciones, list) or not all(isinstance(o, str) for o in opciones):
+            raise ValueError("las opciones de {0} deben ser una lista de textos".format(host))
+        if perfil is not None:
+            opciones = expandir_perfil(perfil, opciones)
+        valida, mensaje = validar_opciones_nfs(list(opciones))
+        if not valida:
+            raise ValueError("{0}: {1}".format(host, mensaje))
+        resultado.append((host, list(opciones)))
+    return ruta, resultado
+
+
+def normalizar_especificacion(datos):
+    """
+    Valida la especificación completa (lista o {"exportaciones": [...]})
+    Retorna una lista de (ruta, [(host, [opciones])]) en el orden de la especificación
+    ValueError con todos los errores encontrados, uno por línea
+    """
+    if isinstance(datos, dict):
+        datos = datos.get('exportaciones')
+    if not isinstance(datos, list):
+        raise ValueError("La especificación debe ser una lista de exportaciones "
+                         "o un objeto con la clave 'exportaciones'")
+
+    deseado = []
+    vistas = {}
+    errores = []
+    for numero, entrada in enumerate(datos, 1):
+        try:
+            ruta, clientes = _normalizar_entrada(entrada)
+        except ValueError as e:
+            errores.append("Exportación {0}: {1}".format(numero, e))
+            continue
+        clave = normalizar_ruta(ruta)
+        if clave in vistas:
+            errores.append("Exportación {0}: {1} ya se definió en la exportación {2}".format(
+                numero, ruta, vistas[clave]
+            ))
+            continue
+        vistas[clave] = numero
+        deseado.append((ruta, clientes))
+
+    if errores:
+        raise ValueError("\n".join(errores))
+    return deseado
+
+
+def _completar_como_gestor(ruta, opciones, actuales):
+    """
+    Agrega a las opciones deseadas de un archivo individual lo que el gestor agrega
+    al escribirlo (fsid ya asignado y no_subtree_check), para que una especificación
+    sin esas opciones no se vea como un cambio en cada reconciliación
+    """
+    if not os.path.isfile(ruta):
+        return opciones
+    opciones = list(opciones)
+    if not any(o.startswith('fsid=') for o in opciones):
+        fsid = next((o for o in actuales if o.startswith('fsid=')), None)
+        if fsid is not None:
+            opciones.append(fsid)
+    if 'no_subtree_check' not in opciones and 'subtree_check' not in opciones:
+        opciones.append('no_subtree_check')
+    return opciones
+
+
+def planificar(configuraciones, deseado):
+    """
+    Calcula los cambios mínimos para pasar de configuraciones (las del modelo de un
+    archivo) al estado deseado (resultado de normalizar_especificacion)
+    Una ruta se compara por sus pares host -> opciones entre todas sus líneas:
+    si coinciden no se toca, aunque esté repartida en varias líneas
+    Retorna {'agregar': [(ruta, hosts, opciones)], 'modificar': {indice: clientes},
+    'eliminar': [indices], 'sin_cambios': numero de rutas que ya coinciden}
+    """
+    lineas_por_ruta = {}
+    for indice, config in enumerate(configuraciones):
+        lineas_por_ruta.setdefault(normalizar_ruta(config['carpeta']), []).append(indice)
+
+    plan = {'agregar': [], 'modificar': {}, 'eliminar': [], 'sin_cambios': 0}
+    deseadas = set()
+    for ruta, clientes in deseado:
+        clave = normalizar_ruta(ruta)
+        deseadas.add(clave)
+        indices = lineas_por_ruta.get(clave)
+
+        if not indices:
+            # Una línea por grupo de hosts con las mismas opciones
+            grupos = {}
+            for host, opciones in clientes:
+                grupos.setdefault(tuple(opciones), []).append(host)
+            for opciones, hosts in grupos.items():
+                plan['agregar'].append((ruta, " ".join(hosts), list(opciones)))
+            continue
+
+        actual = {}
+        todas_actuales = []
+        for indice in indices:
+            for host, opciones in configuraciones[indice]['clientes']:
+                actual[host] = tuple(opciones)
+                todas_actuales.extend(opciones)
+        clientes = [
+            (host, _completar_como_gestor(ruta, opciones, actual.get(host, todas_actuales)))
+            for host, opciones in clientes
+        ]
+
+        if actual == {host: tuple(opciones) for host, opciones in clientes}:
+            plan['sin_cambios'] += 1
+            continue
+
+        # La primera línea de la ruta recibe todos los clientes y las demás se eliminan
+        plan['modificar'][indices[0]] = clientes
+        plan['eliminar'].extend(indices[1:])
+
+    for clave, indices in lineas_por_ruta.items():
+        if clave not in deseadas:
+            plan['eliminar'].extend(indices)
+    plan['eliminar'].sort()
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcilia un archivo exports con un estado deseado")
+    parser.add_argument('especificacion', help="archivo JSON o YAML con el estado deseado")
+    parser.add_argument('--archivo', help="drop-in de exports.d a gestionar (por defecto /etc/exports)")
+    parser.add_argument('--simular', action='store_true', help="solo muestra los cambios")
+    parser.add_argument('--sin-aplicar', action='store_true', help="no ejecuta exportfs")
+    argumentos = parser.parse_args()
+
+    from gestor_nfs import GestorNFS
+
+    try:
+        especificacion = cargar_especificacion(argumentos.especificacion)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    resultado = GestorNFS().reconciliar(
+        especificacion,
+        archivo=argumentos.archivo,
+        aplicar=not argumentos.sin_aplicar,
+        simular=argumentos.simular
+    )
+    print(resultado["message"])
+    for error in resultado.get("errores", []):
+        print("  {0}".format(error), file=sys.stderr)
+    return 0 if resultado["success"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Resolución del acceso efectivo de un cliente
+Dado una IP o un nombre de host, indica qué rutas puede montar y con qué opciones,
+usando índices precompilados (trie CIDR, nombres, comodines y netgroups)
+"""
+import os
+import re
+import fnmatch
+import ipaddress
+
+from modelo_exports import normalizar_ruta
+
+
+RUTA_NETGROUP = "/etc/netgroup"
+
+# Precedencia de exportfs cuando un cliente coincide con varias especificaciones
+# de la misma ruta (exports(5) y el orden MCL_* de nfs-utils): host, red IP,
+# comodín, netgroup y por último '*'. Entre dos del mismo tipo gana la que aparece antes
+PRIORIDAD_HOST = 0
+PRIORIDAD_RED = 1
+PRIORIDAD_COMODIN = 2
+PRIORIDAD_NETGROUP = 3
+PRIORIDAD_TODOS = 4
+
+TIPOS_PRIORIDAD = {
+    PRIORIDAD_HOST: 'host',
+    PRIORIDAD_RED: 'red',
+    PRIORIDAD_COMODIN: 'comodin',
+    PRIORIDAD_NETGROUP: 'netgroup',
+    PRIORIDAD_TODOS: 'todos',
+}
+
+_MIEMBRO_NETGROUP = re.compile(r'\(([^,()]*),[^,()]*,[^,()]*\)|([^\s()]+)')
+
+
+def cargar_netgroups(ruta=RUTA_NETGROUP):
+    """
+    Lee un archivo netgroup ("grupo (host,usuario,dominio) ... subgrupo")
+    Retorna {host: set(grupos)} con los subgrupos ya expandidos
+    """
+    if not os.path.exists(ruta):
+        return {}
+
+    miembros = {}
+    subgrupos = {}
+    with open(ruta, 'r') as f:
+        texto = f.read().replace("\\\n", " ")
+    for linea in texto.splitlines():
+        linea = linea.split('#', 1)[0].strip()
+        if not linea:
+            continue
+        grupo, _, resto = linea.partition(' ')
+        hosts = miembros.setdefault(grupo, set())
+        hijos = subgrupos.setdefault(grupo, [])
+        for m in _MIEMBRO_NETGROUP.finditer(resto):
+            if m.group(2) is not None:
+                hijos.append(m.group(2))
+            elif m.group(1).strip():
+                hosts.add(m.group(1).strip().lower())
+
+    # Cada grupo también contiene a los hosts de sus subgrupos
+    grupos_de_host = {}
+    for grupo in miembros:
+        visitados = set()
+        pendientes = [grupo]
+        while pendientes:
+            actual = pendientes.pop()
+            if actual in visitados:
+                continue
+            visitados.add(actual)
+            for host in miembros.get(actual, ()):
+                grupos_de_host.setdefault(host, set()).add(grupo)
+            pendientes.extend(subgrupos.get(actual, ()))
+    return grupos_de_host
+
+
+class ResolutorAccesos:
+    """
+    Índices de todas las reglas (ruta, host, opciones) de los archivos exports
+    Las reglas se agregan en el orden en que exportfs las lee
+    """
+
+    def __init__(self, netgroups=None):
+        self.netgroups = netgroups or {}
+        self._orden = 0
+        # Trie binario por versión de IP; cada nodo es [hijo_0, hijo_1, reglas]
+        self._raices = {4: [None, None, None], 6: [None, None, None]}
+        self._nombres = {}
+        self._grupos = {}
+        self._sufijos = {}
+        self._patrones = []
+        self._todos = []
+
+    def __len__(self):
+        return self._orden
+
+    def agregar(self, ruta, host, opciones, origen=None):
+        """Agrega una regla; origen es un diccionario libre que se copia en los resultados"""
+        orden = self._orden
+        self._orden += 1
+        # La ruta normalizada se calcula una sola vez, no en cada consulta
+        regla = (normalizar_ruta(ruta), ruta, host, list(opciones), origen or {})
+
+        if host in ('*', ''):
+            self._todos.append((PRIORIDAD_TODOS, orden, regla))
+            return
+        if host.startswith('@'):
+            self._grupos.setdefault(host[1:], []).append((PRIORIDAD_NETGROUP, orden, regla))
+            return
+
+        try:
+            if '/' in host:
+                red = ipaddress.ip_network(host, strict=False)
+                prioridad = PRIORIDAD_RED
+            else:
+                red = ipaddress.ip_network(host)
+                prioridad = PRIORIDAD_HOST
+            self._insertar_red(red, (prioridad, orden, regla))
+            return
+        except ValueError:
+            pass
+
+        nombre = host.lower().rstrip('.')
+        if not any(c in nombre for c in '*?['):
+            self._nombres.setdefault(nombre, []).append((PRIORIDAD_HOST, orden, regla))
+        elif nombre.startswith('*.') and not any(c in nombre[2:] for c in '*?['):
+            self._sufijos.setdefault(nombre[1:], []).append((PRIORIDAD_COMODIN, orden, regla))
+        else:
+            patron = re.compile(fnmatch.translate(nombre))
+            self._patrones.append((patron, (PRIORIDAD_COMODIN, orden, regla)))
+
+    def _insertar_red(self, red, entrada):
+        nodo = self._raices[red.version]
+        bits = red.max_prefixlen
+        direccion = int(red.network_address)
+        for i in range(red.prefixlen):
+            bit = (direccion >> (bits - 1 - i)) & 1
+            siguiente = nodo[bit]
+            if siguiente is None:
+                siguiente = [None, None, None]
+                nodo[bit] = siguiente
+            nodo = siguiente
+        if nodo[2] is None:
+            nodo[2] = []
+        nodo[2].append(entrada)
+
+    def _reglas_de_ip(self, ip, candidatas):
+        """Agrega las reglas de todas las redes que contienen a ip (un recorrido del trie)"""
+        nodo = self._raices[ip.version]
+        bits = ip.max_prefixlen
+        direccion = int(ip)
+        for i in range(bits):
+            if nodo[2] is not None:
+                candidatas.extend(nodo[2])
+            nodo = nodo[(direccion >> (bits - 1 - i)) & 1]
+            if nodo is None:
+                return
+        if nodo[2] is not None:
+            candidatas.extend(nodo[2])
+
+    def _reglas_de_nombre(self, nombre, candidatas):
+        nombre = nombre.lower().rstrip('.')
+        candidatas.extend(self._nombres.get(nombre, ()))
+
+        # "*.ej.com" coincide con cualquier nombre que termine en ".ej.com"
+        posicion = nombre.find('.')
+        while posicion != -1:
+            candidatas.extend(self._sufijos.get(nombre[posicion:], ()))
+            posicion = nombre.find('.', posicion + 1)
+
+        for patron, entrada in self._patrones:
+            if patron.match(nombre):
+                candidatas.append(entrada)
+
+    @staticmethod
+    def _elegir(candidatas):
+        """
+        Retorna la lista de accesos efectivos (uno por ruta, ordenados por ruta)
+        a partir de las reglas que coinciden con el cliente
+        """
+        mejores = {}
+        for entrada in candidatas:
+            ruta = entrada[2][0]
+            actual = mejores.get(ruta)
+            if actual is None or entrada[:2] < actual[:2]:
+                mejores[ruta] = entrada
+
+        accesos = []
+        for ruta in sorted(mejores):
+            prioridad, _, (_, carpeta, host, opciones, origen) = mejores[ruta]
+            accesos.append({
+                'ruta': carpeta,
+                'host': host,
+                'tipo': TIPOS_PRIORIDAD[prioridad],
+                'opciones': opciones,
+                'origen': origen
+            })
+        return accesos
+
+    def resolver(self, cliente, nombres=None, ips=None, grupos=None):
+        """
+        Retorna los accesos efectivos de un cliente como lista de
+        {ruta, host, tipo, opciones, origen} (host y tipo indican la regla que aplica)
+        cliente: IP o nombre de host; nombres/ips permiten añadir los datos de DNS
+        grupos: netgroups del cliente además de los del archivo netgroup
+        """
+        nombres = list(nombres or [])
+        ips = list(ips or [])
+        try:
+            ips.append(ipaddress.ip_address(cliente))
+        except ValueError:
+            nombres.append(cliente)
+        ips = [ipaddress.ip_address(ip) for ip in ips]
+
+        candidatas = list(self._todos)
+        for ip in ips:
+            self._reglas_de_ip(ip, candidatas)
+        for nombre in nombres:
+            self._reglas_de_nombre(nombre, candidatas)
+
+        grupos = set(grupos or ())
+        for identidad in nombres + [str(ip) for ip in ips]:
+            grupos.update(self.netgroups.get(identidad.lower(), ()))
+        for grupo in grupos:
+            candidatas.extend(self._grupos.get(grupo, ()))
+
+        return self._elegir(candidatas)
+
+    def auditar_red(self, red):
+        """
+        Calcula el acceso de todas las direcciones de una red sin recorrerlas una a una:
+        el trie divide la red en bloques con las mismas reglas
+        Solo se consideran reglas por IP, red y '*' (no hay nombres de host)
+        Retorna una lista de {desde, hasta, direcciones, accesos}, en orden de dirección
+        """
+        red = ipaddress.ip_network(red, strict=False)
+        bits = red.max_prefixlen
+        direccion = int(red.network_address)
+
+        nodo = self._raices[red.version]
+        acumuladas = list(self._todos)
+        for i in range(red.prefixlen):
+            if nodo[2] is not None:
+                acumuladas.extend(nodo[2])
+            nodo = nodo[(direccion >> (bits - 1 - i)) & 1]
+            if nodo is None:
+                break
+
+        bloques = []
+        # Pila de (nodo, direccion, longitud, reglas acumuladas); el hijo 1 se apila
+        # primero para visitar los bloques en orden de dirección
+        pila = [(nodo, direccion, red.prefixlen, acumuladas)]
+        while pila:
+            nodo, inicio, longitud, reglas = pila.pop()
+            if nodo is not None and nodo[2] is not None:
+                reglas = reglas + nodo[2]
+            if nodo is None or (nodo[0] is None and nodo[1] is None) or longitud == bits:
+                bloques.append((inicio, inicio + (1 << (bits - longitud)) - 1, reglas))
+                continue
+            pila.append((nodo[1], inicio | (1 << (bits - 1 - longitud)), longitud + 1, reglas))
+            pila.append((nodo[0], inicio, longitud + 1, reglas))
+
+        # Bloques contiguos con el mismo resultado se unen
+        resultado = []
+        clase = ipaddress.IPv4Address if red.version == 4 else ipaddress.IPv6Address
+        for inicio, fin, reglas in bloques:
+            accesos = self._elegir(reglas)
+            clave = [(a['ruta'], a['host'], tuple(a['opciones'])) for a in accesos]
+            if resultado and resultado[-1][2] == clave and resultado[-1][1] + 1 == inicio:
+                resultado[-1][1] = fin
+                continue
+            resultado.append([inicio, fin, clave, accesos])
+
+        return [
+            {
+                'desde': clase(inicio),
+                'hasta': clase(fin),
+                'direcciones': fin - inicio + 1,
+                'accesos': accesos
+            }
+            for inicio, fin, _, accesos in resultado
+        ]
@@ -0,0 +1,244 @@
+"""
+Almacén de respaldos de los archivos exports
+Guarda cada contenido distinto una sola vez (por su hash), opcionalmente comprimido,
+y aplica una política de retención (últimos N y uno por día)
+"""
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import difflib
+from datetime import datetime
+
+from utils.logger import logger
+
+
+# Respaldos que se conservan siempre por archivo
+CONSERVAR_ULTIMOS = 50
+
+# Además, el último respaldo de cada día durante este número de días
+CONSERVAR_DIAS = 30
+
+# Un objeto más reciente que esto puede ser de un respaldo que otro proceso
+# aún no registró en el catálogo: la limpieza no lo toca
+ANTIGUEDAD_MINIMA_LIMPIEZA = 300
+
+
+class AlmacenRespaldos:
+    """
+    Directorio con un catálogo SQLite y los contenidos en objetos/<hash>[.gz]
+    Un respaldo idéntico al anterior del mismo archivo no se registra
+    """
+
+    def __init__(self, directorio, comprimir=True, conservar_ultimos=CONSERVAR_ULTIMOS,
+                 conservar_dias=CONSERVAR_DIAS):
+        self.directorio = directorio
+        self.directorio_objetos = os.path.join(directorio, "objetos")
+        self.comprimir = comprimir
+        self.conservar_ultimos = conservar_ultimos
+        self.conservar_dias = conservar_dias
+
+        if not os.path.exists(self.directorio_objetos):
+            os.makedirs(self.directorio_objetos)
+
+        self.conexion = sqlite3.connect(os.path.join(directorio, "catalogo.db"))
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS respaldos ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " archivo TEXT NOT NULL,"
+            " fecha REAL NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " tamano INTEGER NOT NULL)"
+        )
+        self.conexion.execute(
+            "CREATE INDEX IF NOT EXISTS respaldos_archivo ON respaldos (archivo, fecha)"
+        )
+        self.conexion.commit()
+
+    def _ruta_objeto(self, hash_contenido):
+        """Ruta del objeto con ese hash (comprimido o no), o None si no existe"""
+        for nombre in (hash_contenido + ".gz", hash_contenido):
+            ruta = os.path.join(self.directorio_objetos, nombre)
+            if os.path.exists(ruta):
+                return ruta
+        return None
+
+    def _guardar_objeto(self, hash_contenido, contenido):
+        """Escribe el contenido si todavía no está en el almacén"""
+        if self._ruta_objeto(hash_contenido) is not None:
+            return
+
+        nombre = hash_contenido + (".gz" if self.comprimir else "")
+        ruta = os.path.join(self.directorio_objetos, nombre)
+        temporal = ruta + ".tmp"
+        if self.comprimir:
+            with gzip.open(temporal, 'wb') as f:
+                f.write(contenido)
+        else:
+            with open(temporal, 'wb') as f:
+                f.write(contenido)
+        os.replace(temporal, ruta)
+
+    def _registrar(self, archivo, contenido, fecha):
+        """
+        Registra un contenido para archivo
+        Retorna (id, nuevo); si es idéntico al último respaldo del archivo no se registra
+        """
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+
+        ultimo = self.conexion.execute(
+            "SELECT id, hash FROM respaldos WHERE archivo = ? ORDER BY fecha DESC, id DESC LIMIT 1",
+            (archivo,)
+        ).fetchone()
+        if ultimo is not None and ultimo[1] == hash_contenido:
+            return ultimo[0], False
+
+        self._guardar_objeto(hash_contenido, contenido)
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "INSERT INTO respaldos (archivo, fecha, hash, tamano) VALUES (?, ?, ?, ?)",
+                (archivo, fecha, hash_contenido, len(contenido))
+            )
+        return cursor.lastrowid, True
+
+    def guardar(self, ruta):
+        """
+        Respalda el contenido actual de ruta
+        Retorna el id del respaldo (el del anterior si el contenido no cambió) o None
+        si el archivo no existe
+        """
+        try:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+        except FileNotFoundError:
+            return None
+
+        archivo = os.path.abspath(ruta)
+        identificador, nuevo = self._registrar(archivo, contenido, time.time())
+        if not nuevo:
+            logger.debug("Respaldo omitido, sin cambios desde el {0}".format(identificador))
+            return identificador
+
+        self.aplicar_retencion(archivo)
+        logger.info("Respaldo {0} creado: {1}".format(identificador, archivo))
+        return identificador
+
+    def importar(self, ruta_respaldo, archivo, fecha):
+        """
+        Incorpora al almacén una copia completa hecha con el esquema anterior
+        (archivo.respaldo.<fecha>); las copias deben importarse en orden cronológico
+        Retorna True si se registró (False si era igual a la anterior)
+        """
+        with open(ruta_respaldo, 'rb') as f:
+            contenido = f.read()
+        return self._registrar(os.path.abspath(archivo), contenido, fecha)[1]
+
+    def listar(self, archivo=None):
+        """
+        Retorna los respaldos (del más reciente al más antiguo) como diccionarios
+        {id, archivo, fecha, hash, tamano}
+        """
+        consulta = "SELECT id, archivo, fecha, hash, tamano FROM respaldos"
+        parametros = ()
+        if archivo is not None:
+            consulta += " WHERE archivo = ?"
+            parametros = (os.path.abspath(archivo),)
+        consulta += " ORDER BY fecha DESC, id DESC"
+
+        return [
+            {'id': i, 'archivo': a, 'fecha': datetime.fromtimestamp(f), 'hash': h, 'tamano': t}
+            for i, a, f, h, t in self.conexion.execute(consulta, parametros)
+        ]
+
+    def obtener(self, identificador):
+        """Retorna {id, archivo, fecha, hash, tamano} de un respaldo o None"""
+        fila = self.conexion.execute(
+            "SELECT id, archivo, fecha, hash, tamano FROM respaldos WHERE id = ?", (identificador,)
+        ).fetchone()
+        if fila is None:
+            return None
+        i, a, f, h, t = fila
+        return {'id': i, 'archivo': a, 'fecha': datetime.fromtimestamp(f), 'hash': h, 'tamano': t}
+
+    def leer(self, identificador):
+        """Retorna el contenido (bytes) de un respaldo; KeyError si no existe"""
+        respaldo = self.obtener(identificador)
+        if respaldo is None:
+            raise KeyError("No existe el respaldo {0}".format(identificador))
+
+        ruta = self._ruta_objeto(respaldo['hash'])
+        if ruta is None:
+            raise KeyError("Falta el contenido del respaldo {0}".format(identificador))
+
+        abrir = gzip.open if ruta.endswith(".gz") else open
+        with abrir(ruta, 'rb') as f:
+            return f.read()
+
+    def diferencias(self, contenido_anterior, contenido_nuevo, nombre_anterior, nombre_nuevo):
+        """Retorna el diff unificado entre dos contenidos (bytes)"""
+        return "".join(difflib.unified_diff(
+            contenido_anterior.decode(errors='replace').splitlines(True),
+            contenido_nuevo.decode(errors='replace').splitlines(True),
+            fromfile=nombre_anterior,
+            tofile=nombre_nuevo
+        ))
+
+    def aplicar_retencion(self, archivo):
+        """
+        Conserva los últimos N respaldos del archivo y el más reciente de cada uno
+        de los últimos días; elimina el resto y los objetos que ya nadie usa
+        """
+        filas = self.conexion.execute(
+            "SELECT id, fecha FROM respaldos WHERE archivo = ? ORDER BY fecha DESC, id DESC",
+            (archivo,)
+        ).fetchall()
+        if len(filas) <= self.conservar_ultimos:
+            return 0
+
+        limite_dias = time.time() - self.conservar_dias * 86400
+        conservar = set(i for i, _ in filas[:self.conservar_ultimos])
+        dias_vistos = set()
+        for identificador, fecha in filas:
+            if fecha < limite_dias:
+                break
+            dia = datetime.fromtimestamp(fecha).date()
+            if dia not in dias_vistos:
+                dias_vistos.add(dia)
+                conservar.add(identificador)
+
+        eliminar = [(i,) for i, _ in filas if i not in conservar]
+        if not eliminar:
+            return 0
+
+        with self.conexion:
+            self.conexion.executemany("DELETE FROM respaldos WHERE id = ?", eliminar)
+        self._limpiar_objetos()
+        logger.debug("Retención: {0} respaldos antiguos eliminados de {1}".format(len(eliminar), archivo))
+        return len(eliminar)
+
+    def _limpiar_objetos(self):
+        """
+        Borra los objetos que no están referenciados por ningún respaldo
+        Los .tmp y los objetos recientes pueden estar escribiéndose o pendientes de
+        registrar en otro proceso, así que se dejan
+        """
+        en_uso = set(h for h, in self.conexion.execute("SELECT DISTINCT hash FROM respaldos"))
+        limite = time.time() - ANTIGUEDAD_MINIMA_LIMPIEZA
+        for nombre in os.listdir(self.directorio_objetos):
+            if nombre.endswith(".tmp"):
+                continue
+            hash_contenido = nombre[:-3] if nombre.endswith(".gz") else nombre
+            if hash_contenido in en_uso:
+                continue
+            ruta = os.path.join(self.directorio_objetos, nombre)
+            try:
+                if os.stat(ruta).st_mtime > limite:
+                    continue
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def cerrar(self):
+        """Cierra el catálogo"""
+        self.conexion.close()
@@ -0,0 +1,361 @@
+"""
+Sincronización bidireccional con detección de conflictos
+Guarda por cada par (local, remoto) el estado de la última sincronización
+para distinguir cambios reales de conflictos
+"""
+import os
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime
+
+from indice_arbol import IndiceArbol
+from utils import compresion
+from utils.logger import logger
+
+
+POLITICAS_CONFLICTO = {
+    'mas_reciente': 'Gana la versión modificada más recientemente',
+    'conservar_ambos': 'Se conservan ambas versiones (la remota se renombra)',
+    'omitir': 'No se toca ninguna versión; el conflicto se informa'
+}
+
+DIRECTORIO_ESTADO = os.path.expanduser('~/.config/configurador-nfs/sincronizacion')
+
+# Sufijo de las copias en curso (se ignoran al recorrer los árboles)
+SUFIJO_TEMPORAL = ".nfs-sync-tmp"
+
+
+def copiar_atomico(origen, destino):
+    """
+    Copia un archivo preservando metadatos; el destino nunca queda a medio escribir
+    """
+    directorio = os.path.dirname(destino)
+    if directorio and not os.path.isdir(directorio):
+        os.makedirs(directorio)
+    temporal = destino + SUFIJO_TEMPORAL
+    shutil.copy2(origen, temporal)
+    os.replace(temporal, destino)
+
+
+def es_archivo_sincronizable(relativa):
+    """Descarta manifiestos de compresión y copias en curso"""
+    nombre = os.path.basename(relativa)
+    return nombre != compresion.NOMBRE_MANIFIESTO and not nombre.endswith(SUFIJO_TEMPORAL)
+
+
+class EstadoSincronizacion:
+    """
+    Base de datos (SQLite) con el estado de la última sincronización de un par de directorios
+    Para cada ruta relativa guarda tamaño, mtime en cada lado y hash del contenido
+    """
+
+    def __init__(self, ruta_local, ruta_remota, directorio=None):
+        directorio = directorio or DIRECTORIO_ESTADO
+        if not os.path.exists(directorio):
+            os.makedirs(directorio)
+
+        clave = "{0}\n{1}".format(os.path.abspath(ruta_local), os.path.abspath(ruta_remota))
+        nombre = hashlib.sha1(clave.encode()).hexdigest()[:16] + ".db"
+        self.ruta_db = os.path.join(directorio, nombre)
+
+        self.conexion = sqlite3.connect(self.ruta_db)
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS estado ("
+            " ruta TEXT PRIMARY KEY,"
+            " tamano INTEGER NOT NULL,"
+            " mtime_local INTEGER NOT NULL,"
+            " mtime_remoto INTEGER NOT NULL,"
+            " hash TEXT NOT NULL)"
+        )
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS par (local TEXT, remoto TEXT)"
+        )
+        if not self.conexion.execute("SELECT 1 FROM par").fetchone():
+            self.conexion.execute(
+                "INSERT INTO par VALUES (?, ?)",
+                (os.path.abspath(ruta_local), os.path.abspath(ruta_remota))
+            )
+        self.conexion.commit()
+
+    def cargar(self):
+        """
+        Retorna un diccionario ruta -> {tamano, mtime_local, mtime_remoto, hash}
+        """
+        estado = {}
+        for ruta, tamano, mtime_local, mtime_remoto, hash_contenido in self.conexion.execute(
+            "SELECT ruta, tamano, mtime_local, mtime_remoto, hash FROM estado"
+        ):
+            estado[ruta] = {
+                'tamano': tamano,
+                'mtime_local': mtime_local,
+                'mtime_remoto': mtime_remoto,
+                'hash': hash_contenido
+            }
+        return estado
+
+    def guardar(self, ruta, tamano, mtime_local, mtime_remoto, hash_contenido):
+        """Registra el estado sincronizado de una ruta"""
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO estado VALUES (?, ?, ?, ?, ?)",
+            (ruta, tamano, mtime_local, mtime_remoto, hash_contenido)
+        )
+
+    def eliminar(self, ruta):
+        """Olvida una ruta (ya no existe en ningún lado)"""
+        self.conexion.execute("DELETE FROM estado WHERE ruta = ?", (ruta,))
+
+    def confirmar(self):
+        """Escribe los cambios pendientes en disco"""
+        self.conexion.commit()
+
+    def cerrar(self):
+        """Confirma y cierra la base de datos"""
+        self.conexion.commit()
+        self.conexion.close()
+
+
+class SincronizadorBidireccional:
+    """
+    Sincroniza dos árboles en ambos sentidos
+    Un archivo solo se copia si cambió en un lado desde la última sincronización;
+    si cambió en los dos se aplica la política de conflictos
+    Ambos árboles se recorren con un IndiceArbol persistente
+    """
+
+    def __init__(self, ruta_local, ruta_remota, politica='mas_reciente', estado=None,
+                 confiar_mtime_directorios=False):
+        if politica not in POLITICAS_CONFLICTO:
+            raise ValueError("Política de conflictos desconocida: {0}".format(politica))
+
+        self.ruta_local = ruta_local
+        self.ruta_remota = ruta_remota
+        self.politica = politica
+        self.confiar_mtime_directorios = confiar_mtime_directorios
+        self.estado = estado or EstadoSincronizacion(ruta_local, ruta_remota)
+        self.indices = {
+            'local': IndiceArbol(ruta_local),
+            'remoto': IndiceArbol(ruta_remota)
+        }
+
+    def _escanear(self, lado):
+        """
+        Recorre un lado con su índice y retorna ruta_relativa -> (tamano, mtime_ns)
+        ValueError si el árbol tiene objetos comprimidos (manifiesto de compresión):
+        solo se comparan archivos tal cual, no lo que representan los objetos
+        """
+        archivos = self.indices[lado].escanear(self.confiar_mtime_directorios)
+        manifiesto = next(
+            (r for r in archivos if os.path.basename(r) == compresion.NOMBRE_MANIFIESTO), None
+        )
+        if manifiesto is not None:
+            raise ValueError(
+                "El árbol {0} contiene objetos comprimidos ({1}): la sincronización "
+                "bidireccional no los admite; use la sincronización en un solo sentido".format(
+                    self.ruta_local if lado == 'local' else self.ruta_remota, manifiesto
+                )
+            )
+        return dict(
+            (relativa, datos) for relativa, datos in archivos.items()
+            if es_archivo_sincronizable(relativa)
+        )
+
+    def _hash(self, lado, relativa):
+        """Hash de un archivo, reutilizando el del índice si no cambió"""
+        return self.indices[lado].obtener_hash(relativa)
+
+    def cerrar(self):
+        """Guarda el estado y los índices"""
+        self.estado.cerrar()
+        for indice in self.indices.values():
+            indice.cerrar()
+
+    def _cambio(self, relativa, actual, base, lado):
+        """
+        Indica si un archivo cambió en un lado respecto del último estado sincronizado
+        Si solo cambió el mtime se compara el hash para ignorar cambios aparentes
+        """
+        if base is None:
+            return True
+
+        campo_mtime = 'mtime_' + lado
+        if actual[0] != base['tamano']:
+            return True
+        if actual[1] == base[campo_mtime]:
+            return False
+
+        if self._hash(lado, relativa) != base['hash']:
+            return True
+
+        # Mismo contenido: solo se actualiza el mtime registrado
+        base[campo_mtime] = actual[1]
+        self.estado.guardar(relativa, base['tamano'], base['mtime_local'], base['mtime_remoto'], base['hash'])
+        return False
+
+    def _registrar(self, relativa, lado_origen):
+        """
+        Registra como sincronizado el estado actual de una ruta en ambos lados
+        El hash se toma del lado origen de la copia, que ya está en su índice
+        """
+        info_local = os.stat(os.path.join(self.ruta_local, relativa))
+        info_remota = os.stat(os.path.join(self.ruta_remota, relativa))
+        self.estado.guardar(
+            relativa,
+            info_local.st_size,
+            info_local.st_mtime_ns,
+            info_remota.st_mtime_ns,
+            self._hash(lado_origen, relativa)
+        )
+
+    def _enviar(self, relativa, resumen):
+        copiar_atomico(os.path.join(self.ruta_local, relativa), os.path.join(self.ruta_remota, relativa))
+        self._registrar(relativa, 'local')
+        resumen['enviados'] += 1
+
+    def _recibir(self, relativa, resumen):
+        copiar_atomico(os.path.join(self.ruta_remota, relativa), os.path.join(self.ruta_local, relativa))
+        self._registrar(relativa, 'remoto')
+        resumen['recibidos'] += 1
+
+    def _nombre_conflicto(self, relativa):
+        """Genera el nombre para conservar la versión remota en conflicto"""
+        base, extension = os.path.splitext(relativa)
+        marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return "{0} (conflicto remoto {1}){2}".format(base, marca, extension)
+
+    def _resolver_conflicto(self, relativa, local, remoto, resumen):
+        """
+        Aplica la política de conflictos a una ruta modificada en ambos lados
+        local/remoto: (tamano, mtime_ns) o None si el archivo fue eliminado en ese lado
+        """
+        resumen['conflictos'].append(relativa)
+
+        if self.politica == 'omitir':
+            logger.warning("Conflicto omitido: {0}".format(relativa))
+            return
+
+        # Modificado en un lado y eliminado en el otro: se conserva la versión modificada
+        if local is None:
+            self._recibir(relativa, resumen)
+            return
+        if remoto is None:
+            self._enviar(relativa, resumen)
+            return
+
+        if self.politica == 'mas_reciente':
+            if local[1] >= remoto[1]:
+                self._enviar(relativa, resumen)
+            else:
+                self._recibir(relativa, resumen)
+            logger.info("Conflicto resuelto (más reciente): {0}".format(relativa))
+            return
+
+        # conservar_ambos: la versión remota se guarda con otro nombre en ambos lados
+        relativa_conflicto = self._nombre_conflicto(relativa)
+        copiar_atomico(
+            os.path.join(self.ruta_remota, relativa),
+            os.path.join(self.ruta_remota, relativa_conflicto)
+        )
+        self._recibir(relativa_conflicto, resumen)
+        self._enviar(relativa, resumen)
+        logger.info("Conflicto resuelto (conservar ambos): {0} -> {1}".format(relativa, relativa_conflicto))
+
+    def _eliminar(self, raiz, relativa):
+        ruta = os.path.join(raiz, relativa)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        self.estado.eliminar(relativa)
+
+    def _sincronizar_ruta(self, relativa, local, remoto, base, resumen):
+        """Decide y ejecuta la acción para una ruta relativa"""
+        if local is None and remoto is None:
+            self.estado.eliminar(relativa)
+            return
+
+        cambio_local = local is not None and self._cambio(relativa, local, base, 'local')
+        cambio_remoto = remoto is not None and self._cambio(relativa, remoto, base, 'remoto')
+
+        if base is not None:
+            # Eliminado en un lado y sin cambios en el otro: se propaga la eliminación
+            if local is None and not cambio_remoto:
+                self._eliminar(self.ruta_remota, relativa)
+                resumen['eliminados_remoto'] += 1
+                return
+            if remoto is None and not cambio_local:
+                self._eliminar(self.ruta_local, relativa)
+                resumen['eliminados_local'] += 1
+                return
+
+        if local is not None and remoto is None:
+            if base is None:
+                self._enviar(relativa, resumen)
+            else:
+                self._resolver_conflicto(relativa, local, None, resumen)
+            return
+
+        if remoto is not None and local is None:
+            if base is None:
+                self._recibir(relativa, resumen)
+            else:
+                self._resolver_conflicto(relativa, None, remoto, resumen)
+            return
+
+        if not cambio_local and not cambio_remoto:
+            return
+        if cambio_local and not cambio_remoto:
+            self._enviar(relativa, resumen)
+            return
+        if cambio_remoto and not cambio_local:
+            self._recibir(relativa, resumen)
+            return
+
+        # Cambió en ambos lados: solo es conflicto si el contenido es distinto
+        if local[0] == remoto[0]:
+            if self._hash('local', relativa) == self._hash('remoto', relativa):
+                self._registrar(relativa, 'local')
+                return
+
+        self._resolver_conflicto(relativa, local, remoto, resumen)
+
+    def sincronizar(self):
+        """
+        Ejecuta la sincronización bidireccional
+        Retorna un resumen con los archivos enviados, recibidos, eliminados y en conflicto
+        """
+        resumen = {
+            'enviados': 0,
+            'recibidos': 0,
+            'eliminados_local': 0,
+            'eliminados_remoto': 0,
+            'conflictos': [],
+            'errores': []
+        }
+
+        archivos_local = self._escanear('local')
+        archivos_remotos = self._escanear('remoto')
+        estado = self.estado.cargar()
+
+        rutas = set(archivos_local) | set(archivos_remotos) | set(estado)
+        try:
+            for relativa in sorted(rutas):
+                try:
+                    self._sincronizar_ruta(
+                        relativa,
+                        archivos_local.get(relativa),
+                        archivos_remotos.get(relativa),
+                        estado.get(relativa),
+                        resumen
+                    )
+                except (OSError, shutil.Error) as e:
+                    logger.error("Error sincronizando {0}: {1}".format(relativa, e))
+                    resumen['errores'].append({'ruta': relativa, 'error': str(e)})
+        finally:
+            self.estado.confirmar()
+
+        logger.info(
+            "Sincronización bidireccional: {0} enviados, {1} recibidos, {2} conflictos, {3} errores".format(
+                resumen['enviados'], resumen['recibidos'],
+                len(resumen['conflictos']), len(resumen['errores'])
+            )
+        )
+        return resumen
@@ -0,0 +1,332 @@
+"""
+Transacciones sobre /etc/exports
+Agrupa muchas altas, bajas y modificaciones en una sola validación,
+un solo respaldo y una sola escritura atómica del archivo
+"""
+import os
+import shutil
+import tempfile
+
+from asignador_fsid import extraer_fsid
+from modelo_exports import firma_archivo
+from parser_exports import formatear_entrada
+from utils.logger import logger
+
+
+def escribir_atomico(ruta, contenido):
+    """
+    Escribe el contenido en un temporal del mismo directorio y lo renombra sobre ruta
+    Un lector nunca ve el archivo a medio escribir; se conservan los permisos originales
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(
+        prefix=".{0}.".format(os.path.basename(ruta)), suffix=".tmp", dir=directorio
+    )
+    try:
+        with os.fdopen(descriptor, 'w', newline='') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(ruta):
+            shutil.copymode(ruta, temporal)
+        else:
+            os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+class TransaccionExports:
+    """
+    Conjunto de cambios pendientes sobre un archivo exports de un GestorNFS
+    (/etc/exports o un drop-in de exports.d)
+    Los índices de eliminar/modificar se refieren a la configuración leída al
+    iniciar la transacción; nada se escribe hasta confirmar()
+
+    Uso:
+        with gestor.iniciar_transaccion() as transaccion:
+            transaccion.agregar("/srv/datos", "192.168.1.0/24", ["rw", "sync"])
+            transaccion.eliminar(3)
+        print(transaccion.resultado["message"])
+    """
+
+    def __init__(self, gestor, archivo=None):
+        self.gestor = gestor
+        self.ruta = gestor._resolver_archivo(archivo)
+        modelo = gestor.obtener_modelo(self.ruta)
+        self.modelo = modelo
+        self.configuraciones = list(modelo.configuraciones)
+        self.firma = modelo.firma
+
+        self.altas = []
+        self.bajas = set()
+        # indice -> (carpeta, [(host, opciones), ...])
+        self.modificaciones = {}
+        self.resultado = None
+        self.cerrada = False
+
+    def __len__(self):
+        return len(self.altas) + len(self.bajas) + len(self.modificaciones)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is not None:
+            self.descartar()
+            return False
+        if not self.cerrada:
+            self.confirmar()
+        return False
+
+    def _verificar_abierta(self):
+        if self.cerrada:
+            raise RuntimeError("La transacción ya fue confirmada o descartada")
+
+    def _verificar_indice(self, indice):
+        if indice < 0 or indice >= len(self.configuraciones):
+            raise IndexError("Índice de configuración fuera de rango: {0}".format(indice))
+
+    def agregar(self, carpeta, hosts, opciones, ajustar_permisos=False, tipo=None):
+        """
+        Agrega una nueva exportación
+        tipo ('directorio' o 'archivo', como lo retorna validar_ruta) indica que la
+        exportación ya se validó (por ejemplo en lote al importar): no se vuelve a
+        validar ni a consultar el sistema de archivos al confirmar
+        """
+        self._verificar_abierta()
+        self.altas.append({
+            'carpeta': carpeta,
+            'hosts': hosts,
+            'opciones': list(opciones) if isinstance(opciones, (list, tuple)) else opciones,
+            'ajustar_permisos': ajustar_permisos,
+            'tipo': tipo
+        })
+
+    def eliminar(self, indice):
+        """Elimina la configuración en la posición indice"""
+        self._verificar_abierta()
+        self._verificar_indice(indice)
+        self.modificaciones.pop(indice, None)
+        self.bajas.add(indice)
+
+    def modificar(self, indice, carpeta=None, hosts=None, opciones=None, clientes=None):
+        """
+        Reemplaza la configuración en la posición indice
+        Los campos no indicados conservan su valor actual: si solo se indican
+        opciones, se aplican a todos los hosts de la línea; si no se indican,
+        cada host conserva las suyas y los hosts nuevos reciben las del primero
+        clientes (lista de (host, opciones)) reemplaza hosts y opciones a la vez
+        """
+        self._verificar_abierta()
+        self._verificar_indice(indice)
+        if indice in self.bajas:
+            raise ValueError("La configuración {0} ya está marcada para eliminar".format(indice))
+
+        actual = self.configuraciones[indice]
+        if clientes is not None:
+            clientes = [(host, list(opciones_host)) for host, opciones_host in clientes]
+        elif hosts is None and opciones is None:
+            clientes = [(host, list(opciones_host)) for host, opciones_host in actual['clientes']]
+        else:
+            lista_hosts = hosts.split() if hosts is not None else [h for h, _ in actual['clientes']]
+            if opciones is not None:
+                clientes = [(host, list(opciones)) for host in lista_hosts]
+            else:
+                # Hosts nuevos: las opciones del primer cliente de la línea ('opciones'
+                # es la unión de las de todos y puede mezclar rw y ro)
+                anteriores = dict(actual['clientes'])
+                opciones_nuevos = actual['clientes'][0][1] if actual['clientes'] else actual['opciones']
+                clientes = [
+                    (host, list(anteriores.get(host, opciones_nuevos))) for host in lista_hosts
+                ]
+
+        self.modificaciones[indice] = (
+            carpeta if carpeta is not None else actual['carpeta'],
+            clientes
+        )
+
+    def descartar(self):
+        """Descarta los cambios pendientes"""
+        self.cerrada = True
+        self.resultado = {"success": False, "message": "Transacción descartada", "errores": []}
+
+    def _validar(self):
+        """
+        Valida todos los cambios antes de tocar el archivo
+        Retorna la lista de errores (vacía si todo es válido)
+        """
+        errores = []
+        for numero, alta in enumerate(self.altas, 1):
+            if alta['tipo'] is not None:
+                continue
+            valido, mensaje = self.gestor._validar_parametros(
+                alta['carpeta'], alta['hosts'], alta['opciones']
+            )
+            if not valido:
+                errores.append("Alta {0} ({1}): {2}".format(numero, alta['carpeta'], mensaje))
+
+        for indice, (carpeta, clientes) in sorted(self.modificaciones.items()):
+            if not clientes:
+                errores.append("Modificación {0} ({1}): Hosts son requeridos".format(indice, carpeta))
+            for host, opciones in clientes:
+                valido, mensaje = self.gestor._validar_parametros(carpeta, host, opciones)
+                if not valido:
+                    errores.append("Modificación {0} ({1}): {2}".format(indice, carpeta, mensaje))
+                    break
+        return errores
+
+    def _nuevo_texto(self, texto_actual, lineas_altas):
+        """
+        Construye el contenido final reemplazando solo los tramos de las entradas
+        eliminadas o modificadas; el resto del archivo (comentarios, líneas en blanco,
+        continuaciones, finales de línea) se copia sin cambios
+        """
+        tramos = []
+        for indice in sorted(self.bajas | set(self.modificaciones)):
+            config = self.configuraciones[indice]
+            if indice in self.bajas:
+                tramos.append((config['inicio'], config['fin'], ""))
+                continue
+
+            carpeta, clientes = self.modificaciones[indice]
+            original = texto_actual[config['inicio']:config['fin']]
+            salto = original[len(original.rstrip("\r\n")):] or "\n"
+            # El comentario al final de la línea se mantiene
+            nueva = formatear_entrada(carpeta, clientes, config.get('comentario'))
+            tramos.append((config['inicio'], config['fin'], nueva + salto))
+
+        partes = []
+        posicion = 0
+        for inicio, fin, reemplazo in tramos:
+            partes.append(texto_actual[posicion:inicio])
+            partes.append(reemplazo)
+            posicion = fin
+        partes.append(texto_actual[posicion:])
+
+        resultado = "".join(partes)
+        if lineas_altas:
+            if resultado and not resultado.endswith("\n"):
+                resultado += "\n"
+            resultado += "".join(linea + "\n" for linea in lineas_altas)
+        return resultado
+
+    @staticmethod
+    def _es_archivo(alta):
+        """True/False si el tipo de la alta ya se conoce, None si hay que consultarlo"""
+        return None if alta['tipo'] is None else alta['tipo'] == 'archivo'
+
+    def _lineas_altas(self):
+        """
+        Formatea las líneas nuevas asignando de una vez los fsid que hagan falta
+        El asignador del gestor no se modifica hasta que el archivo cambie
+        """
+        gestor = self.gestor
+        asignador = gestor.obtener_asignador_fsid().copiar()
+
+        pendientes = []
+        for indice, alta in enumerate(self.altas):
+            if gestor._necesita_fsid(alta['carpeta'], alta['opciones'], self._es_archivo(alta)):
+                pendientes.append(indice)
+                continue
+            fsid = extraer_fsid(alta['opciones'])
+            if fsid is not None and not asignador.ocupar(fsid):
+                logger.warning("fsid={0} de {1} ya está en uso (debe corresponder a la misma ruta)".format(
+                    fsid, alta['carpeta']
+                ))
+
+        fsids = dict(zip(pendientes, asignador.asignar_varios(
+            gestor.generar_fsid_desde_ruta(self.altas[i]['carpeta']) for i in pendientes
+        )))
+
+        lineas = []
+        for indice, alta in enumerate(self.altas):
+            opciones = gestor._completar_opciones(
+                alta['carpeta'], alta['opciones'], fsids.get(indice), self._es_archivo(alta)
+            )
+            if alta['ajustar_permisos']:
+                exito, _ = gestor.aplicar_permisos_filesystem(alta['carpeta'], opciones)
+                if not exito:
+                    logger.warning("No se pudieron ajustar los permisos del filesystem")
+            lineas.append(gestor._formatear_linea_exports(alta['carpeta'], alta['hosts'], opciones))
+        return lineas
+
+    def confirmar(self):
+        """
+        Valida todo, crea un único respaldo y escribe el archivo una sola vez
+        Retorna {"success", "message", "errores", "agregadas", "eliminadas", "modificadas"}
+        """
+        self._verificar_abierta()
+        self.cerrada = True
+        gestor = self.gestor
+
+        errores = self._validar()
+        if errores:
+            for error in errores:
+                logger.error(error)
+            self.resultado = {
+                "success": False,
+                "message": "[ERROR] {0} cambios no válidos, no se modificó {1}".format(
+                    len(errores), self.ruta
+                ),
+                "errores": errores
+            }
+            return self.resultado
+
+        try:
+            lineas_altas = self._lineas_altas()
+        except ValueError as e:
+            self.resultado = {"success": False, "message": "[ERROR] {0}".format(e), "errores": [str(e)]}
+            logger.error(self.resultado["message"])
+            return self.resultado
+
+        # Se parte del texto leído al iniciar: las posiciones de las entradas son las suyas
+        documento = self.modelo.documento
+        texto_actual = documento.texto() if documento is not None else ""
+
+        # _lineas_altas puede tardar (permisos del filesystem): la firma se comprueba justo antes de escribir
+        if firma_archivo(self.ruta) != self.firma:
+            self.resultado = {
+                "success": False,
+                "message": "[ERROR] {0} cambió durante la transacción".format(self.ruta),
+                "errores": []
+            }
+            logger.error(self.resultado["message"])
+            return self.resultado
+
+        try:
+            if documento is None:
+                directorio = os.path.dirname(self.ruta)
+                if not os.path.isdir(directorio):
+                    os.makedirs(directorio)
+
+            gestor._crear_respaldo(self.ruta)
+            escribir_atomico(self.ruta, self._nuevo_texto(texto_actual, lineas_altas))
+            gestor.invalidar_cache(self.ruta)
+        except Exception as e:
+            self.resultado = {
+                "success": False,
+                "message": "[ERROR] No se pudo escribir {0}: {1}".format(self.ruta, e),
+                "errores": [str(e)]
+            }
+            logger.error(self.resultado["message"])
+            return self.resultado
+
+        # El modelo leído al iniciar es lo que había antes (la firma no cambió)
+        gestor._auditar(self.ruta, self.modelo.exportaciones(), 'transaccion')
+
+        mensaje = "[OK] Transacción aplicada: {0} agregadas, {1} eliminadas, {2} modificadas".format(
+            len(self.altas), len(self.bajas), len(self.modificaciones)
+        )
+        logger.exito(mensaje)
+        self.resultado = {
+            "success": True,
+            "message": mensaje,
+            "errores": [],
+            "agregadas": lineas_altas,
+            "eliminadas": [self.configuraciones[i] for i in sorted(self.bajas)],
+            "modificadas": sorted(self.modificaciones)
+        }
+        return self.resultado
@@ -2,18 +2,66 @@
 Módulo de Transferencia Bidireccional
 Nueva funcionalidad que combina envío y recepción de archivos/directorios
 """
+import errno
 import os
+import random
 import shutil
+import threading
+import time
+from indice_arbol import IndiceArbol
+from sincronizacion import SincronizadorBidireccional, copiar_atomico, es_archivo_sincronizable
+from utils import compresion
 from utils.logger import logger
 
 
+# Errores transitorios típicos de NFS: el servidor se reinició, la red se cortó
+# brevemente o el manejador de archivo quedó obsoleto
+ERRNOS_REINTENTABLES = {
+    errno.ESTALE,
+    errno.EIO,
+    errno.ETIMEDOUT,
+    errno.EAGAIN,
+    errno.EINTR,
+    errno.ENOTCONN,
+    errno.ECONNRESET,
+    errno.ECONNREFUSED,
+    errno.EHOSTUNREACH
+}
+
+
+def es_error_reintentable(error):
+    """
+    Clasifica una excepción como transitoria (vale la pena reintentar) o permanente
+    """
+    if isinstance(error, shutil.Error):
+        # copytree acumula los errores como (origen, destino, texto)
+        mensajes = [str(detalle[-1]) for detalle in error.args[0] if isinstance(detalle, tuple)]
+        textos = [os.strerror(numero) for numero in ERRNOS_REINTENTABLES]
+        return any(texto in mensaje for mensaje in mensajes for texto in textos)
+    
+    if isinstance(error, TimeoutError):
+        return True
+    
+    return isinstance(error, OSError) and error.errno in ERRNOS_REINTENTABLES
+
+
 class TransferenciaNFS:
     """
     Clase para manejar transferencias bidireccionales de archivos y directorios
     """
     
-    def __init__(self, punto_montaje):
+    def __init__(self, punto_montaje, comprimir=False, max_reintentos=3,
+                 espera_base=0.5, espera_maxima=30.0):
         self.punto_montaje = punto_montaje
+        # Si está activo, los envíos se guardan comprimidos junto a un manifiesto
+        self.comprimir = comprimir
+        self.codec = compresion.obtener_codec_preferido()
+        # Protege la lectura-modificación-escritura de manifiestos entre hilos
+        self._bloqueo_manifiesto = threading.Lock()
+        # Reintentos con espera exponencial en las operaciones múltiples
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
         logger.info("TransferenciaNFS inicializado con punto de montaje: {0}".format(punto_montaje))
     
     def validar_montaje(self):
@@ -51,12 +99,20 @@ class TransferenciaNFS:
             else:
                 ruta_destino = os.path.join(self.punto_montaje, os.path.basename(ruta_origen))
             
-            shutil.copy2(ruta_origen, ruta_destino)
+            if self.comprimir:
+                self._enviar_archivo_comprimido(ruta_origen, ruta_destino)
+            else:
+                shutil.copy2(ruta_origen, ruta_destino)
+                self._olvidar_comprimidos(ruta_destino, [ruta_destino])
             logger.exito("Archivo enviado: {0}".format(os.path.basename(ruta_origen)))
             return {"success": True, "message": "[OK] Archivo enviado correctamente"}
         except Exception as e:
             logger.error("Error enviando archivo: {0}".format(str(e)))
-            return {"success": False, "message": "[ERROR] {0}".format(str(e))}
+            return {
+                "success": False,
+                "message": "[ERROR] {0}".format(str(e)),
+                "reintentable": es_error_reintentable(e)
+            }
     
     def enviar_directorio(self, ruta_origen, nombre_destino=None):
         """
@@ -81,12 +137,24 @@ class TransferenciaNFS:
             else:
                 ruta_destino = os.path.join(self.punto_montaje, os.path.basename(ruta_origen))
             
-            shutil.copytree(ruta_origen, ruta_destino, dirs_exist_ok=True)
+            if self.comprimir:
+                self._enviar_directorio_comprimido(ruta_origen, ruta_destino)
+            else:
+                shutil.copytree(ruta_origen, ruta_destino, dirs_exist_ok=True)
+                self._olvidar_comprimidos(ruta_destino, [
+                    os.path.join(ruta_destino, os.path.relpath(os.path.join(raiz, archivo), ruta_origen))
+                    for raiz, _dirs, archivos in os.walk(ruta_origen)
+                    for archivo in archivos
+                ])
             logger.exito("Directorio enviado: {0}".format(os.path.basename(ruta_origen)))
             return {"success": True, "message": "[OK] Directorio enviado correctamente"}
         except Exception as e:
             logger.error("Error enviando directorio: {0}".format(str(e)))
-            return {"success": False, "message": "[ERROR] {0}".format(str(e))}
+            return {
+                "success": False,
+                "message": "[ERROR] {0}".format(str(e)),
+                "reintentable": es_error_reintentable(e)
+            }
     
     def recibir_archivo(self, nombre_archivo, destino_local):
         """
@@ -98,12 +166,13 @@ class TransferenciaNFS:
             return {"success": False, "message": "[ERROR] {0}".format(mensaje)}
         
         ruta_origen = os.path.join(self.punto_montaje, nombre_archivo)
+        objeto = self._buscar_objeto_comprimido(ruta_origen)
         
-        if not os.path.exists(ruta_origen):
+        if objeto is None and not os.path.exists(ruta_origen):
             logger.error("Archivo remoto no existe: {0}".format(nombre_archivo))
             return {"success": False, "message": "[ERROR] El archivo no existe en el recurso NFS"}
         
-        if not os.path.isfile(ruta_origen):
+        if objeto is None and not os.path.isfile(ruta_origen):
             logger.error("La ruta remota no es un archivo: {0}".format(nombre_archivo))
             return {"success": False, "message": "[ERROR] La ruta debe ser un archivo"}
         
@@ -113,12 +182,20 @@ class TransferenciaNFS:
             if dir_destino and not os.path.exists(dir_destino):
                 os.makedirs(dir_destino)
             
-            shutil.copy2(ruta_origen, destino_local)
+            if objeto is not None:
+                ruta_objeto, entrada = objeto
+                self._restaurar_objeto(ruta_objeto, destino_local, entrada)
+            else:
+                shutil.copy2(ruta_origen, destino_local)
             logger.exito("Archivo recibido: {0}".format(nombre_archivo))
             return {"success": True, "message": "[OK] Archivo recibido correctamente"}
         except Exception as e:
             logger.error("Error recibiendo archivo: {0}".format(str(e)))
-            return {"success": False, "message": "[ERROR] {0}".format(str(e))}
+            return {
+                "success": False,
+                "message": "[ERROR] {0}".format(str(e)),
+                "reintentable": es_error_reintentable(e)
+            }
     
     def recibir_directorio(self, nombre_directorio, destino_local):
         """
@@ -140,12 +217,51 @@ class TransferenciaNFS:
             return {"success": False, "message": "[ERROR] La ruta debe ser un directorio"}
         
         try:
-            shutil.copytree(ruta_origen, destino_local, dirs_exist_ok=True)
+            self._recibir_arbol(ruta_origen, destino_local)
             logger.exito("Directorio recibido: {0}".format(nombre_directorio))
             return {"success": True, "message": "[OK] Directorio recibido correctamente"}
         except Exception as e:
             logger.error("Error recibiendo directorio: {0}".format(str(e)))
-            return {"success": False, "message": "[ERROR] {0}".format(str(e))}
+            return {
+                "success": False,
+                "message": "[ERROR] {0}".format(str(e)),
+                "reintentable": es_error_reintentable(e)
+            }
+    
+    def iterar_remoto(self):
+        """
+        Genera uno a uno los elementos del recurso NFS montado
+        No valida el montaje: lo hace quien consume el generador
+        """
+        objetos = self._objetos_del_manifiesto(self.punto_montaje)
+        for item in os.listdir(self.punto_montaje):
+            ruta_completa = os.path.join(self.punto_montaje, item)
+            
+            # Los archivos comprimidos se muestran con su nombre original
+            if item == compresion.NOMBRE_MANIFIESTO:
+                continue
+            if item in objetos:
+                nombre, entrada = objetos[item]
+                yield {
+                    "nombre": nombre,
+                    "tipo": "archivo",
+                    "tamano": entrada["tamano"],
+                    "ruta": ruta_completa
+                }
+                continue
+            
+            tipo = "directorio" if os.path.isdir(ruta_completa) else "archivo"
+            try:
+                tamano = os.path.getsize(ruta_completa) if os.path.isfile(ruta_completa) else 0
+            except:
+                tamano = 0
+            
+            yield {
+                "nombre": item,
+                "tipo": tipo,
+                "tamano": tamano,
+                "ruta": ruta_completa
+            }
     
     def listar_remoto(self):
         """
@@ -157,21 +273,7 @@ class TransferenciaNFS:
             return {"success": False, "message": "[ERROR] {0}".format(mensaje), "items": []}
         
         try:
-            items = []
-            for item in os.listdir(self.punto_montaje):
-                ruta_completa = os.path.join(self.punto_montaje, item)
-                tipo = "directorio" if os.path.isdir(ruta_completa) else "archivo"
-                try:
-                    tamano = os.path.getsize(ruta_completa) if os.path.isfile(ruta_completa) else 0
-                except:
-                    tamano = 0
-                
-                items.append({
-                    "nombre": item,
-                    "tipo": tipo,
-                    "tamano": tamano,
-                    "ruta": ruta_completa
-                })
+            items = list(self.iterar_remoto())
             
             logger.info("Se listaron {0} items del recurso remoto".format(len(items)))
             return {"success": True, "message": "[OK] Contenido listado", "items": items}
@@ -186,29 +288,25 @@ class TransferenciaNFS:
         resultados = {
             "exitos": 0,
             "fallos": 0,
+            "reintentos": 0,
+            "reintentables": [],
             "detalles": []
         }
         
         for ruta in rutas_origen:
-            if os.path.isfile(ruta):
-                resultado = self.enviar_archivo(ruta)
-            elif os.path.isdir(ruta):
-                resultado = self.enviar_directorio(ruta)
-            else:
-                resultado = {"success": False, "message": "Ruta no válida"}
+            resultado = self._ejecutar_con_reintentos(self._enviar_ruta, ruta)
+            self._contabilizar(resultados, resultado)
             
-            if resultado["success"]:
-                resultados["exitos"] += 1
-            else:
-                resultados["fallos"] += 1
+            if not resultado["success"] and resultado.get("reintentable"):
+                resultados["reintentables"].append(ruta)
             
             resultados["detalles"].append({
                 "ruta": ruta,
                 "resultado": resultado
             })
         
-        mensaje_final = "[RESUMEN] Enviados: {0} | Fallidos: {1}".format(
-            resultados["exitos"], resultados["fallos"]
+        mensaje_final = "[RESUMEN] Enviados: {0} | Fallidos: {1} | Reintentables: {2}".format(
+            resultados["exitos"], resultados["fallos"], len(resultados["reintentables"])
         )
         logger.info(mensaje_final)
         
@@ -225,32 +323,25 @@ class TransferenciaNFS:
         resultados = {
             "exitos": 0,
             "fallos": 0,
+            "reintentos": 0,
+            "reintentables": [],
             "detalles": []
         }
         
         for nombre in nombres_remotos:
-            ruta_remota = os.path.join(self.punto_montaje, nombre)
-            ruta_local = os.path.join(destino_local, nombre)
-            
-            if os.path.isfile(ruta_remota):
-                resultado = self.recibir_archivo(nombre, ruta_local)
-            elif os.path.isdir(ruta_remota):
-                resultado = self.recibir_directorio(nombre, ruta_local)
-            else:
-                resultado = {"success": False, "message": "Elemento no encontrado"}
+            resultado = self._ejecutar_con_reintentos(self._recibir_nombre, nombre, destino_local)
+            self._contabilizar(resultados, resultado)
             
-            if resultado["success"]:
-                resultados["exitos"] += 1
-            else:
-                resultados["fallos"] += 1
+            if not resultado["success"] and resultado.get("reintentable"):
+                resultados["reintentables"].append(nombre)
             
             resultados["detalles"].append({
                 "nombre": nombre,
                 "resultado": resultado
             })
         
-        mensaje_final = "[RESUMEN] Recibidos: {0} | Fallidos: {1}".format(
-            resultados["exitos"], resultados["fallos"]
+        mensaje_final = "[RESUMEN] Recibidos: {0} | Fallidos: {1} | Reintentables: {2}".format(
+            resultados["exitos"], resultados["fallos"], len(resultados["reintentables"])
         )
         logger.info(mensaje_final)
         
@@ -260,10 +351,95 @@ class TransferenciaNFS:
             "resultados": resultados
         }
     
-    def sincronizar(self, ruta_local, direccion="enviar"):
+    # ============== REINTENTOS ==============
+    
+    def _enviar_ruta(self, ruta):
+        """Envía una ruta local según sea archivo o directorio"""
+        if os.path.isfile(ruta):
+            return self.enviar_archivo(ruta)
+        if os.path.isdir(ruta):
+            return self.enviar_directorio(ruta)
+        return {"success": False, "message": "Ruta no válida"}
+    
+    def _recibir_nombre(self, nombre, destino_local):
+        """Recibe un elemento remoto según sea archivo o directorio"""
+        ruta_remota = os.path.join(self.punto_montaje, nombre)
+        ruta_local = os.path.join(destino_local, nombre)
+        
+        if os.path.isfile(ruta_remota) or self._buscar_objeto_comprimido(ruta_remota):
+            return self.recibir_archivo(nombre, ruta_local)
+        if os.path.isdir(ruta_remota):
+            return self.recibir_directorio(nombre, ruta_local)
+        return {"success": False, "message": "Elemento no encontrado"}
+    
+    def _montaje_obsoleto(self):
+        """
+        Indica si el punto de montaje responde con un error transitorio (ESTALE, EIO...)
+        """
+        try:
+            os.stat(self.punto_montaje)
+            return False
+        except OSError as e:
+            return es_error_reintentable(e)
+    
+    def es_fallo_reintentable(self, resultado):
+        """
+        Indica si un resultado fallido se debe a un error transitorio
+        Además del error de la operación se comprueba el estado del montaje,
+        porque con ESTALE las comprobaciones previas fallan sin excepción
+        """
+        if resultado["success"]:
+            return False
+        return bool(resultado.get("reintentable")) or self._montaje_obsoleto()
+    
+    def calcular_espera(self, intento):
+        """
+        Espera exponencial con variación aleatoria para no sincronizar a todos los clientes
+        """
+        espera = min(self.espera_maxima, self.espera_base * (2 ** (intento - 1)))
+        return espera * random.uniform(0.5, 1.0)
+    
+    def _ejecutar_con_reintentos(self, operacion, *args):
+        """
+        Ejecuta una operación reintentando los errores transitorios
+        Antes de cada reintento se vuelve a validar el montaje
+        """
+        resultado = operacion(*args)
+        intentos = 1
+        
+        while self.es_fallo_reintentable(resultado) and intentos <= self.max_reintentos:
+            espera = self.calcular_espera(intentos)
+            logger.warning("Error transitorio: {0} - reintento {1}/{2} en {3:.1f}s".format(
+                resultado["message"], intentos, self.max_reintentos, espera
+            ))
+            time.sleep(espera)
+            intentos += 1
+            
+            valido, mensaje = self.validar_montaje()
+            if not valido:
+                resultado = {"success": False, "message": "[ERROR] {0}".format(mensaje), "reintentable": True}
+                continue
+            
+            resultado = operacion(*args)
+        
+        resultado["reintentable"] = self.es_fallo_reintentable(resultado)
+        resultado["intentos"] = intentos
+        return resultado
+    
+    def _contabilizar(self, resultados, resultado):
+        """Suma un resultado al resumen de una operación múltiple"""
+        if resultado["success"]:
+            resultados["exitos"] += 1
+        else:
+            resultados["fallos"] += 1
+        resultados["reintentos"] += resultado.get("intentos", 1) - 1
+    
+    def sincronizar(self, ruta_local, direccion="enviar", politica="mas_reciente"):
         """
         Sincroniza un directorio local con el recurso NFS
-        direccion: "enviar" o "recibir"
+        direccion: "enviar", "recibir" o "bidireccional"
+        politica: resolución de conflictos del modo bidireccional
+                  ("mas_reciente", "conservar_ambos" u "omitir")
         """
         valido, mensaje = self.validar_montaje()
         if not valido:
@@ -277,26 +453,34 @@ class TransferenciaNFS:
             return {"success": False, "message": "[ERROR] La ruta debe ser un directorio"}
         
         try:
+            if direccion == "bidireccional":
+                return self._sincronizar_bidireccional(ruta_local, politica)
+            
             if direccion == "enviar":
                 # Sincronizar local -> remoto
-                for item in os.listdir(ruta_local):
-                    ruta_item = os.path.join(ruta_local, item)
-                    if os.path.isfile(ruta_item):
-                        self.enviar_archivo(ruta_item)
-                    elif os.path.isdir(ruta_item):
-                        self.enviar_directorio(ruta_item)
+                if self.comprimir:
+                    # Los objetos comprimidos no se comparan con el índice: se envía todo
+                    for item in os.listdir(ruta_local):
+                        ruta_item = os.path.join(ruta_local, item)
+                        if os.path.isfile(ruta_item):
+                            self.enviar_archivo(ruta_item)
+                        elif os.path.isdir(ruta_item):
+                            self.enviar_directorio(ruta_item)
+                else:
+                    self._sincronizar_con_indices(ruta_local, self.punto_montaje)
                 
                 mensaje = "[OK] Sincronización completada (local -> remoto)"
             else:
                 # Sincronizar remoto -> local
-                for item in os.listdir(self.punto_montaje):
-                    ruta_remota = os.path.join(self.punto_montaje, item)
-                    ruta_local_item = os.path.join(ruta_local, item)
-                    
-                    if os.path.isfile(ruta_remota):
-                        self.recibir_archivo(item, ruta_local_item)
-                    elif os.path.isdir(ruta_remota):
-                        self.recibir_directorio(item, ruta_local_item)
+                if not self._sincronizar_con_indices(self.punto_montaje, ruta_local):
+                    # El recurso tiene objetos comprimidos: se recibe elemento a elemento
+                    for item in self.listar_remoto()["items"]:
+                        ruta_local_item = os.path.join(ruta_local, item["nombre"])
+                        
+                        if item["tipo"] == "archivo":
+                            self.recibir_archivo(item["nombre"], ruta_local_item)
+                        else:
+                            self.recibir_directorio(item["nombre"], ruta_local_item)
                 
                 mensaje = "[OK] Sincronización completada (remoto -> local)"
             
@@ -304,4 +488,320 @@ class TransferenciaNFS:
             return {"success": True, "message": mensaje}
         except Exception as e:
             logger.error("Error en sincronización: {0}".format(str(e)))
-            return {"success": False, "message": "[ERROR] {0}".format(str(e))}
\ No newline at end of file
+            return {"success": False, "message": "[ERROR] {0}".format(str(e))}
+    
+    def _sincronizar_con_indices(self, origen, destino):
+        """
+        Copia de origen a destino solo los archivos nuevos o con distinto tamaño/mtime
+        Ambos árboles se recorren con su índice persistente, por lo que los
+        directorios sin cambios no se vuelven a leer
+        Retorna False (sin copiar nada) si el origen contiene objetos comprimidos; las
+        entradas de los manifiestos del destino para los archivos copiados se eliminan
+        """
+        indice_origen = IndiceArbol(origen)
+        indice_destino = IndiceArbol(destino)
+        try:
+            archivos_origen = indice_origen.escanear()
+            if any(os.path.basename(r) == compresion.NOMBRE_MANIFIESTO for r in archivos_origen):
+                return False
+            archivos_destino = indice_destino.escanear()
+        finally:
+            indice_origen.cerrar()
+            indice_destino.cerrar()
+        
+        # Manifiestos del destino: sus entradas para los archivos del origen quedan obsoletas
+        manifiestos_destino = [
+            os.path.dirname(os.path.join(destino, relativa)) for relativa in archivos_destino
+            if os.path.basename(relativa) == compresion.NOMBRE_MANIFIESTO
+        ]
+        sincronizados = []
+        
+        copiados = 0
+        for relativa, (tamano, mtime_ns) in archivos_origen.items():
+            if not es_archivo_sincronizable(relativa):
+                continue
+            sincronizados.append(os.path.join(destino, relativa))
+            
+            actual = archivos_destino.get(relativa)
+            # copy2 preserva el mtime; se tolera la precisión de segundos del servidor
+            if actual and actual[0] == tamano and abs(actual[1] - mtime_ns) < 10 ** 9:
+                continue
+            
+            copiar_atomico(os.path.join(origen, relativa), os.path.join(destino, relativa))
+            copiados += 1
+        
+        if manifiestos_destino or os.path.abspath(destino).startswith(os.path.abspath(self.punto_montaje)):
+            self._olvidar_comprimidos(destino, sincronizados, manifiestos_destino)
+        
+        logger.info("Sincronización indexada: {0} de {1} archivos copiados".format(
+            copiados, len(archivos_origen)
+        ))
+        return True
+    
+    def _sincronizar_bidireccional(self, ruta_local, politica):
+        """
+        Sincroniza en ambos sentidos usando el estado de la última sincronización
+        Los archivos se copian sin comprimir para poder comparar ambos lados; un
+        recurso con objetos comprimidos (enviados con comprimir=True) se rechaza
+        """
+        sincronizador = SincronizadorBidireccional(ruta_local, self.punto_montaje, politica)
+        try:
+            resumen = sincronizador.sincronizar()
+        except ValueError as e:
+            # Árbol con objetos comprimidos: se rechaza antes de copiar nada
+            logger.error(str(e))
+            return {"success": False, "message": "[ERROR] {0}".format(e)}
+        finally:
+            sincronizador.cerrar()
+        
+        detalle = "Sincronización bidireccional: {0} enviados | {1} recibidos | {2} eliminados | {3} conflictos".format(
+            resumen["enviados"],
+            resumen["recibidos"],
+            resumen["eliminados_local"] + resumen["eliminados_remoto"],
+            len(resumen["conflictos"])
+        )
+        if resumen["errores"]:
+            mensaje = "[ADVERTENCIA] {0} | {1} errores".format(detalle, len(resumen["errores"]))
+        else:
+            mensaje = "[OK] {0}".format(detalle)
+        
+        logger.exito(mensaje)
+        return {"success": not resumen["errores"], "message": mensaje, "resumen": resumen}
+    
+    # ============== COMPRESIÓN ==============
+    
+    def _guardar_objeto(self, ruta_origen, directorio_destino, relativa):
+        """
+        Guarda un archivo en directorio_destino, comprimido si vale la pena
+        Retorna la entrada de manifiesto correspondiente
+        """
+        if compresion.debe_comprimir(ruta_origen):
+            codec = self.codec
+        else:
+            codec = compresion.CODEC_NINGUNO
+        
+        objeto = compresion.nombre_objeto(relativa, codec)
+        ruta_objeto = os.path.join(directorio_destino, objeto)
+        
+        if codec == compresion.CODEC_NINGUNO:
+            shutil.copy2(ruta_origen, ruta_objeto)
+            tamano_objeto = os.path.getsize(ruta_objeto)
+        else:
+            tamano_objeto = compresion.comprimir_archivo(ruta_origen, ruta_objeto, codec)
+            shutil.copystat(ruta_origen, ruta_objeto)
+        
+        info = os.stat(ruta_origen)
+        return {
+            "objeto": objeto,
+            "codec": codec,
+            "tamano": info.st_size,
+            "tamano_objeto": tamano_objeto,
+            "mtime": info.st_mtime
+        }
+    
+    def _actualizar_manifiesto(self, directorio, nuevas):
+        """
+        Combina nuevas entradas con el manifiesto existente de un directorio
+        Elimina los objetos anteriores que quedaron reemplazados
+        """
+        with self._bloqueo_manifiesto:
+            manifiesto = compresion.leer_manifiesto(directorio)
+            archivos = manifiesto["archivos"] if manifiesto else {}
+            
+            for relativa, entrada in nuevas.items():
+                anterior = archivos.get(relativa)
+                if anterior and anterior["objeto"] != entrada["objeto"]:
+                    ruta_anterior = os.path.join(directorio, anterior["objeto"])
+                    if os.path.isfile(ruta_anterior):
+                        os.remove(ruta_anterior)
+                archivos[relativa] = entrada
+            
+            compresion.escribir_manifiesto(directorio, archivos)
+    
+    def _olvidar_comprimidos(self, ruta_remota, escritos, otros_directorios=()):
+        """
+        Quita de los manifiestos las entradas de los archivos escritos sin comprimir
+        (rutas remotas absolutas, dentro de ruta_remota) y borra sus objetos, para que
+        un envío sin comprimir no quede oculto tras una versión comprimida anterior
+        Se revisan los manifiestos de ruta_remota, de sus ancestros en el recurso y
+        de otros_directorios (los que hay dentro de ruta_remota)
+        Un objeto sin comprimir con el mismo nombre que el archivo no se borra: es la copia nueva
+        """
+        escritos = set(os.path.abspath(ruta) for ruta in escritos)
+        raiz = os.path.abspath(self.punto_montaje)
+        ruta_remota = os.path.abspath(ruta_remota)
+        directorios = [os.path.abspath(d) for d in otros_directorios]
+        if os.path.isdir(ruta_remota) and ruta_remota not in directorios:
+            directorios.append(ruta_remota)
+        directorio = os.path.dirname(ruta_remota)
+        while directorio == raiz or directorio.startswith(raiz + os.sep):
+            directorios.append(directorio)
+            if directorio == raiz:
+                break
+            directorio = os.path.dirname(directorio)
+        
+        with self._bloqueo_manifiesto:
+            for directorio in directorios:
+                manifiesto = compresion.leer_manifiesto(directorio)
+                if not manifiesto:
+                    continue
+                
+                archivos = manifiesto["archivos"]
+                quitadas = [
+                    relativa for relativa in archivos
+                    if os.path.normpath(os.path.join(directorio, relativa)) in escritos
+                ]
+                if not quitadas:
+                    continue
+                
+                for relativa in quitadas:
+                    entrada = archivos.pop(relativa)
+                    if entrada["objeto"] != relativa:
+                        ruta_objeto = os.path.join(directorio, entrada["objeto"])
+                        if os.path.isfile(ruta_objeto):
+                            os.remove(ruta_objeto)
+                
+                if archivos:
+                    compresion.escribir_manifiesto(directorio, archivos)
+                else:
+                    os.remove(os.path.join(directorio, compresion.NOMBRE_MANIFIESTO))
+                logger.info("{0} entradas comprimidas reemplazadas en {1}".format(len(quitadas), directorio))
+    
+    def _eliminar_copias_planas(self, directorio, entradas):
+        """
+        Borra las copias sin comprimir que quedaron de envíos anteriores de las mismas
+        rutas (entradas: relativa -> entrada del manifiesto de directorio); si no,
+        el recurso tendría dos versiones del archivo y podría recuperarse la antigua
+        """
+        for relativa, entrada in entradas.items():
+            if entrada["objeto"] == relativa:
+                continue
+            ruta_plana = os.path.join(directorio, relativa)
+            if os.path.isfile(ruta_plana):
+                os.remove(ruta_plana)
+    
+    def _enviar_archivo_comprimido(self, ruta_origen, ruta_destino):
+        """
+        Envía un archivo comprimido y lo registra en el manifiesto de su directorio
+        """
+        directorio = os.path.dirname(ruta_destino)
+        nombre = os.path.basename(ruta_destino)
+        entrada = self._guardar_objeto(ruta_origen, directorio, nombre)
+        self._actualizar_manifiesto(directorio, {nombre: entrada})
+        self._eliminar_copias_planas(directorio, {nombre: entrada})
+        
+        logger.info("Archivo comprimido ({0}): {1} -> {2} bytes".format(
+            entrada["codec"], entrada["tamano"], entrada["tamano_objeto"]
+        ))
+    
+    def _enviar_directorio_comprimido(self, ruta_origen, ruta_destino):
+        """
+        Envía un directorio guardando cada archivo comprimido
+        Un único manifiesto en la raíz del destino describe todo el árbol
+        """
+        nuevas = {}
+        total_original = 0
+        total_objetos = 0
+        
+        for raiz, _dirs, archivos in os.walk(ruta_origen):
+            relativa_raiz = os.path.relpath(raiz, ruta_origen)
+            directorio_destino = os.path.normpath(os.path.join(ruta_destino, relativa_raiz))
+            if not os.path.isdir(directorio_destino):
+                os.makedirs(directorio_destino)
+            
+            for archivo in archivos:
+                relativa = os.path.normpath(os.path.join(relativa_raiz, archivo))
+                entrada = self._guardar_objeto(os.path.join(raiz, archivo), ruta_destino, relativa)
+                nuevas[relativa] = entrada
+                total_original += entrada["tamano"]
+                total_objetos += entrada["tamano_objeto"]
+        
+        self._actualizar_manifiesto(ruta_destino, nuevas)
+        self._eliminar_copias_planas(ruta_destino, nuevas)
+        
+        logger.info("Directorio comprimido ({0}): {1} archivos, {2} -> {3} bytes".format(
+            self.codec, len(nuevas), total_original, total_objetos
+        ))
+    
+    def _objetos_del_manifiesto(self, directorio):
+        """
+        Retorna un diccionario objeto -> (ruta_relativa, entrada) del manifiesto de un directorio
+        """
+        manifiesto = compresion.leer_manifiesto(directorio)
+        if not manifiesto:
+            return {}
+        
+        return dict(
+            (entrada["objeto"], (relativa, entrada))
+            for relativa, entrada in manifiesto["archivos"].items()
+        )
+    
+    def _buscar_objeto_comprimido(self, ruta_remota):
+        """
+        Busca en los manifiestos de los directorios ancestros el objeto de una ruta remota
+        Retorna (ruta_objeto, entrada) o None si el archivo no está comprimido
+        """
+        raiz = os.path.abspath(self.punto_montaje)
+        ruta_remota = os.path.abspath(ruta_remota)
+        directorio = os.path.dirname(ruta_remota)
+        
+        while directorio == raiz or directorio.startswith(raiz + os.sep):
+            manifiesto = compresion.leer_manifiesto(directorio)
+            if manifiesto:
+                relativa = os.path.relpath(ruta_remota, directorio)
+                entrada = manifiesto["archivos"].get(relativa)
+                if entrada:
+                    return (os.path.join(directorio, entrada["objeto"]), entrada)
+            
+            if directorio == raiz:
+                break
+            directorio = os.path.dirname(directorio)
+        
+        return None
+    
+    def _restaurar_objeto(self, ruta_objeto, destino_local, entrada):
+        """
+        Recupera un objeto del recurso NFS en su forma original
+        """
+        dir_destino = os.path.dirname(destino_local)
+        if dir_destino and not os.path.exists(dir_destino):
+            os.makedirs(dir_destino)
+        
+        if entrada["codec"] == compresion.CODEC_NINGUNO:
+            shutil.copy2(ruta_objeto, destino_local)
+            return
+        
+        ruta_temporal = destino_local + ".parcial"
+        compresion.descomprimir_archivo(ruta_objeto, ruta_temporal, entrada["codec"])
+        os.replace(ruta_temporal, destino_local)
+        os.utime(destino_local, (entrada["mtime"], entrada["mtime"]))
+    
+    def _recibir_arbol(self, ruta_origen, destino_local):
+        """
+        Copia un árbol remoto descomprimiendo los objetos listados en manifiestos
+        """
+        # objeto (ruta absoluta) -> (ruta relativa original, entrada)
+        objetos = {}
+        
+        for raiz, _dirs, archivos in os.walk(ruta_origen):
+            relativa_raiz = os.path.relpath(raiz, ruta_origen)
+            directorio_local = os.path.normpath(os.path.join(destino_local, relativa_raiz))
+            if not os.path.isdir(directorio_local):
+                os.makedirs(directorio_local)
+            
+            # os.walk recorre de arriba hacia abajo: el manifiesto se lee antes que sus objetos
+            for objeto, (relativa, entrada) in self._objetos_del_manifiesto(raiz).items():
+                objetos[os.path.join(raiz, objeto)] = (
+                    os.path.normpath(os.path.join(relativa_raiz, relativa)), entrada
+                )
+            
+            for archivo in archivos:
+                if archivo == compresion.NOMBRE_MANIFIESTO:
+                    continue
+                
+                ruta_archivo = os.path.join(raiz, archivo)
+                if ruta_archivo in objetos:
+                    relativa, entrada = objetos[ruta_archivo]
+                    self._restaurar_objeto(ruta_archivo, os.path.join(destino_local, relativa), entrada)
+                else:
+                    shutil.copy2(ruta_archivo, os.path.join(directorio_local, archivo))
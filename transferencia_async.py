@@ -0,0 +1,256 @@
+"""
+API asíncrona de transferencias (asyncio)
+Permite orquestar muchas transferencias y puntos de montaje desde un único bucle de eventos
+"""
+import asyncio
+import functools
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from transferencia import TransferenciaNFS
+from utils.logger import logger
+
+
+# Ejecutor compartido por todas las instancias: las copias en NFS bloquean en E/S,
+# por lo que un conjunto fijo de hilos limita la carga sobre los servidores
+MAX_HILOS_POR_DEFECTO = 32
+
+_ejecutor = None
+_bloqueo_ejecutor = threading.Lock()
+
+
+def obtener_ejecutor():
+    """
+    Retorna el ejecutor compartido, creándolo la primera vez
+    """
+    global _ejecutor
+    with _bloqueo_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=MAX_HILOS_POR_DEFECTO,
+                thread_name_prefix="transferencia-nfs"
+            )
+        return _ejecutor
+
+
+def configurar_ejecutor(max_hilos):
+    """
+    Reemplaza el ejecutor compartido por uno con max_hilos hilos
+    Las tareas en curso del ejecutor anterior terminan normalmente
+    """
+    global _ejecutor
+    with _bloqueo_ejecutor:
+        anterior = _ejecutor
+        _ejecutor = ThreadPoolExecutor(
+            max_workers=max_hilos,
+            thread_name_prefix="transferencia-nfs"
+        )
+    if anterior is not None:
+        anterior.shutdown(wait=False)
+    logger.info("Ejecutor de transferencias configurado con {0} hilos".format(max_hilos))
+
+
+class TransferenciaNFSAsync:
+    """
+    Envoltorio asíncrono de TransferenciaNFS
+    Cada operación bloqueante se ejecuta en el ejecutor compartido
+    """
+
+    def __init__(self, punto_montaje, comprimir=False, max_concurrentes=None, ejecutor=None):
+        self.transferencia = TransferenciaNFS(punto_montaje, comprimir=comprimir)
+        # Límite opcional de operaciones simultáneas sobre este punto de montaje
+        self.max_concurrentes = max_concurrentes
+        self._ejecutor = ejecutor
+        self._semaforo = None
+
+    @property
+    def punto_montaje(self):
+        return self.transferencia.punto_montaje
+
+    def _obtener_semaforo(self):
+        """
+        Crea el semáforo en el bucle activo (en Python < 3.10 queda ligado al bucle)
+        """
+        if self.max_concurrentes and self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concurrentes)
+        return self._semaforo
+
+    async def _ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta una función bloqueante en el ejecutor sin bloquear el bucle
+        """
+        loop = asyncio.get_running_loop()
+        llamada = functools.partial(funcion, *args, **kwargs)
+        ejecutor = self._ejecutor or obtener_ejecutor()
+
+        semaforo = self._obtener_semaforo()
+        if semaforo is None:
+            return await loop.run_in_executor(ejecutor, llamada)
+
+        async with semaforo:
+            return await loop.run_in_executor(ejecutor, llamada)
+
+    async def validar_montaje(self):
+        """Versión asíncrona de TransferenciaNFS.validar_montaje"""
+        return await self._ejecutar(self.transferencia.validar_montaje)
+
+    async def enviar_archivo(self, ruta_origen, nombre_destino=None):
+        """Versión asíncrona de TransferenciaNFS.enviar_archivo"""
+        return await self._ejecutar(self.transferencia.enviar_archivo, ruta_origen, nombre_destino)
+
+    async def enviar_directorio(self, ruta_origen, nombre_destino=None):
+        """Versión asíncrona de TransferenciaNFS.enviar_directorio"""
+        return await self._ejecutar(self.transferencia.enviar_directorio, ruta_origen, nombre_destino)
+
+    async def recibir_archivo(self, nombre_archivo, destino_local):
+        """Versión asíncrona de TransferenciaNFS.recibir_archivo"""
+        return await self._ejecutar(self.transferencia.recibir_archivo, nombre_archivo, destino_local)
+
+    async def recibir_directorio(self, nombre_directorio, destino_local):
+        """Versión asíncrona de TransferenciaNFS.recibir_directorio"""
+        return await self._ejecutar(self.transferencia.recibir_directorio, nombre_directorio, destino_local)
+
+    async def sincronizar(self, ruta_local, direccion="enviar"):
+        """Versión asíncrona de TransferenciaNFS.sincronizar"""
+        return await self._ejecutar(self.transferencia.sincronizar, ruta_local, direccion)
+
+    async def listar_remoto(self):
+        """Versión asíncrona de TransferenciaNFS.listar_remoto"""
+        return await self._ejecutar(self.transferencia.listar_remoto)
+
+    async def iterar_remoto(self, tamano_lote=256):
+        """
+        Iterador asíncrono sobre el contenido del recurso NFS
+        Lee en lotes para no ocupar un hilo por cada elemento
+        """
+        valido, mensaje = await self.validar_montaje()
+        if not valido:
+            raise OSError(mensaje)
+
+        generador = self.transferencia.iterar_remoto()
+        while True:
+            lote = await self._ejecutar(_siguiente_lote, generador, tamano_lote)
+            if not lote:
+                break
+            for item in lote:
+                yield item
+
+    async def _progreso(self, operaciones):
+        """
+        Lanza todas las operaciones a la vez y genera un evento por cada una que termina
+        operaciones: lista de (clave, corutina)
+        """
+        total = len(operaciones)
+
+        async def etiquetar(clave, corutina):
+            return (clave, await corutina)
+
+        tareas = [asyncio.ensure_future(etiquetar(clave, corutina)) for clave, corutina in operaciones]
+        completados = 0
+
+        for futuro in asyncio.as_completed(tareas):
+            clave, resultado = await futuro
+            completados += 1
+            yield {
+                "elemento": clave,
+                "resultado": resultado,
+                "completados": completados,
+                "total": total
+            }
+
+    def progreso_envio(self, rutas_origen):
+        """
+        Iterador asíncrono que envía varias rutas en paralelo
+        Genera un evento de progreso por cada elemento terminado
+        """
+        return self._progreso([(ruta, self._enviar_ruta(ruta)) for ruta in rutas_origen])
+
+    def progreso_recepcion(self, nombres_remotos, destino_local):
+        """
+        Iterador asíncrono que recibe varios elementos en paralelo
+        Genera un evento de progreso por cada elemento terminado
+        """
+        return self._progreso([
+            (nombre, self._recibir_nombre(nombre, destino_local)) for nombre in nombres_remotos
+        ])
+
+    async def _con_reintentos(self, operacion, *args):
+        """
+        Ejecuta una operación reintentando los errores transitorios
+        Igual que TransferenciaNFS, pero la espera no ocupa un hilo del ejecutor
+        """
+        transferencia = self.transferencia
+        resultado = await self._ejecutar(operacion, *args)
+        intentos = 1
+
+        while intentos <= transferencia.max_reintentos and \
+                await self._ejecutar(transferencia.es_fallo_reintentable, resultado):
+            espera = transferencia.calcular_espera(intentos)
+            logger.warning("Error transitorio: {0} - reintento {1}/{2} en {3:.1f}s".format(
+                resultado["message"], intentos, transferencia.max_reintentos, espera
+            ))
+            await asyncio.sleep(espera)
+            intentos += 1
+
+            valido, mensaje = await self.validar_montaje()
+            if not valido:
+                resultado = {"success": False, "message": "[ERROR] {0}".format(mensaje), "reintentable": True}
+                continue
+
+            resultado = await self._ejecutar(operacion, *args)
+
+        resultado["reintentable"] = await self._ejecutar(transferencia.es_fallo_reintentable, resultado)
+        resultado["intentos"] = intentos
+        return resultado
+
+    async def _enviar_ruta(self, ruta):
+        return await self._con_reintentos(self.transferencia._enviar_ruta, ruta)
+
+    async def _recibir_nombre(self, nombre, destino_local):
+        return await self._con_reintentos(self.transferencia._recibir_nombre, nombre, destino_local)
+
+    async def enviar_multiples(self, rutas_origen):
+        """
+        Envía múltiples archivos y/o directorios en paralelo
+        Retorna el mismo resumen que TransferenciaNFS.enviar_multiples
+        """
+        resumen = await _resumir(self.progreso_envio(rutas_origen), "ruta")
+        mensaje_final = "[RESUMEN] Enviados: {0} | Fallidos: {1} | Reintentables: {2}".format(
+            resumen["exitos"], resumen["fallos"], len(resumen["reintentables"])
+        )
+        logger.info(mensaje_final)
+        return {"success": resumen["exitos"] > 0, "message": mensaje_final, "resultados": resumen}
+
+    async def recibir_multiples(self, nombres_remotos, destino_local):
+        """
+        Recibe múltiples archivos y/o directorios en paralelo
+        Retorna el mismo resumen que TransferenciaNFS.recibir_multiples
+        """
+        resumen = await _resumir(self.progreso_recepcion(nombres_remotos, destino_local), "nombre")
+        mensaje_final = "[RESUMEN] Recibidos: {0} | Fallidos: {1} | Reintentables: {2}".format(
+            resumen["exitos"], resumen["fallos"], len(resumen["reintentables"])
+        )
+        logger.info(mensaje_final)
+        return {"success": resumen["exitos"] > 0, "message": mensaje_final, "resultados": resumen}
+
+
+def _siguiente_lote(generador, tamano_lote):
+    """Extrae hasta tamano_lote elementos de un generador"""
+    return list(itertools.islice(generador, tamano_lote))
+
+
+async def _resumir(progreso, clave):
+    """Consume un iterador de progreso y arma el resumen de exitos/fallos"""
+    resultados = {"exitos": 0, "fallos": 0, "reintentos": 0, "reintentables": [], "detalles": []}
+    async for evento in progreso:
+        resultado = evento["resultado"]
+        if resultado["success"]:
+            resultados["exitos"] += 1
+        else:
+            resultados["fallos"] += 1
+            if resultado.get("reintentable"):
+                resultados["reintentables"].append(evento["elemento"])
+        resultados["reintentos"] += resultado.get("intentos", 1) - 1
+        resultados["detalles"].append({clave: evento["elemento"], "resultado": evento["resultado"]})
+    return resultados
@@ -10,6 +10,7 @@ from .temas import (
     TemaColores, crear_boton, crear_text_widget,
     crear_frame_card, crear_label_estado, Iconos
 )
+from utils.ejecucion import ejecutar
 from utils.logger import logger
 
 
@@ -373,21 +374,17 @@ class TabCliente:
             messagebox.showwarning("Advertencia", "Ingrese una IP para verificar")
             return
         
-        import subprocess
-        
         self._actualizar_texto_cliente("Verificando conexión con {0}...\n".format(ip))
         
         try:
             # Ping
-            resultado = subprocess.run(
-                ["ping", "-c", "3", ip],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                timeout=10
-            )
+            resultado = ejecutar(["ping", "-c", "3", ip], timeout=10)
             
-            if resultado.returncode == 0:
+            if resultado.tiempo_agotado:
+                self._actualizar_texto_cliente(
+                    "[ERROR] Timeout al intentar conectar con {0}\n".format(ip)
+                )
+            elif resultado.exito:
                 mensaje = "[OK] El servidor {0} está accesible\n\n".format(ip)
                 mensaje += "Respuesta de ping:\n"
                 mensaje += resultado.stdout
@@ -400,10 +397,6 @@ class TabCliente:
                 mensaje += "• No hay firewall bloqueando\n"
                 mensaje += "• Están en la misma red\n"
                 self._actualizar_texto_cliente(mensaje)
-        except subprocess.TimeoutExpired:
-            self._actualizar_texto_cliente(
-                "[ERROR] Timeout al intentar conectar con {0}\n".format(ip)
-            )
         except Exception as e:
             self._actualizar_texto_cliente(
                 "[ERROR] Error verificando conexión: {0}\n".format(str(e))
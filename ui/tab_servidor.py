@@ -5,14 +5,28 @@ Módulo independiente para configuración del servidor
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
+import time
+import threading
 
 from .temas import (
     TemaColores, crear_boton, crear_listbox_personalizado,
     crear_frame_card, Iconos
 )
+from modelo_exports import describir_clientes
+from estadisticas_nfsd import RUTA_NFSD
+from capacidad_exports import formatear_bytes
+from estado_kernel import ESTADOS
+from auditoria_exports import ACCIONES
 from utils.logger import logger
 
 
+# Segundos entre refrescos del panel de capacidad
+INTERVALO_REFRESCO_CAPACIDAD = 10
+
+# Segundos entre relecturas del estado del kernel (etab, rmtab, /proc)
+INTERVALO_REFRESCO_KERNEL = 3
+
+
 class TabServidor:
     """
     Pestaña para configuración del servidor NFS
@@ -26,6 +40,13 @@ class TabServidor:
         # Variables de opciones NFS
         self.opciones_vars = {}
         
+        # Filtro activo de la lista y correspondencia fila -> índice en /etc/exports
+        self.filtro_actual = None
+        self.indices_mostrados = []
+        
+        # Refresco periódico del panel de estadísticas (id de after o None)
+        self.refresco_estadisticas = None
+        
         # Crear interfaz
         self._crear_interfaz()
         
@@ -43,6 +64,9 @@ class TabServidor:
         
         # Sección 2: Exportaciones actuales
         self._crear_seccion_lista()
+        
+        # Sección 3: Estadísticas en vivo de nfsd
+        self._crear_seccion_estadisticas()
     
     def _crear_seccion_agregar(self):
         """
@@ -201,12 +225,58 @@ class TabServidor:
                 fila += 1
                 columna = 0
         
+        # Perfil de rendimiento (se combina con las opciones marcadas al agregar)
+        if columna:
+            fila += 1
+        frame_perfil = tk.Frame(frame_opciones, bg=TemaColores.COLOR_FONDO_CARD)
+        frame_perfil.grid(row=fila, column=0, columnspan=max_columnas, sticky='w', padx=10, pady=(8, 3))
+        
+        ttk.Label(frame_perfil, text="Perfil de rendimiento:").pack(side='left')
+        self.combo_perfil = self._crear_combo_perfiles(frame_perfil, "(Ninguno)")
+        self.combo_perfil.pack(side='left', padx=5)
+        self.combo_perfil.bind('<<ComboboxSelected>>', self._seleccionar_perfil)
+        
         # Valores por defecto recomendados
         self.opciones_vars['rw'].set(True)
         self.opciones_vars['sync'].set(True)
         self.opciones_vars['no_subtree_check'].set(True)
         self.opciones_vars['root_squash'].set(True)
     
+    def _crear_combo_perfiles(self, parent, primera):
+        """
+        Crea un combobox con los perfiles de rendimiento; la primera entrada no es un perfil
+        """
+        self.perfiles = self.gestor_nfs.obtener_perfiles()
+        combo = ttk.Combobox(
+            parent,
+            values=[primera] + [perfil['nombre'] for perfil in self.perfiles.values()],
+            state='readonly',
+            width=32
+        )
+        combo.current(0)
+        return combo
+    
+    def _perfil_seleccionado(self, combo):
+        """Retorna la clave del perfil elegido en combo o None"""
+        posicion = combo.current()
+        if posicion <= 0:
+            return None
+        return list(self.perfiles)[posicion - 1]
+    
+    def _seleccionar_perfil(self, event=None):
+        """
+        Marca en las casillas las opciones del perfil elegido
+        """
+        perfil = self._perfil_seleccionado(self.combo_perfil)
+        if perfil is None:
+            return
+        
+        marcadas = [opt for opt, var in self.opciones_vars.items() if var.get()]
+        opciones = self.gestor_nfs.expandir_perfil(perfil, marcadas)
+        for opt, var in self.opciones_vars.items():
+            var.set(opt in opciones)
+        self.actualizar_barra_estado(self.perfiles[perfil]['descripcion'], 'info')
+    
     def _crear_seccion_lista(self):
         """
         Crea la sección de lista de exportaciones
@@ -217,13 +287,54 @@ class TabServidor:
         )
         frame_lista.pack(fill='both', expand=True, pady=(0, 10))
         
+        # Búsqueda por ruta, host u opción
+        frame_busqueda = tk.Frame(frame_lista, bg=TemaColores.COLOR_FONDO_CARD)
+        frame_busqueda.pack(fill='x', pady=(0, 5))
+        
+        ttk.Label(frame_busqueda, text="Buscar por:").pack(side='left', padx=(0, 5))
+        
+        self.combo_campo_busqueda = ttk.Combobox(
+            frame_busqueda,
+            values=["Ruta", "Bajo ruta", "Host", "Opción"],
+            state='readonly',
+            width=10
+        )
+        self.combo_campo_busqueda.current(0)
+        self.combo_campo_busqueda.pack(side='left', padx=3)
+        
+        self.entrada_busqueda = ttk.Entry(frame_busqueda, width=30)
+        self.entrada_busqueda.pack(side='left', fill='x', expand=True, padx=3)
+        self.entrada_busqueda.bind('<Return>', lambda e: self._buscar_exportaciones())
+        
+        crear_boton(
+            frame_busqueda,
+            "Buscar",
+            self._buscar_exportaciones,
+            tipo='info'
+        ).pack(side='left', padx=3)
+        
+        crear_boton(
+            frame_busqueda,
+            "Mostrar Todo",
+            self._mostrar_todas_exportaciones,
+            tipo='secondary'
+        ).pack(side='left', padx=3)
+        
+        crear_boton(
+            frame_busqueda,
+            "Acceso de Cliente",
+            self._ver_acceso_cliente,
+            tipo='info'
+        ).pack(side='left', padx=3)
+        
         # Frame para listbox
         frame_listbox = tk.Frame(frame_lista, bg=TemaColores.COLOR_FONDO_CARD)
         frame_listbox.pack(fill='both', expand=True, pady=5)
         
         self.lista_exportaciones, scrollbar = crear_listbox_personalizado(
             frame_listbox, 
-            height=10
+            height=10,
+            selectmode=tk.EXTENDED
         )
         self.lista_exportaciones.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -255,10 +366,236 @@ class TabServidor:
         
         crear_boton(
             frame_botones,
-            "{0} Ver Espacio en Disco".format(Iconos.INFO),
+            "{0} Capacidad de Exportaciones".format(Iconos.INFO),
             self._ver_espacio_disco,
             tipo='info'
         ).pack(side='left', padx=3)
+        
+        crear_boton(
+            frame_botones,
+            "{0} Estado en Kernel".format(Iconos.INFO),
+            self._ver_estado_kernel,
+            tipo='info'
+        ).pack(side='left', padx=3)
+        
+        crear_boton(
+            frame_botones,
+            "Historial de Cambios",
+            self._ver_historial_cambios,
+            tipo='secondary'
+        ).pack(side='left', padx=3)
+        
+        crear_boton(
+            frame_botones,
+            "Importar...",
+            self._importar_exportaciones,
+            tipo='secondary'
+        ).pack(side='left', padx=3)
+        
+        crear_boton(
+            frame_botones,
+            "Exportar...",
+            self._exportar_exportaciones,
+            tipo='secondary'
+        ).pack(side='left', padx=3)
+        
+        # Perfil de rendimiento para las exportaciones seleccionadas (o las mostradas)
+        frame_perfiles = tk.Frame(frame_lista, bg=TemaColores.COLOR_FONDO_CARD)
+        frame_perfiles.pack(fill='x', pady=(0, 5))
+        
+        ttk.Label(frame_perfiles, text="Perfil de rendimiento:").pack(side='left', padx=(0, 5))
+        self.combo_perfil_lote = self._crear_combo_perfiles(frame_perfiles, "(Elegir perfil)")
+        self.combo_perfil_lote.pack(side='left', padx=3)
+        
+        crear_boton(
+            frame_perfiles,
+            "Aplicar Perfil",
+            self._aplicar_perfil_lote,
+            tipo='warning'
+        ).pack(side='left', padx=3)
+    
+    def _crear_seccion_estadisticas(self):
+        """
+        Crea el panel de estadísticas en vivo del servidor (leídas de /proc, sin nfsstat)
+        """
+        frame_estadisticas = crear_frame_card(
+            self.parent,
+            title="3. {0} Estadísticas del Servidor".format(Iconos.INFO)
+        )
+        frame_estadisticas.pack(fill='x', pady=(0, 10))
+        
+        self.etiquetas_estadisticas = {}
+        campos = [
+            ('READ', "READ/s:"),
+            ('WRITE', "WRITE/s:"),
+            ('GETATTR', "GETATTR/s:"),
+            ('COMMIT', "COMMIT/s:"),
+            ('rpc', "RPC/s:"),
+            ('transferencia', "Lectura/Escritura:"),
+            ('hilos', "Hilos nfsd:"),
+            ('uso_hilos', "Peticiones en espera:"),
+            ('retransmisiones', "Retransmisiones/s:"),
+        ]
+        for posicion, (clave, texto) in enumerate(campos):
+            fila, columna = divmod(posicion, 3)
+            ttk.Label(frame_estadisticas, text=texto).grid(
+                row=fila, column=columna * 2, sticky='w', padx=5, pady=2
+            )
+            etiqueta = ttk.Label(frame_estadisticas, text="-", foreground=TemaColores.COLOR_INFO)
+            etiqueta.grid(row=fila, column=columna * 2 + 1, sticky='w', padx=(0, 15), pady=2)
+            self.etiquetas_estadisticas[clave] = etiqueta
+        
+        self.boton_estadisticas = crear_boton(
+            frame_estadisticas,
+            "Iniciar Monitoreo",
+            self._alternar_estadisticas,
+            tipo='info'
+        )
+        self.boton_estadisticas.grid(row=3, column=0, columnspan=2, sticky='w', padx=5, pady=(8, 0))
+        
+        crear_boton(
+            frame_estadisticas,
+            "Ajustar Hilos nfsd",
+            self._ajustar_hilos,
+            tipo='warning'
+        ).grid(row=3, column=2, columnspan=2, sticky='w', padx=5, pady=(8, 0))
+    
+    def _alternar_estadisticas(self):
+        """
+        Inicia o detiene el muestreo de estadísticas y el refresco del panel
+        """
+        colector = self.gestor_nfs.obtener_colector_estadisticas()
+        if colector.activo():
+            colector.detener()
+            if self.refresco_estadisticas is not None:
+                self.parent.after_cancel(self.refresco_estadisticas)
+                self.refresco_estadisticas = None
+            self.boton_estadisticas.config(text="Iniciar Monitoreo")
+            self.actualizar_barra_estado("Monitoreo de nfsd detenido", 'info')
+            return
+        
+        colector.iniciar()
+        self.boton_estadisticas.config(text="Detener Monitoreo")
+        self.actualizar_barra_estado("Monitoreo de nfsd iniciado", 'info')
+        self._refrescar_estadisticas()
+    
+    def _refrescar_estadisticas(self):
+        """
+        Muestra la última muestra del colector y programa el siguiente refresco
+        """
+        colector = self.gestor_nfs.obtener_colector_estadisticas()
+        tasas = colector.ultima_muestra()
+        
+        if tasas is not None:
+            operaciones = tasas['operaciones']
+            for nombre in ('READ', 'WRITE', 'GETATTR', 'COMMIT'):
+                self.etiquetas_estadisticas[nombre].config(text="{0:.1f}".format(operaciones.get(nombre, 0.0)))
+            self.etiquetas_estadisticas['rpc'].config(text="{0:.1f}".format(tasas['rpc']))
+            self.etiquetas_estadisticas['transferencia'].config(text="{0:.2f} / {1:.2f} MB/s".format(
+                tasas['bytes_leidos'] / (1024 * 1024), tasas['bytes_escritos'] / (1024 * 1024)
+            ))
+            self.etiquetas_estadisticas['hilos'].config(text=str(tasas['hilos']))
+            if tasas['uso_hilos'] is None:
+                self.etiquetas_estadisticas['uso_hilos'].config(text="n/d")
+            else:
+                self.etiquetas_estadisticas['uso_hilos'].config(text="{0:.1f}% ({1:.1f}/s)".format(
+                    tasas['uso_hilos'] * 100, tasas['encoladas']
+                ))
+            self.etiquetas_estadisticas['retransmisiones'].config(
+                text="{0:.1f}".format(tasas['retransmisiones'])
+            )
+        elif colector.activo() and not os.path.exists(RUTA_NFSD):
+            for etiqueta in self.etiquetas_estadisticas.values():
+                etiqueta.config(text="n/d")
+        
+        if colector.activo():
+            self.refresco_estadisticas = self.parent.after(
+                int(colector.intervalo * 1000), self._refrescar_estadisticas
+            )
+    
+    def _ajustar_hilos(self):
+        """
+        Recomienda un número de hilos de nfsd con las muestras del monitoreo
+        y, con confirmación, lo aplica mostrando las tasas antes y después
+        """
+        resultado = self.gestor_nfs.recomendar_hilos_nfsd()
+        recomendacion = resultado["recomendacion"]
+        if not resultado["success"]:
+            messagebox.showwarning(
+                "Hilos nfsd",
+                "{0}\n\nInicie el monitoreo y espere unos segundos con el servidor en uso.".format(
+                    recomendacion['motivo']
+                )
+            )
+            return
+        
+        actual = recomendacion['actual']
+        recomendado = recomendacion['recomendado']
+        detalle = "Hilos actuales: {0}\nEn espera (media / p95): {1:.1f}% / {2:.1f}%\nMuestras: {3}\n\n{4}".format(
+            actual, recomendacion['saturacion_media'] * 100, recomendacion['saturacion_p95'] * 100,
+            recomendacion['muestras'], recomendacion['motivo']
+        )
+        if recomendado == actual:
+            messagebox.showinfo("Hilos nfsd", detalle + "\n\nNo se recomienda cambiar el número de hilos.")
+            return
+        
+        if not messagebox.askyesno(
+            "Ajustar Hilos nfsd",
+            "{0}\n\n¿Cambiar de {1} a {2} hilos y guardarlo en la configuración de NFS?".format(
+                detalle, actual, recomendado
+            )
+        ):
+            return
+        
+        self.actualizar_barra_estado("Ajustando hilos de nfsd (midiendo antes y después)...", 'info')
+        
+        # Medir las tasas tarda varios segundos: se hace fuera del hilo de Tk y el
+        # resultado se recoge con after(), ya que Tk solo puede usarse desde su hilo
+        respuesta = {}
+        
+        def trabajar():
+            try:
+                respuesta['resultado'] = self.gestor_nfs.aplicar_hilos_nfsd(recomendado)
+            except Exception as e:
+                logger.error("Error ajustando hilos de nfsd: {0}".format(e))
+        
+        trabajador = threading.Thread(target=trabajar)
+        trabajador.daemon = True
+        trabajador.start()
+        
+        def esperar():
+            if trabajador.is_alive():
+                self.parent.after(200, esperar)
+            else:
+                self._mostrar_ajuste_hilos(recomendado, respuesta.get('resultado'))
+        
+        self.parent.after(200, esperar)
+    
+    def _mostrar_ajuste_hilos(self, recomendado, resultado):
+        """
+        Muestra el resultado de aplicar_hilos_nfsd (None si falló con una excepción)
+        """
+        if resultado is None:
+            self.actualizar_barra_estado("Error ajustando hilos de nfsd", 'error')
+            messagebox.showerror("Error", "No se pudo ajustar los hilos de nfsd (ver el registro)")
+            return
+        if not resultado["success"]:
+            self.actualizar_barra_estado("Error ajustando hilos de nfsd", 'error')
+            messagebox.showerror("Error", resultado["message"])
+            return
+        
+        lineas = [resultado["message"], ""]
+        for titulo, tasas in (("Antes", resultado["antes"]), ("Después", resultado["despues"])):
+            if tasas is None:
+                lineas.append("{0}: sin datos".format(titulo))
+            elif tasas['uso_hilos'] is None:
+                lineas.append("{0}: {1} hilos, {2:.1f} RPC/s".format(titulo, tasas['hilos'], tasas['rpc']))
+            else:
+                lineas.append("{0}: {1} hilos, {2:.1f} RPC/s, {3:.1f}% en espera".format(
+                    titulo, tasas['hilos'], tasas['rpc'], tasas['uso_hilos'] * 100
+                ))
+        self.actualizar_barra_estado("Hilos de nfsd: {0}".format(recomendado), 'exito')
+        messagebox.showinfo("Hilos nfsd", "\n".join(lineas))
     
     def _validar_ruta_tiempo_real(self, event=None):
         """
@@ -356,6 +693,18 @@ class TabServidor:
         
         # Recopilar opciones seleccionadas
         opciones = [opt for opt, var in self.opciones_vars.items() if var.get()]
+        perfil = self._perfil_seleccionado(self.combo_perfil)
+        if perfil is not None:
+            opciones = self.gestor_nfs.expandir_perfil(perfil, opciones)
+        
+        avisos = [a for a in self.gestor_nfs.evaluar_rendimiento(ruta, opciones) if a['severidad'] == 'aviso']
+        if avisos and not messagebox.askyesno(
+            "Rendimiento",
+            "{0}\n\n¿Agregar la exportación de todos modos?".format(
+                "\n".join("- {0}".format(a['mensaje']) for a in avisos)
+            )
+        ):
+            return
         
         # Agregar configuración directamente sin validaciones restrictivas
         if self.gestor_nfs.agregar_configuracion(ruta, hosts, opciones, ajustar_permisos=False):
@@ -376,32 +725,167 @@ class TabServidor:
     
     def _actualizar_exportaciones(self):
         """
-        Actualiza la lista de exportaciones
+        Actualiza la lista de exportaciones (aplicando el filtro activo)
         """
         self.lista_exportaciones.delete(0, tk.END)
-        configs = self.gestor_nfs.leer_configuracion_actual()
         
-        if not configs:
+        if self.filtro_actual:
+            resultados = self.gestor_nfs.buscar_exportaciones(**self.filtro_actual)
+        else:
+            resultados = list(enumerate(self.gestor_nfs.leer_configuracion_actual()))
+        
+        self.indices_mostrados = [indice for indice, _ in resultados]
+        
+        if not resultados:
             self.lista_exportaciones.insert(
                 tk.END,
-                "No hay exportaciones configuradas"
+                "No hay exportaciones que coincidan" if self.filtro_actual
+                else "No hay exportaciones configuradas"
             )
         else:
-            for i, config in enumerate(configs):
-                texto = "{0}. {1} -> {2} ({3})".format(
-                    i+1,
+            for indice, config in resultados:
+                texto = "{0}. {1} -> {2}".format(
+                    indice+1,
                     config['carpeta'],
-                    config['hosts'],
-                    ', '.join(config['opciones'])
+                    describir_clientes(config)
                 )
                 self.lista_exportaciones.insert(tk.END, texto)
         
-        self.actualizar_barra_estado(
-            "{0} exportaciones configuradas".format(len(configs)),
-            'info'
+        if self.filtro_actual:
+            texto_estado = "{0} exportaciones coinciden con la búsqueda".format(len(resultados))
+        else:
+            texto_estado = "{0} exportaciones configuradas".format(len(resultados))
+        self.actualizar_barra_estado(texto_estado, 'info')
+        
+        logger.info("Lista de exportaciones actualizada: {0} items".format(len(resultados)))
+    
+    def _buscar_exportaciones(self):
+        """
+        Filtra la lista usando los índices del modelo de exports
+        """
+        valor = self.entrada_busqueda.get().strip()
+        if not valor:
+            self._mostrar_todas_exportaciones()
+            return
+        
+        campos = {
+            "Ruta": 'ruta',
+            "Bajo ruta": 'bajo_ruta',
+            "Host": 'host',
+            "Opción": 'opcion'
+        }
+        self.filtro_actual = {campos[self.combo_campo_busqueda.get()]: valor}
+        self._actualizar_exportaciones()
+    
+    def _mostrar_todas_exportaciones(self):
+        """
+        Quita el filtro de búsqueda
+        """
+        self.filtro_actual = None
+        self.entrada_busqueda.delete(0, tk.END)
+        self._actualizar_exportaciones()
+    
+    def _aplicar_perfil_lote(self):
+        """
+        Aplica el perfil elegido a las exportaciones seleccionadas
+        (o a todas las mostradas si no hay selección) en una sola transacción
+        """
+        perfil = self._perfil_seleccionado(self.combo_perfil_lote)
+        if perfil is None:
+            messagebox.showwarning("Advertencia", "Elija un perfil de rendimiento")
+            return
+        
+        seleccion = [p for p in self.lista_exportaciones.curselection() if p < len(self.indices_mostrados)]
+        indices = [self.indices_mostrados[p] for p in seleccion] or list(self.indices_mostrados)
+        if not indices:
+            messagebox.showwarning("Advertencia", "No hay exportaciones a las que aplicar el perfil")
+            return
+        
+        datos = self.perfiles[perfil]
+        if not messagebox.askyesno(
+            "Aplicar Perfil",
+            "Perfil: {0}\nOpciones: {1}\n{2}\n\n¿Aplicarlo a {3} exportaciones{4}?".format(
+                datos['nombre'], ", ".join(datos['opciones']), datos['descripcion'], len(indices),
+                "" if seleccion else " (todas las mostradas)"
+            )
+        ):
+            return
+        
+        resultado = self.gestor_nfs.aplicar_perfil(perfil, indices)
+        if not resultado["success"]:
+            self.actualizar_barra_estado("Error aplicando el perfil", 'error')
+            messagebox.showerror("Error", resultado["message"])
+            return
+        
+        configs = self.gestor_nfs.leer_configuracion_actual()
+        lineas = [resultado["message"]]
+        for indice, avisos in sorted(resultado["avisos"].items()):
+            ruta = configs[indice]['carpeta'] if indice < len(configs) else indice
+            for aviso in avisos:
+                if aviso['severidad'] == 'aviso':
+                    lineas.append("- {0}: {1}".format(ruta, aviso['mensaje']))
+        lineas.append("\nIMPORTANTE: Debe aplicar los cambios para que tengan efecto")
+        
+        self._actualizar_exportaciones()
+        self.actualizar_barra_estado(resultado["message"], 'exito')
+        messagebox.showinfo("Perfil aplicado", "\n".join(lineas))
+    
+    def _importar_exportaciones(self):
+        """
+        Importa exportaciones en lote desde CSV o JSON y muestra todos los errores
+        """
+        ruta = filedialog.askopenfilename(
+            title="Importar exportaciones",
+            filetypes=[("CSV o JSON", "*.csv *.json *.jsonl"), ("Todos", "*")]
+        )
+        if not ruta:
+            return
+        
+        todo_o_nada = messagebox.askyesno(
+            "Importar exportaciones",
+            "Si alguna fila tiene errores, ¿cancelar toda la importación?\n\n"
+            "Sí: no se importa nada si hay errores\nNo: se importan las filas válidas"
+        )
+        self.actualizar_barra_estado("Importando exportaciones...", 'info')
+        self.parent.update_idletasks()
+        resultado = self.gestor_nfs.importar_exportaciones(ruta, todo_o_nada=todo_o_nada)
+        self._actualizar_exportaciones()
+        
+        if not resultado["errores"]:
+            messagebox.showinfo("Importación", resultado["message"] +
+                                "\n\nIMPORTANTE: Debe aplicar los cambios para que tengan efecto")
+            return
+        
+        ventana = tk.Toplevel(self.parent)
+        ventana.title("Errores de importación")
+        ventana.geometry("800x450")
+        ventana.configure(bg=TemaColores.COLOR_FONDO_PRINCIPAL)
+        
+        from .temas import crear_text_widget
+        texto = crear_text_widget(ventana, height=20)
+        texto.pack(fill='both', expand=True, padx=10, pady=10)
+        texto.insert('1.0', resultado["message"] + "\n\n" + "\n".join(resultado["errores"]))
+        texto.config(state='disabled')
+        
+        crear_boton(ventana, "Cerrar", ventana.destroy, tipo='secondary').pack(pady=10)
+    
+    def _exportar_exportaciones(self):
+        """
+        Guarda las exportaciones actuales en CSV o JSON (formato reimportable)
+        """
+        ruta = filedialog.asksaveasfilename(
+            title="Exportar exportaciones",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json"), ("JSON Lines", "*.jsonl")]
         )
+        if not ruta:
+            return
         
-        logger.info("Lista de exportaciones actualizada: {0} items".format(len(configs)))
+        resultado = self.gestor_nfs.exportar_exportaciones(ruta)
+        if resultado["success"]:
+            self.actualizar_barra_estado(resultado["message"], 'exito')
+        else:
+            messagebox.showerror("Error", resultado["message"])
     
     def _eliminar_exportacion(self):
         """
@@ -412,11 +896,15 @@ class TabServidor:
             messagebox.showwarning("Advertencia", "Seleccione una exportación")
             return
         
+        if sel[0] >= len(self.indices_mostrados):
+            return
+        
+        indice = self.indices_mostrados[sel[0]]
         configs = self.gestor_nfs.leer_configuracion_actual()
-        if sel[0] >= len(configs):
+        if indice >= len(configs):
             return
         
-        config = configs[sel[0]]
+        config = configs[indice]
         
         if not messagebox.askyesno(
             "Confirmar Eliminación",
@@ -426,7 +914,7 @@ class TabServidor:
         ):
             return
         
-        if self.gestor_nfs.eliminar_configuracion(sel[0]):
+        if self.gestor_nfs.eliminar_configuracion(indice):
             messagebox.showinfo("Éxito", "Exportación eliminada correctamente")
             self._actualizar_exportaciones()
             self.actualizar_barra_estado("Exportación eliminada", 'exito')
@@ -436,7 +924,7 @@ class TabServidor:
     
     def _aplicar_cambios_nfs(self):
         """
-        Aplica los cambios con exportfs -ra
+        Aplica los cambios con exportfs (solo las exportaciones modificadas)
         """
         # Verificar servicio NFS
         activo, mensaje = self.gestor_nfs.verificar_servicio_nfs()
@@ -449,16 +937,10 @@ class TabServidor:
             )
             
             if respuesta:
-                import subprocess
-                try:
-                    subprocess.run(
-                        ["sudo", "systemctl", "start", "nfs-server"],
-                        check=True,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE
-                    )
+                iniciado, _ = self.gestor_nfs.iniciar_servicio_nfs()
+                if iniciado:
                     messagebox.showinfo("Éxito", "Servicio NFS iniciado")
-                except Exception:
+                else:
                     messagebox.showerror(
                         "Error",
                         "No se pudo iniciar el servicio.\n" +
@@ -467,10 +949,26 @@ class TabServidor:
                     return
             else:
                 return
-        
+
+        # Reglas contradictorias antes de exportar
+        analisis = self.gestor_nfs.analizar_exportaciones()
+        if not analisis["success"]:
+            errores = [h['mensaje'] for h in analisis["hallazgos"] if h['severidad'] == 'error']
+            detalle = "\n".join("• " + mensaje for mensaje in errores[:10])
+            if len(errores) > 10:
+                detalle += "\n... y {0} más".format(len(errores) - 10)
+            if not messagebox.askyesno(
+                "Reglas Contradictorias",
+                "Hay hosts que reciben opciones distintas según la regla que aplique:\n\n" +
+                detalle + "\n\n" +
+                "¿Desea aplicar los cambios de todos modos?"
+            ):
+                return
+
         if not messagebox.askyesno(
             "Aplicar Cambios",
-            "Esto ejecutará 'exportfs -ra' para aplicar los cambios.\n\n" +
+            "Se exportarán o retirarán solo las exportaciones que cambiaron\n" +
+            "(o se ejecutará 'exportfs -ra' si es necesario).\n\n" +
             "¿Desea continuar?"
         ):
             return
@@ -494,35 +992,333 @@ class TabServidor:
             )
             self.actualizar_barra_estado("Error al aplicar cambios", 'error')
     
+    def _ver_acceso_cliente(self):
+        """
+        Muestra qué puede montar el cliente escrito en la búsqueda (IP o nombre),
+        o el acceso de cada rango si se escribe una red (ej. 10.1.0.0/16)
+        """
+        cliente = self.entrada_busqueda.get().strip()
+        if not cliente:
+            messagebox.showwarning("Advertencia", "Escriba una IP, un nombre de host o una red")
+            return
+        
+        def formatear_accesos(accesos, sangria=""):
+            if not accesos:
+                return [sangria + "(sin acceso)"]
+            return [
+                "{0}{1}  {2}  [{3}: {4}]".format(
+                    sangria, a['ruta'], ",".join(a['opciones']) or "(por defecto)", a['tipo'], a['host'] or '*'
+                )
+                for a in accesos
+            ]
+        
+        if '/' in cliente:
+            resultado = self.gestor_nfs.auditar_accesos_red(cliente)
+            if not resultado['success']:
+                messagebox.showerror("Error", resultado['message'])
+                return
+            lineas = [resultado['message'], ""]
+            for rango in resultado['rangos']:
+                lineas.append("{0} - {1} ({2} direcciones)".format(
+                    rango['desde'], rango['hasta'], rango['direcciones']
+                ))
+                lineas.extend(formatear_accesos(rango['accesos'], "    "))
+                lineas.append("")
+        else:
+            accesos = self.gestor_nfs.resolver_acceso_cliente(cliente, resolver_dns=True)
+            lineas = ["Exportaciones que puede montar {0}:".format(cliente), ""]
+            lineas.extend(formatear_accesos(accesos))
+        
+        ventana = tk.Toplevel(self.parent)
+        ventana.title("Acceso de Cliente")
+        ventana.geometry("800x500")
+        ventana.configure(bg=TemaColores.COLOR_FONDO_PRINCIPAL)
+        
+        from .temas import crear_text_widget
+        texto = crear_text_widget(ventana, height=20)
+        texto.pack(fill='both', expand=True, padx=10, pady=10)
+        texto.insert('1.0', "\n".join(lineas))
+        texto.config(state='disabled')
+        
+        crear_boton(
+            ventana,
+            "Cerrar",
+            ventana.destroy,
+            tipo='secondary'
+        ).pack(pady=10)
+    
     def _ver_espacio_disco(self):
         """
-        Muestra información de espacio en disco
+        Muestra el panel de capacidad por exportación (espacio, inodos y crecimiento)
+        El panel se refresca solo mientras está abierto
         """
-        resultado = self.gestor_nfs.verificar_montajes_y_disco()
+        ventana = tk.Toplevel(self.parent)
+        ventana.title("Capacidad de las Exportaciones")
+        ventana.geometry("1000x450")
+        ventana.configure(bg=TemaColores.COLOR_FONDO_PRINCIPAL)
+        
+        columnas = [
+            ('ruta', "Exportación", 220),
+            ('montaje', "Filesystem", 130),
+            ('total', "Tamaño", 80),
+            ('usados', "Usado", 80),
+            ('libres', "Libre", 80),
+            ('porcentaje', "Uso", 60),
+            ('inodos', "Inodos", 60),
+            ('crecimiento', "Crecimiento", 100),
+            ('lleno', "Lleno en", 90),
+        ]
+        tabla = ttk.Treeview(ventana, columns=[c for c, _, _ in columnas], show='headings')
+        for clave, titulo, ancho in columnas:
+            tabla.heading(clave, text=titulo)
+            tabla.column(clave, width=ancho, anchor='w' if clave in ('ruta', 'montaje') else 'e')
+        tabla.tag_configure('critico', foreground=TemaColores.COLOR_DANGER)
+        tabla.tag_configure('alto', foreground=TemaColores.COLOR_WARNING)
+        tabla.tag_configure('error', foreground=TemaColores.COLOR_TEXTO_MUTED)
+        tabla.pack(fill='both', expand=True, padx=10, pady=(10, 5))
         
-        if resultado['success']:
-            # Crear ventana para mostrar resultados
-            ventana = tk.Toplevel(self.parent)
-            ventana.title("Espacio en Disco y Montajes")
-            ventana.geometry("800x500")
-            ventana.configure(bg=TemaColores.COLOR_FONDO_PRINCIPAL)
+        etiqueta_resumen = ttk.Label(ventana, text="", foreground=TemaColores.COLOR_TEXTO_MUTED)
+        etiqueta_resumen.pack(anchor='w', padx=10)
+        
+        def describir_llenado(filesystem):
+            if filesystem['crecimiento'] is None:
+                return ("midiendo...", "-")
+            crecimiento = "{0}/h".format(formatear_bytes(filesystem['crecimiento'] * 3600))
+            horas = filesystem['horas_hasta_lleno']
+            if horas is None:
+                return (crecimiento, "-")
+            if horas < 48:
+                return (crecimiento, "{0:.1f} h".format(horas))
+            return (crecimiento, "{0:.0f} días".format(horas / 24))
+        
+        def mostrar(resultado):
+            tabla.delete(*tabla.get_children())
+            for exportacion in resultado["exportaciones"]:
+                filesystem = exportacion['filesystem']
+                if filesystem is None:
+                    tabla.insert('', 'end', values=(
+                        exportacion['ruta'], exportacion['error'], "", "", "", "", "", "", ""
+                    ), tags=('error',))
+                    continue
+                
+                crecimiento, lleno = describir_llenado(filesystem)
+                uso = max(filesystem['porcentaje'], filesystem['porcentaje_inodos'])
+                etiqueta = 'critico' if uso >= 90 else ('alto' if uso >= 80 else '')
+                tabla.insert('', 'end', values=(
+                    exportacion['ruta'],
+                    filesystem['punto_montaje'],
+                    formatear_bytes(filesystem['total']),
+                    formatear_bytes(filesystem['usados']),
+                    formatear_bytes(filesystem['libres']),
+                    "{0:.0f}%".format(filesystem['porcentaje']),
+                    "{0:.0f}%".format(filesystem['porcentaje_inodos']),
+                    crecimiento,
+                    lleno
+                ), tags=(etiqueta,))
+            etiqueta_resumen.config(text=resultado["message"])
+        
+        def refrescar():
+            if not ventana.winfo_exists():
+                return
             
-            # Texto con resultados
-            from .temas import crear_text_widget
-            texto = crear_text_widget(ventana, height=20)
-            texto.pack(fill='both', expand=True, padx=10, pady=10)
-            texto.insert('1.0', resultado['data'])
-            texto.config(state='disabled')
+            # statvfs sobre un montaje NFS caído puede bloquear: la consulta se hace fuera
+            # del hilo de Tk y el resultado se recoge con after()
+            respuesta = {}
             
-            # Botón cerrar
-            crear_boton(
-                ventana,
-                "Cerrar",
-                ventana.destroy,
-                tipo='secondary'
-            ).pack(pady=10)
-        else:
-            messagebox.showerror("Error", resultado['message'])
+            def trabajar():
+                try:
+                    respuesta['resultado'] = self.gestor_nfs.verificar_montajes_y_disco()
+                except Exception as e:
+                    logger.error("Error consultando la capacidad de las exportaciones: {0}".format(e))
+            
+            trabajador = threading.Thread(target=trabajar)
+            trabajador.daemon = True
+            trabajador.start()
+            
+            def esperar():
+                if not ventana.winfo_exists():
+                    return
+                if trabajador.is_alive():
+                    ventana.after(200, esperar)
+                    return
+                if 'resultado' in respuesta:
+                    mostrar(respuesta['resultado'])
+                else:
+                    etiqueta_resumen.config(text="No se pudo consultar la capacidad (ver el registro)")
+                ventana.after(int(INTERVALO_REFRESCO_CAPACIDAD * 1000), refrescar)
+            
+            ventana.after(200, esperar)
+        
+        refrescar()
+        
+        crear_boton(
+            ventana,
+            "Cerrar",
+            ventana.destroy,
+            tipo='secondary'
+        ).pack(pady=10)
+    
+    def _ver_estado_kernel(self):
+        """
+        Muestra lo que el kernel exporta frente a lo configurado y los clientes conectados
+        Se refresca solo mientras está abierto y redibuja únicamente si algo cambió
+        """
+        ventana = tk.Toplevel(self.parent)
+        ventana.title("Estado de las Exportaciones en el Kernel")
+        ventana.geometry("1000x600")
+        ventana.configure(bg=TemaColores.COLOR_FONDO_PRINCIPAL)
+        
+        def crear_tabla(columnas, alto):
+            tabla = ttk.Treeview(ventana, columns=[c for c, _, _ in columnas], show='headings', height=alto)
+            for clave, titulo, ancho in columnas:
+                tabla.heading(clave, text=titulo)
+                tabla.column(clave, width=ancho, anchor='w')
+            return tabla
+        
+        tabla_exportaciones = crear_tabla([
+            ('ruta', "Exportación", 200),
+            ('host', "Host", 130),
+            ('estado', "Estado", 190),
+            ('kernel', "Kernel", 60),
+            ('detalle', "Opciones / diferencias", 260),
+            ('clientes', "Clientes", 140),
+        ], 12)
+        tabla_exportaciones.tag_configure('obsoleta', foreground=TemaColores.COLOR_DANGER)
+        tabla_exportaciones.tag_configure('no_aplicada', foreground=TemaColores.COLOR_WARNING)
+        tabla_exportaciones.tag_configure('opciones_distintas', foreground=TemaColores.COLOR_WARNING)
+        tabla_exportaciones.pack(fill='both', expand=True, padx=10, pady=(10, 5))
+        
+        ttk.Label(ventana, text="Clientes conectados:").pack(anchor='w', padx=10)
+        tabla_clientes = crear_tabla([
+            ('direccion', "Cliente", 150),
+            ('nombre', "Nombre", 220),
+            ('version', "NFS", 50),
+            ('estado', "Estado", 100),
+            ('abiertos', "Abiertos", 70),
+            ('bloqueos', "Bloqueos", 70),
+            ('delegaciones', "Delegaciones", 90),
+            ('rutas', "Exportaciones", 230),
+        ], 8)
+        tabla_clientes.pack(fill='both', expand=True, padx=10, pady=5)
+        
+        etiqueta_resumen = ttk.Label(ventana, text="", foreground=TemaColores.COLOR_TEXTO_MUTED)
+        etiqueta_resumen.pack(anchor='w', padx=10)
+        
+        def describir_kernel(exportacion):
+            if exportacion['en_kernel'] is None:
+                return "-"
+            return "sí" if exportacion['en_kernel'] else "no"
+        
+        ultimo = {}
+        
+        def refrescar():
+            if not ventana.winfo_exists():
+                return
+            resultado = self.gestor_nfs.estado_kernel()
+            datos = (resultado["exportaciones"], resultado["clientes"])
+            if datos != ultimo.get('datos'):
+                ultimo['datos'] = datos
+                tabla_exportaciones.delete(*tabla_exportaciones.get_children())
+                for exportacion in resultado["exportaciones"]:
+                    if exportacion['diferencias']:
+                        detalle = "; ".join(exportacion['diferencias'])
+                    else:
+                        detalle = ",".join(exportacion['aplicadas'] or exportacion['configuradas'] or ())
+                    tabla_exportaciones.insert('', 'end', values=(
+                        exportacion['ruta'],
+                        exportacion['host'],
+                        ESTADOS[exportacion['estado']],
+                        describir_kernel(exportacion),
+                        detalle,
+                        " ".join(exportacion['clientes'])
+                    ), tags=(exportacion['estado'],))
+                
+                tabla_clientes.delete(*tabla_clientes.get_children())
+                for cliente in resultado["clientes"]:
+                    tabla_clientes.insert('', 'end', values=(
+                        cliente['direccion'],
+                        cliente['nombre'],
+                        cliente['version'],
+                        cliente['estado'],
+                        cliente['abiertos'],
+                        cliente['bloqueos'],
+                        cliente['delegaciones'],
+                        " ".join(cliente['rutas'])
+                    ))
+            etiqueta_resumen.config(text=resultado["message"])
+            ventana.after(int(INTERVALO_REFRESCO_KERNEL * 1000), refrescar)
+        
+        refrescar()
+        
+        crear_boton(
+            ventana,
+            "Cerrar",
+            ventana.destroy,
+            tipo='secondary'
+        ).pack(pady=10)
+    
+    def _ver_historial_cambios(self):
+        """
+        Muestra quién cambió las exportaciones y cuándo
+        Con una exportación seleccionada, solo el historial de su ruta
+        """
+        ruta = None
+        seleccion = self.lista_exportaciones.curselection()
+        if seleccion and seleccion[0] < len(self.indices_mostrados):
+            configs = self.gestor_nfs.leer_configuracion_actual()
+            indice = self.indices_mostrados[seleccion[0]]
+            if indice < len(configs):
+                ruta = configs[indice]['carpeta']
+        
+        cambios = self.gestor_nfs.historial_cambios(ruta=ruta)
+        
+        ventana = tk.Toplevel(self.parent)
+        ventana.title("Historial de {0}".format(ruta) if ruta else "Historial de Cambios")
+        ventana.geometry("1000x450")
+        ventana.configure(bg=TemaColores.COLOR_FONDO_PRINCIPAL)
+        
+        columnas = [
+            ('fecha', "Fecha", 140),
+            ('usuario', "Usuario", 80),
+            ('accion', "Cambio", 80),
+            ('ruta', "Exportación", 180),
+            ('host', "Host", 120),
+            ('antes', "Antes", 170),
+            ('despues', "Después", 170),
+            ('origen', "Origen", 80),
+        ]
+        tabla = ttk.Treeview(ventana, columns=[c for c, _, _ in columnas], show='headings')
+        for clave, titulo, ancho in columnas:
+            tabla.heading(clave, text=titulo)
+            tabla.column(clave, width=ancho, anchor='w')
+        tabla.tag_configure('baja', foreground=TemaColores.COLOR_DANGER)
+        tabla.tag_configure('alta', foreground=TemaColores.COLOR_SUCCESS)
+        tabla.pack(fill='both', expand=True, padx=10, pady=(10, 5))
+        
+        for cambio in cambios:
+            tabla.insert('', 'end', values=(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cambio['fecha'])),
+                cambio['usuario'],
+                ACCIONES.get(cambio['accion'], cambio['accion']),
+                cambio['ruta'],
+                cambio['host'],
+                ",".join(cambio['antes'] or ()),
+                ",".join(cambio['despues'] or ()),
+                cambio['origen']
+            ), tags=(cambio['accion'],))
+        
+        ttk.Label(
+            ventana,
+            text="{0} cambios registrados".format(len(cambios)) if cambios else "No hay cambios registrados",
+            foreground=TemaColores.COLOR_TEXTO_MUTED
+        ).pack(anchor='w', padx=10)
+        
+        crear_boton(
+            ventana,
+            "Cerrar",
+            ventana.destroy,
+            tipo='secondary'
+        ).pack(pady=10)
     
     def _limpiar_campos(self):
         """
@@ -541,4 +1337,5 @@ class TabServidor:
         self.opciones_vars['rw'].set(True)
         self.opciones_vars['sync'].set(True)
         self.opciones_vars['no_subtree_check'].set(True)
-        self.opciones_vars['root_squash'].set(True)
\ No newline at end of file
+        self.opciones_vars['root_squash'].set(True)
+        self.combo_perfil.current(0)
\ No newline at end of file
@@ -82,6 +82,14 @@ class TabTransferencia:
             tipo='info'
         ).pack(pady=5, fill='x', padx=10)
         
+        # Compresión opcional para enlaces lentos
+        self.var_comprimir = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            frame_enviar,
+            text="Comprimir al enviar (recomendado para logs y texto en enlaces lentos)",
+            variable=self.var_comprimir
+        ).pack(pady=5, anchor='w', padx=10)
+        
         # Separador
         ttk.Separator(frame_enviar, orient='horizontal').pack(fill='x', pady=10, padx=10)
         
@@ -216,6 +224,7 @@ class TabTransferencia:
             messagebox.showerror("Error", mensaje)
             return False
         
+        transferencia.comprimir = self.var_comprimir.get()
         return True
     
     def _enviar_archivos(self):
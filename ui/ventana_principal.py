@@ -7,6 +7,7 @@ from tkinter import ttk, messagebox, filedialog
 import os
 
 from gestor_nfs import GestorNFS
+from modelo_exports import describir_clientes
 from cliente_nfs import ClienteNFS
 from utils.logger import logger
 from .temas import (
@@ -234,8 +235,8 @@ class VentanaPrincipal:
         configs = self.gestor_nfs.leer_configuracion_actual()
         
         for i, config in enumerate(configs):
-            texto = "{0}. {1} -> {2} ({3})".format(
-                i+1, config['carpeta'], config['hosts'], ','.join(config['opciones'])
+            texto = "{0}. {1} -> {2}".format(
+                i+1, config['carpeta'], describir_clientes(config, separador=',')
             )
             self.lista_exportaciones.insert(tk.END, texto)
         
@@ -315,9 +316,8 @@ class VentanaPrincipal:
                     return "Error creando punto: {0}".format(str(e))
             
             # Montar como NFS en localhost (ahora funciona porque exportfs -ra ya se ejecutó)
-            comando = 'mount -t nfs localhost:"{0}" "{1}"'.format(ruta_local, punto_montaje)
-            logger.info("Montando NFS localmente: {0}".format(comando))
-            resultado = self.gestor_nfs._run_command(comando)
+            logger.info("Montando NFS localmente: localhost:{0} en {1}".format(ruta_local, punto_montaje))
+            resultado = self.gestor_nfs.montar_local(ruta_local, punto_montaje)
             
             if resultado["success"]:
                 logger.exito("Montaje NFS exitoso en {0}".format(punto_montaje))
@@ -5,7 +5,9 @@ Verifica requisitos y compatibilidad con OpenSUSE
 import sys
 import os
 import platform
-import subprocess
+import shutil
+
+from utils.ejecucion import ejecutar
 
 
 def verificar_python_version():
@@ -111,25 +113,11 @@ def verificar_nfs_instalado():
     """
     try:
         # Verificar si existe el comando exportfs
-        resultado = subprocess.run(
-            ['which', 'exportfs'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=5
-        )
-        
-        if resultado.returncode == 0:
+        if verificar_comando_disponible('exportfs'):
             return True
         
         # Verificar paquetes instalados
-        resultado = subprocess.run(
-            ['rpm', '-q', 'nfs-kernel-server'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=5
-        )
-        
-        if resultado.returncode == 0:
+        if ejecutar(['rpm', '-q', 'nfs-kernel-server'], timeout=5).exito:
             return True
             
         return False
@@ -143,14 +131,7 @@ def verificar_nfs_server_activo():
     Verifica si el servicio NFS está activo
     """
     try:
-        resultado = subprocess.run(
-            ['systemctl', 'is-active', 'nfs-server'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=5
-        )
-        
-        return resultado.returncode == 0
+        return ejecutar(['systemctl', 'is-active', 'nfs-server'], timeout=5).exito
         
     except Exception:
         return False
@@ -191,13 +172,6 @@ def verificar_comando_disponible(comando):
     """
     Verifica si un comando está disponible en el sistema
     """
-    try:
-        resultado = subprocess.run(
-            ['which', comando],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=5
-        )
-        return resultado.returncode == 0
-    except Exception:
-        return False
\ No newline at end of file
+    # Se busca en el PATH sin lanzar 'which'; exportfs suele estar en /usr/sbin
+    ruta = os.pathsep.join([os.environ.get('PATH', ''), '/usr/sbin', '/sbin'])
+    return shutil.which(comando, path=ruta) is not None
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Módulo de compresión para transferencias
+Usa zstd o lz4 si están instalados y zlib (biblioteca estándar) como respaldo
+"""
+import os
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# Archivo que describe los objetos comprimidos de un directorio transferido
+NOMBRE_MANIFIESTO = ".nfs-manifiesto.json"
+VERSION_MANIFIESTO = 1
+
+# Códec sin compresión (el objeto es una copia directa del archivo)
+CODEC_NINGUNO = "ninguno"
+
+EXTENSIONES_CODEC = {
+    'zstd': '.zst',
+    'lz4': '.lz4',
+    'zlib': '.zz'
+}
+
+# Formatos que ya vienen comprimidos: comprimirlos de nuevo solo gasta CPU
+EXTENSIONES_YA_COMPRIMIDAS = {
+    '.gz', '.tgz', '.bz2', '.tbz2', '.xz', '.txz', '.zst', '.lz4', '.lzma',
+    '.br', '.zz', '.zip', '.7z', '.rar', '.jar', '.war', '.apk', '.rpm',
+    '.deb', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.mp3',
+    '.ogg', '.flac', '.aac', '.m4a', '.mp4', '.mkv', '.avi', '.mov',
+    '.webm', '.pdf', '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp'
+}
+
+TAMANO_BLOQUE = 1024 * 1024
+TAMANO_MUESTRA = 64 * 1024
+
+# Por debajo de este tamaño la cabecera del códec no compensa
+TAMANO_MINIMO = 512
+
+# Si la muestra no baja de esta proporción, el archivo se envía sin comprimir
+PROPORCION_MAXIMA = 0.9
+
+
+def codecs_disponibles():
+    """
+    Retorna la lista de códecs disponibles, del preferido al de respaldo
+    """
+    codecs = []
+    if zstandard is not None:
+        codecs.append('zstd')
+    if lz4_frame is not None:
+        codecs.append('lz4')
+    codecs.append('zlib')
+    return codecs
+
+
+def obtener_codec_preferido():
+    """
+    Retorna el mejor códec disponible en el sistema
+    """
+    return codecs_disponibles()[0]
+
+
+def debe_comprimir(ruta):
+    """
+    Decide si vale la pena comprimir un archivo
+    Descarta formatos ya comprimidos y archivos cuya muestra no se reduce
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in EXTENSIONES_YA_COMPRIMIDAS:
+        return False
+
+    try:
+        if os.path.getsize(ruta) < TAMANO_MINIMO:
+            return False
+
+        with open(ruta, 'rb') as f:
+            muestra = f.read(TAMANO_MUESTRA)
+    except OSError:
+        return False
+
+    if not muestra:
+        return False
+
+    # zlib nivel 1 es barato y basta para estimar la compresibilidad
+    comprimida = zlib.compress(muestra, 1)
+    return len(comprimida) < len(muestra) * PROPORCION_MAXIMA
+
+
+def comprimir_archivo(origen, destino, codec):
+    """
+    Comprime origen en destino usando el códec indicado
+    Retorna el tamaño del objeto comprimido
+    """
+    with open(origen, 'rb') as fin, open(destino, 'wb') as fout:
+        if codec == 'zstd':
+            zstandard.ZstdCompressor(level=3).copy_stream(fin, fout)
+        elif codec == 'lz4':
+            with lz4_frame.LZ4FrameFile(fout, 'wb') as flz4:
+                _copiar_bloques(fin, flz4)
+        elif codec == 'zlib':
+            compresor = zlib.compressobj(6)
+            bloque = fin.read(TAMANO_BLOQUE)
+            while bloque:
+                fout.write(compresor.compress(bloque))
+                bloque = fin.read(TAMANO_BLOQUE)
+            fout.write(compresor.flush())
+        else:
+            raise ValueError("Códec no soportado: {0}".format(codec))
+
+    return os.path.getsize(destino)
+
+
+def descomprimir_archivo(origen, destino, codec):
+    """
+    Descomprime el objeto origen en destino usando el códec indicado
+    """
+    with open(origen, 'rb') as fin, open(destino, 'wb') as fout:
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("El objeto requiere zstd y el módulo zstandard no está instalado")
+            zstandard.ZstdDecompressor().copy_stream(fin, fout)
+        elif codec == 'lz4':
+            if lz4_frame is None:
+                raise RuntimeError("El objeto requiere lz4 y el módulo lz4 no está instalado")
+            with lz4_frame.LZ4FrameFile(fin, 'rb') as flz4:
+                _copiar_bloques(flz4, fout)
+        elif codec == 'zlib':
+            descompresor = zlib.decompressobj()
+            bloque = fin.read(TAMANO_BLOQUE)
+            while bloque:
+                fout.write(descompresor.decompress(bloque))
+                bloque = fin.read(TAMANO_BLOQUE)
+            fout.write(descompresor.flush())
+        else:
+            raise ValueError("Códec no soportado: {0}".format(codec))
+
+
+def _copiar_bloques(fin, fout):
+    """Copia un flujo en bloques de TAMANO_BLOQUE"""
+    bloque = fin.read(TAMANO_BLOQUE)
+    while bloque:
+        fout.write(bloque)
+        bloque = fin.read(TAMANO_BLOQUE)
+
+
+def nombre_objeto(nombre, codec):
+    """
+    Retorna el nombre con el que se guarda un archivo comprimido
+    """
+    if codec == CODEC_NINGUNO:
+        return nombre
+    return nombre + EXTENSIONES_CODEC[codec]
+
+
+def leer_manifiesto(directorio):
+    """
+    Lee el manifiesto de un directorio
+    Retorna None si el directorio no contiene objetos comprimidos
+    """
+    ruta = os.path.join(directorio, NOMBRE_MANIFIESTO)
+    if not os.path.isfile(ruta):
+        return None
+
+    with open(ruta, 'r') as f:
+        manifiesto = json.load(f)
+
+    if manifiesto.get('version') != VERSION_MANIFIESTO:
+        raise ValueError("Versión de manifiesto no soportada: {0}".format(manifiesto.get('version')))
+
+    return manifiesto
+
+
+def escribir_manifiesto(directorio, archivos):
+    """
+    Escribe (de forma atómica) el manifiesto de un directorio
+    archivos: diccionario ruta_relativa -> entrada
+    """
+    ruta = os.path.join(directorio, NOMBRE_MANIFIESTO)
+    ruta_temporal = ruta + ".tmp"
+
+    with open(ruta_temporal, 'w') as f:
+        json.dump({"version": VERSION_MANIFIESTO, "archivos": archivos}, f, indent=1, sort_keys=True)
+
+    os.replace(ruta_temporal, ruta)
@@ -0,0 +1,143 @@
+"""
+Ejecución de comandos del sistema
+Ejecuta listas de argumentos (argv) directamente, sin pasar por /bin/sh,
+lee stdout y stderr a medida que llegan y devuelve un resultado tipado
+"""
+import os
+import time
+import codecs
+import selectors
+import subprocess
+
+
+TAMANO_BLOQUE = 65536
+
+MENSAJE_TIMEOUT = "Comando tardó demasiado (timeout)"
+
+
+class ResultadoComando:
+    """
+    Resultado de un comando: código de salida, salidas completas y duración (s)
+    codigo es None si el proceso no llegó a ejecutarse o se mató por timeout
+    """
+
+    __slots__ = ('argv', 'codigo', 'stdout', 'stderr', 'duracion', 'tiempo_agotado', 'error')
+
+    def __init__(self, argv, codigo=None, stdout="", stderr="", duracion=0.0,
+                 tiempo_agotado=False, error=None):
+        self.argv = argv
+        self.codigo = codigo
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duracion = duracion
+        self.tiempo_agotado = tiempo_agotado
+        self.error = error
+
+    @property
+    def exito(self):
+        return self.codigo == 0 and not self.tiempo_agotado and self.error is None
+
+    def como_diccionario(self):
+        """
+        Retorna {"success", "stdout", "stderr", "codigo", "duracion"}, el formato
+        de resultado que usan los gestores
+        """
+        stderr = self.stderr
+        if self.tiempo_agotado:
+            stderr = MENSAJE_TIMEOUT
+        elif self.error is not None:
+            stderr = self.error
+        return {
+            "success": self.exito,
+            "stdout": self.stdout,
+            "stderr": stderr,
+            "codigo": self.codigo if self.codigo is not None else -1,
+            "duracion": self.duracion
+        }
+
+    def __repr__(self):
+        return "ResultadoComando({0!r}, codigo={1!r}, duracion={2:.3f})".format(
+            self.argv, self.codigo, self.duracion
+        )
+
+
+def ejecutar(argv, timeout=None, al_recibir=None, entorno=None, directorio=None):
+    """
+    Ejecuta argv (lista de argumentos, sin shell) y espera a que termine
+    timeout: segundos; al vencer se mata el proceso
+    al_recibir(flujo, linea): se llama por cada línea de 'stdout' o 'stderr'
+    en cuanto llega, sin esperar a que el comando termine
+    Retorna un ResultadoComando (nunca lanza excepciones por el comando)
+    """
+    argv = [str(argumento) for argumento in argv]
+    inicio = time.monotonic()
+    try:
+        proceso = subprocess.Popen(
+            argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=entorno,
+            cwd=directorio
+        )
+    except OSError as e:
+        return ResultadoComando(argv, error=str(e), duracion=time.monotonic() - inicio)
+
+    limite = inicio + timeout if timeout is not None else None
+    tiempo_agotado = False
+    flujos = {
+        proceso.stdout.fileno(): ('stdout', codecs.getincrementaldecoder('utf-8')('replace'), [], [""]),
+        proceso.stderr.fileno(): ('stderr', codecs.getincrementaldecoder('utf-8')('replace'), [], [""]),
+    }
+
+    with selectors.DefaultSelector() as selector:
+        for descriptor in flujos:
+            selector.register(descriptor, selectors.EVENT_READ)
+
+        while selector.get_map():
+            espera = None
+            if limite is not None:
+                espera = limite - time.monotonic()
+                if espera <= 0:
+                    tiempo_agotado = True
+                    break
+
+            for clave, _ in selector.select(espera):
+                nombre, decodificador, partes, pendiente = flujos[clave.fd]
+                bloque = os.read(clave.fd, TAMANO_BLOQUE)
+                texto = decodificador.decode(bloque, final=not bloque)
+                if not bloque:
+                    selector.unregister(clave.fd)
+                partes.append(texto)
+
+                if al_recibir is not None:
+                    # Solo se entregan líneas completas; el resto espera al siguiente bloque
+                    lineas = (pendiente[0] + texto).split("\n")
+                    pendiente[0] = lineas.pop()
+                    for linea in lineas:
+                        al_recibir(nombre, linea)
+                    if not bloque and pendiente[0]:
+                        al_recibir(nombre, pendiente[0])
+                        pendiente[0] = ""
+
+    if not tiempo_agotado:
+        # El proceso puede cerrar sus flujos y seguir corriendo: la espera también respeta el límite
+        try:
+            proceso.wait(timeout=max(limite - time.monotonic(), 0) if limite is not None else None)
+        except subprocess.TimeoutExpired:
+            tiempo_agotado = True
+    if tiempo_agotado:
+        proceso.kill()
+        proceso.wait()
+    proceso.stdout.close()
+    proceso.stderr.close()
+
+    salida = {nombre: "".join(partes) for nombre, _, partes, _ in flujos.values()}
+    return ResultadoComando(
+        argv,
+        codigo=None if tiempo_agotado else proceso.returncode,
+        stdout=salida['stdout'],
+        stderr=salida['stderr'],
+        duracion=time.monotonic() - inicio,
+        tiempo_agotado=tiempo_agotado
+    )
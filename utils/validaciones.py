@@ -127,12 +127,13 @@ def validar_opciones_nfs(opciones):
     - root_squash y no_root_squash (mapear root vs no mapear)
     - all_squash y no_all_squash (mapear todos vs no mapear)
     - secure e insecure (puertos seguros vs inseguros)
+    - wdelay y no_wdelay (agrupar escrituras vs escribir de inmediato)
     """
     opciones_validas = {
         'ro', 'rw', 'sync', 'async', 'no_root_squash', 'root_squash',
         'all_squash', 'no_subtree_check', 'subtree_check', 'insecure',
         'secure', 'anonuid', 'anongid', 'fsid', 'no_all_squash',
-        'no_secure'
+        'no_secure', 'wdelay', 'no_wdelay'
     }
     
     if not isinstance(opciones, list):
@@ -164,6 +165,7 @@ def validar_opciones_nfs(opciones):
         (['all_squash', 'no_all_squash'], "No puede usar 'all_squash' y 'no_all_squash' al mismo tiempo"),
         (['secure', 'insecure'], "No puede usar 'secure' e 'insecure' al mismo tiempo"),
         (['subtree_check', 'no_subtree_check'], "No puede usar 'subtree_check' y 'no_subtree_check' al mismo tiempo"),
+        (['wdelay', 'no_wdelay'], "No puede usar 'wdelay' y 'no_wdelay' al mismo tiempo"),
     ]
     
     for opciones_conflictivas, mensaje_error in conflictos: